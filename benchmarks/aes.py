@@ -0,0 +1,81 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.recaptcha.mailhide import Mailhide
+from googler.utils import aes
+
+import argparse
+import os
+import sys
+import timeit
+
+"""
+This module implements a micro-benchmark of the AES backends used by mailhide:
+
+    python -m benchmarks.aes
+
+For every installed backend, it measures raw ECB throughput and the rate of
+Mailhide URLs built one by one and in bulk. It fails if the backends do not
+produce identical output.
+"""
+
+MAILHIDE_PRIVATE_KEY = 'deadbeefdeadbeefdeadbeefdeadbeef'
+MAILHIDE_PUBLIC_KEY = '01a8k2oq4ZDQ4wL4U2uMWx7w=='
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.aes',
+                                     description='Benchmark the installed AES backends.')
+    parser.add_argument('-n', '--addresses', type=int, default=10000,
+                        help='addresses per run (default: %(default)s)')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='runs per measurement, the fastest is reported (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    emails = ['member%d@example.com' % i for i in range(args.addresses)]
+    data = os.urandom(aes.BLOCK_SIZE * args.addresses)
+    outputs = {}
+
+    print('default backend: %s' % aes.get_backend())
+
+    for backend in aes.available_backends():
+        cipher = aes.new(b'\0' * aes.BLOCK_SIZE, backend)
+        encoder = Mailhide(MAILHIDE_PRIVATE_KEY, MAILHIDE_PUBLIC_KEY, backend=backend)
+
+        ecb = _best(lambda: cipher.encrypt(data), args.repeat)
+        single = _best(lambda: [encoder.get_url(email) for email in emails], args.repeat)
+        bulk = _best(lambda: encoder.get_urls(emails), args.repeat)
+        outputs[backend] = encoder.get_urls(emails)
+
+        print('%-14s ecb %8.1f MB/s  get_url %9.0f/s  get_urls %9.0f/s' % (
+            backend, len(data) / ecb / 1e6, len(emails) / single, len(emails) / bulk))
+
+    if len(set(tuple(urls) for urls in outputs.values())) > 1:
+        print('backends produce different output')
+        return 1
+
+    return 0
+
+
+def _best(func, repeat):
+    """
+    :return: Fastest of `repeat` runs of func, in seconds
+    """
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
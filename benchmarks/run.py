@@ -0,0 +1,251 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from benchmarks.server import start_process
+from concurrent.futures import ThreadPoolExecutor
+from googler import __version__
+from googler.maps import geocoding
+from googler.recaptcha import captcha, captcha2, mailhide
+from googler.utils.http import Transport
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+"""
+This module implements the benchmark harness. It measures throughput, latency
+percentiles and memory of the hot API paths against a local stand-in server:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --compare results.json
+
+Results are saved as JSON, so runs of different releases can be compared.
+"""
+
+# Relative slowdown of a metric which is reported as regression
+DEFAULT_THRESHOLD = 0.10
+
+MAILHIDE_PRIVATE_KEY = 'deadbeefdeadbeefdeadbeefdeadbeef'
+MAILHIDE_PUBLIC_KEY = '01a8k2oq4ZDQ4wL4U2uMWx7w=='
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run',
+                                     description='Benchmark googler against a local stand-in server.')
+    parser.add_argument('-n', '--requests', type=int, default=500,
+                        help='calls per benchmark (default: %(default)s)')
+    parser.add_argument('-c', '--concurrency', type=int, default=8,
+                        help='concurrent callers (default: %(default)s)')
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='server latency in seconds (default: %(default)s)')
+    parser.add_argument('--jitter', type=float, default=0.002,
+                        help='server latency jitter in seconds (default: %(default)s)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of requests failing with 503 (default: %(default)s)')
+    parser.add_argument('-b', '--benchmark', action='append',
+                        help='benchmark to run (may be repeated; default: all)')
+    parser.add_argument('-o', '--output', help='file to save the results to')
+    parser.add_argument('--compare', help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='relative slowdown reported as regression (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    server, address = start_process(latency=args.latency, jitter=args.jitter,
+                                    error_rate=args.error_rate)
+    transport = Transport(pool_size=args.concurrency)
+    benchmarks = _build_benchmarks(address, transport)
+
+    try:
+        results = {}
+
+        for name, func in benchmarks:
+            if args.benchmark and name not in args.benchmark:
+                continue
+
+            results[name] = measure(func, args.requests, args.concurrency)
+            _print_result(name, results[name])
+    finally:
+        transport.close()
+        server.terminate()
+
+    report = {
+        'version': __version__,
+        'python': platform.python_version(),
+        'timestamp': time.time(),
+        'settings': {
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'latency': args.latency,
+            'jitter': args.jitter,
+            'error_rate': args.error_rate
+        },
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        if compare(baseline, report, args.threshold):
+            return 1
+
+    return 0
+
+
+def measure(func, requests, concurrency):
+    """
+    Call `func(i)` for i in range(requests) from `concurrency` threads.
+
+    :return: Dict of throughput (calls per second), latency percentiles (seconds),
+             error count and peak traced memory (bytes)
+    """
+    latencies = []
+    errors = []
+
+    def call(i):
+        start = time.perf_counter()
+
+        try:
+            func(i)
+        except Exception:
+            errors.append(i)
+
+        latencies.append(time.perf_counter() - start)
+
+    # Warm up connections and caches of the code under test
+    for i in range(min(concurrency, requests)):
+        call(i)
+
+    del latencies[:], errors[:]
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, range(requests)))
+
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    result = {
+        'throughput': requests / elapsed,
+        'p50': _percentile(latencies, 50),
+        'p99': _percentile(latencies, 99),
+        'errors': len(errors)
+    }
+
+    # Tracing allocations slows everything down, so memory is measured in a
+    # separate pass instead of skewing the timings
+    tracemalloc.start()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, range(requests)))
+
+    result['peak_memory'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return result
+
+
+def compare(baseline, report, threshold=DEFAULT_THRESHOLD):
+    """
+    Print the difference between two reports and return the regressed metrics.
+
+    :return: List of (benchmark, metric) tuples
+    """
+    regressions = []
+
+    for name, result in sorted(report['results'].items()):
+        old = baseline['results'].get(name)
+
+        if old is None:
+            continue
+
+        for metric in ('throughput', 'p50', 'p99', 'peak_memory'):
+            if not old[metric]:
+                continue
+
+            change = (result[metric] - old[metric]) / float(old[metric])
+            # Throughput regresses when it drops, everything else when it grows
+            slowdown = -change if metric == 'throughput' else change
+            flag = ''
+
+            if slowdown > threshold:
+                regressions.append((name, metric))
+                flag = '  REGRESSION'
+
+            print('%-16s %-12s %+7.1f%%%s' % (name, metric, change * 100, flag))
+
+    return regressions
+
+
+def _build_benchmarks(address, transport):
+    """
+    Point the API modules at the stand-in server and return (name, function) pairs.
+    """
+    geocoding.API_URL = '%s/maps/api/geocode' % address
+    captcha.API_URL = '%s/recaptcha/api' % address
+    captcha2.VERIFY_URL = 'http://%s/recaptcha/api/siteverify' % address
+
+    def get_geocode(i):
+        result = geocoding.get_geocode('%d Amphitheatre Pkwy' % i, 'key', use_tls=False,
+                                       transport=transport)
+        if not result:
+            raise ValueError(i)
+
+    def get_geocode_xml(i):
+        result = geocoding.get_geocode('%d Amphitheatre Pkwy' % i, 'key', format='xml',
+                                       use_tls=False, transport=transport)
+        if not result:
+            raise ValueError(i)
+
+    def captcha_verify(i):
+        captcha.verify('challenge-%d' % i, 'response', 'private-key', '127.0.0.1', use_tls=False,
+                       transport=transport)
+
+    def captcha2_verify(i):
+        captcha2.verify('secret', 'token-%d' % i, transport=transport)
+
+    def mailhide_get_url(i):
+        mailhide.get_url('user%d@example.com' % i, MAILHIDE_PRIVATE_KEY, MAILHIDE_PUBLIC_KEY)
+
+    return [
+        ('get_geocode', get_geocode),
+        ('get_geocode_xml', get_geocode_xml),
+        ('captcha.verify', captcha_verify),
+        ('captcha2.verify', captcha2_verify),
+        ('mailhide.get_url', mailhide_get_url),
+    ]
+
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+
+
+def _print_result(name, result):
+    print('%-16s %9.1f/s  p50 %7.2fms  p99 %7.2fms  errors %d  peak %8.1fKiB' % (
+        name, result['throughput'], result['p50'] * 1000, result['p99'] * 1000,
+        result['errors'], result['peak_memory'] / 1024.0))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,200 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+import json
+import multiprocessing
+import random
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse
+
+"""
+This module implements a local stand-in for the Geocoding and reCAPTCHA endpoints,
+answering with canned payloads after a configurable delay.
+"""
+
+GEOCODE_JSON = {
+    'results': [{
+        'address_components': [
+            {'long_name': '1600', 'short_name': '1600', 'types': ['street_number']},
+            {'long_name': 'Amphitheatre Pkwy', 'short_name': 'Amphitheatre Pkwy', 'types': ['route']},
+            {'long_name': 'Mountain View', 'short_name': 'Mountain View',
+             'types': ['locality', 'political']},
+            {'long_name': 'Santa Clara', 'short_name': 'Santa Clara',
+             'types': ['administrative_area_level_2', 'political']},
+            {'long_name': 'California', 'short_name': 'CA',
+             'types': ['administrative_area_level_1', 'political']},
+            {'long_name': 'United States', 'short_name': 'US', 'types': ['country', 'political']},
+            {'long_name': '94043', 'short_name': '94043', 'types': ['postal_code']}
+        ],
+        'formatted_address': '1600 Amphitheatre Pkwy, Mountain View, CA 94043, USA',
+        'geometry': {
+            'location': {'lat': 37.4229181, 'lng': -122.0854212},
+            'location_type': 'ROOFTOP',
+            'viewport': {
+                'northeast': {'lat': 37.42426708029149, 'lng': -122.0840722197085},
+                'southwest': {'lat': 37.4215691197085, 'lng': -122.0867701802915}
+            }
+        },
+        'types': ['street_address']
+    }],
+    'status': 'OK'
+}
+
+GEOCODE_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<GeocodeResponse>
+ <status>OK</status>
+ <result>
+  <type>street_address</type>
+  <formatted_address>1600 Amphitheatre Pkwy, Mountain View, CA 94043, USA</formatted_address>
+  <address_component>
+   <long_name>1600</long_name>
+   <short_name>1600</short_name>
+   <type>street_number</type>
+  </address_component>
+  <address_component>
+   <long_name>Mountain View</long_name>
+   <short_name>Mountain View</short_name>
+   <type>locality</type>
+   <type>political</type>
+  </address_component>
+  <geometry>
+   <location>
+    <lat>37.4229181</lat>
+    <lng>-122.0854212</lng>
+   </location>
+   <location_type>ROOFTOP</location_type>
+  </geometry>
+ </result>
+</GeocodeResponse>
+'''
+
+SITEVERIFY_JSON = {
+    'success': True,
+    'challenge_ts': '2015-01-01T00:00:00Z',
+    'hostname': 'example.com'
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    # Send headers and body in one segment, so delayed ACKs do not add latency
+    disable_nagle_algorithm = True
+    wbufsize = -1
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+
+        if path.endswith('/geocode/json'):
+            self._respond(json.dumps(GEOCODE_JSON), 'application/json')
+        elif path.endswith('/geocode/xml'):
+            self._respond(GEOCODE_XML, 'application/xml')
+        else:
+            self._respond('', 'text/plain', 404)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+        if path.endswith('/siteverify'):
+            self._respond(json.dumps(SITEVERIFY_JSON), 'application/json')
+        elif path.endswith('/verify'):
+            self._respond('true\nsuccess', 'text/plain')
+        else:
+            self._respond('', 'text/plain', 404)
+
+    def _respond(self, body, content_type, status=200):
+        server = self.server
+        delay = server.latency + random.uniform(-server.jitter, server.jitter)
+
+        if delay > 0:
+            time.sleep(delay)
+
+        if status == 200 and random.random() < server.error_rate:
+            status, body = 503, ''
+
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+    """
+    A threaded HTTP server standing in for the Google endpoints.
+
+    :ivar latency: Delay in seconds before each response
+    :ivar jitter: Maximum random deviation from the delay, in seconds
+    :ivar error_rate: Fraction of requests answered with 503
+    """
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0):
+        HTTPServer.__init__(self, (host, port), _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._thread = None
+
+    @property
+    def address(self):
+        return '%s:%d' % self.server_address[:2]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def _serve(queue, kwargs):
+    server = StandInServer(**kwargs)
+    queue.put(server.address)
+    server.serve_forever()
+
+
+def start_process(**kwargs):
+    """
+    Run a StandInServer in a child process, so it does not compete with the
+    code under test for the interpreter lock.
+
+    :param kwargs: Arguments for StandInServer
+    :return: Tuple of the process and the server address ("host:port")
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(queue, kwargs))
+    process.daemon = True
+    process.start()
+
+    return process, queue.get(timeout=10)
@@ -1 +1,30 @@
-__version__ = '1.0.1'
\ No newline at end of file
+__version__ = '1.0.1'
+
+import sys
+
+from googler.utils import lazy
+
+# Names which can be imported from googler directly. The modules defining them
+# are only imported when a name is first accessed.
+_exports = {
+    'GeocodeCache': 'googler.maps.cache',
+    'GeocodeResult': 'googler.maps.geocoding',
+    'get_geocode': 'googler.maps.geocoding',
+    'get_geocodes': 'googler.maps.geocoding',
+    'Mailhide': 'googler.recaptcha.mailhide',
+    'TokenStore': 'googler.recaptcha.tokens',
+    'CircuitBreaker': 'googler.utils.breaker',
+    'LRUCache': 'googler.utils.cache',
+    'SQLiteCache': 'googler.utils.cache',
+    'Hedger': 'googler.utils.hedge',
+    'Transport': 'googler.utils.http',
+    'Metrics': 'googler.utils.metrics',
+    'RateLimiter': 'googler.utils.ratelimit'
+}
+
+__all__ = sorted(_exports)
+
+if sys.version_info >= (3, 7):
+    __getattr__ = lazy.exports(__name__, _exports)
+else:
+    lazy.load_exports(globals(), _exports)
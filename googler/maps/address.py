@@ -0,0 +1,135 @@
+# coding: utf-8
+
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.utils import compat
+
+import re
+import unicodedata
+
+"""
+This module implements address canonicalization, so that different spellings
+of the same address share cache entries and requests.
+"""
+
+# Common abbreviations in addresses and their expansions
+ABBREVIATIONS = {
+    'apt': 'apartment',
+    'av': 'avenue',
+    'ave': 'avenue',
+    'blvd': 'boulevard',
+    'cir': 'circle',
+    'ct': 'court',
+    'ctr': 'center',
+    'dr': 'drive',
+    'e': 'east',
+    'expy': 'expressway',
+    'fl': 'floor',
+    'ft': 'fort',
+    'fwy': 'freeway',
+    'hwy': 'highway',
+    'jct': 'junction',
+    'ln': 'lane',
+    'mt': 'mount',
+    'n': 'north',
+    'ne': 'northeast',
+    'nw': 'northwest',
+    'pkwy': 'parkway',
+    'pl': 'place',
+    'rd': 'road',
+    's': 'south',
+    'se': 'southeast',
+    'sq': 'square',
+    'st': 'street',
+    'ste': 'suite',
+    'sw': 'southwest',
+    'ter': 'terrace',
+    'trl': 'trail',
+    'w': 'west',
+}
+
+# Abbreviations which are also state codes or mean other things on their own,
+# e.g. "Hartford CT"; they are not expanded as the last word of an address
+AMBIGUOUS_ABBREVIATIONS = frozenset(['ct', 'e', 'fl', 'mt', 'n', 'ne', 's', 'w'])
+
+# Apostrophes are dropped ("O'Farrell" -> "ofarrell"), other punctuation separates words
+_APOSTROPHES = re.compile(u"['‘’`´]", re.UNICODE)
+_PUNCTUATION = re.compile(r'[^\w\s-]|_', re.UNICODE)
+_HYPHENS = re.compile(r'(?<!\w)-|-(?!\w)', re.UNICODE)
+
+
+def normalize_address(address):
+    """
+    Normalize an address without changing its meaning.
+
+    This applies Unicode normalization (NFKC) and collapses whitespace. The result
+    is what is sent to the API.
+
+    :param address: Address
+    :return: Normalized address
+    """
+    if not isinstance(address, compat.text_type):
+        address = address.decode('utf-8')
+
+    return u' '.join(unicodedata.normalize('NFKC', address).split())
+
+
+def canonical_key(address):
+    """
+    Derive the canonical form of an address.
+
+    On top of normalize_address(), this folds case, drops punctuation and
+    expands common abbreviations (e.g. "Pkwy" to "parkway", "St" to "street"),
+    so that different spellings of an address yield the same key.
+
+    Commas are kept as part separators, and only the first part (the street)
+    is expanded, so "Hartford Ct" and "Hartford, CT" keep different keys.
+
+    :param address: Address
+    :return: Canonical key
+    """
+    address = normalize_address(address)
+    address = address.casefold() if hasattr(address, 'casefold') else address.lower()
+    address = _APOSTROPHES.sub(u'', address)
+    parts = []
+
+    for part in address.split(u','):
+        part = _PUNCTUATION.sub(u' ', part)
+        part = _HYPHENS.sub(u' ', part)
+        words = part.split()
+
+        if words:
+            parts.append(words)
+
+    if parts:
+        parts[0] = _expand(parts[0], last=len(parts) == 1)
+
+    return u', '.join(u' '.join(words) for words in parts)
+
+
+def _expand(words, last):
+    """
+    Expand the abbreviations in the words of the street part.
+
+    :param last: Specifies whether the street part ends the address
+    """
+    expanded = [ABBREVIATIONS.get(word, word) for word in words]
+
+    if last and words[-1] in AMBIGUOUS_ABBREVIATIONS:
+        expanded[-1] = words[-1]
+
+    return expanded
@@ -0,0 +1,208 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps.geocoding import Geocode, _request_key
+from googler.utils.cache import LRUCache
+
+import threading
+
+"""
+This module implements a cache for Geocoding responses, to be passed to
+googler.maps.geocoding.get_geocode().
+"""
+
+# Default time to live for geocodes (30 days)
+DEFAULT_TTL = 30 * 24 * 60 * 60
+
+# Default time to live for negative answers (1 day)
+DEFAULT_NEGATIVE_TTL = 24 * 60 * 60
+
+# Statuses which are cached, since they describe the address; errors and unknown ones are not
+CACHEABLE_STATUSES = ('OK', 'ZERO_RESULTS')
+
+# Minimum number of writes between two sweeps of the spatial index
+SWEEP_INTERVAL = 1000
+
+
+class GeocodeCache(object):
+    """
+    A cache for decoded Geocoding responses.
+
+    Entries are keyed on the normalized address, the response format and the
+    API key (so responses are never shared between keys). Negative answers
+    (ZERO_RESULTS) are kept for a shorter time than actual geocodes, and
+    responses with any other status are not cached at all.
+
+    The entries are kept in a cache backend (see googler.utils.cache), which
+    defaults to an in-memory LRUCache. Use a SQLiteCache to share entries
+    between processes and keep them across restarts.
+
+    If a SpatialIndex is given, it is filled with the geocodes already in the
+    backend and then updated with every geocode stored. Queries skip geocodes
+    whose responses have been evicted or have expired since, and the index
+    is swept of them from time to time.
+    """
+    def __init__(self, backend=None, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 index=None):
+        """
+        :param backend: Cache backend (optional); defaults to a LRUCache
+        :param ttl: Time to live in seconds for geocodes
+        :param negative_ttl: Time to live in seconds for ZERO_RESULTS answers
+        :param index: SpatialIndex to keep up to date with the cached geocodes (optional)
+        """
+        self.backend = backend if backend is not None else LRUCache()
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.index = index
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._indexed = {}
+        self._writes = 0
+
+        if index is not None:
+            index.validate = self._is_cached
+
+            for key, data in self.backend.items():
+                self._index(key, data)
+
+    def get(self, address, api_key, format, exclude=None):
+        """
+        Look up a cached response.
+
+        :param address: Address
+        :param api_key: API key
+        :param format: Response format
+        :param exclude: Result fields dropped from the response (optional)
+        :return: Decoded response, or None
+        """
+        data = self.backend.get(self.make_key(address, api_key, format, exclude))
+
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return data
+
+    def set(self, address, api_key, format, data, exclude=None):
+        """
+        Store a decoded response, unless its status is not cacheable.
+
+        :param address: Address
+        :param api_key: API key
+        :param format: Response format
+        :param data: Decoded response
+        :param exclude: Result fields dropped from the response (optional)
+        """
+        status = data.get('status')
+
+        if status not in CACHEABLE_STATUSES:
+            return
+
+        key = self.make_key(address, api_key, format, exclude)
+        ttl = self.ttl if status == 'OK' else self.negative_ttl
+        self.backend.set(key, data, ttl)
+
+        if self.index is not None:
+            self._index(key, data)
+            self._sweep()
+
+    def _index(self, key, data):
+        """
+        Replace the geocodes of a cached response in the spatial index.
+        """
+        self._unindex(key)
+        results = data.get('results') or ()
+
+        for i, result in enumerate(results):
+            if 'geometry' in result:
+                self.index.add('%s#%d' % (key, i), Geocode(result))
+
+        if results:
+            with self._lock:
+                self._indexed[key] = len(results)
+
+    def _unindex(self, key):
+        """
+        Remove the geocodes of a cached response from the spatial index.
+        """
+        with self._lock:
+            count = self._indexed.pop(key, 0)
+
+        for i in range(count):
+            self.index.remove('%s#%d' % (key, i))
+
+    def _sweep(self):
+        """
+        Remove the geocodes of evicted and expired responses from the spatial
+        index, once the index may have grown by half since the last sweep.
+        """
+        with self._lock:
+            self._writes += 1
+
+            if self._writes < max(SWEEP_INTERVAL, len(self._indexed) // 2):
+                return
+
+            self._writes = 0
+            indexed = list(self._indexed)
+
+        cached = set(self.backend.keys())
+
+        for key in indexed:
+            if key not in cached:
+                self._unindex(key)
+
+    def _is_cached(self, entry):
+        """
+        Determine whether a spatial index entry is still backed by a cached response.
+        """
+        key, sep, i = entry.rpartition('#')
+        data = self.backend.get(key)
+        return data is not None and int(i) < len(data.get('results') or ())
+
+    def clear(self):
+        """
+        Remove all cached responses and reset the counters.
+        """
+        self.backend.clear()
+
+        if self.index is not None:
+            with self._lock:
+                indexed = list(self._indexed)
+
+            for key in indexed:
+                self._unindex(key)
+
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    @staticmethod
+    def make_key(address, api_key, format, exclude=None):
+        """
+        Build the cache key for a request.
+
+        Responses with fields dropped are kept apart from complete ones.
+
+        :param address: Address
+        :param api_key: API key
+        :param format: Response format
+        :param exclude: Result fields dropped from the response (optional)
+        :return: Cache key
+        """
+        return _request_key(address, api_key, format, exclude)
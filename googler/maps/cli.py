@@ -0,0 +1,242 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps import geocoding
+from googler.maps.cache import GeocodeCache
+from googler.utils import compat
+from googler.utils.cache import SQLiteCache
+from googler.utils.http import Transport
+from googler.utils.ratelimit import RateLimiter
+
+import argparse
+import csv
+import io
+import itertools
+import json
+import os
+import sys
+
+try:
+    from itertools import izip as _zip
+except ImportError:
+    _zip = zip
+
+"""
+This module implements the bulk geocoding command line interface, available as
+
+    python -m googler.maps.geocoding
+
+Addresses are streamed from the input and results are written as they arrive,
+so memory use does not depend on the input size. With a checkpoint file, an
+interrupted run continues where it stopped when it is started again.
+"""
+
+# Fields of an output record
+OUTPUT_FIELDS = ('address', 'status', 'formatted_address', 'latitude', 'longitude', 'error')
+
+# Number of rows between two checkpoints
+DEFAULT_CHECKPOINT_INTERVAL = 100
+
+
+def main(argv=None):
+    """
+    Run the command line interface.
+
+    :param argv: Command line arguments (optional); defaults to sys.argv[1:]
+    :return: Exit status
+    """
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    api_key = args.key or os.environ.get('GOOGLE_API_KEY')
+
+    if not api_key:
+        parser.error('an API key is required (--key or GOOGLE_API_KEY)')
+    if args.checkpoint and not args.output:
+        parser.error('--checkpoint requires --output')
+
+    input_format = args.input_format or _guess_format(args.input, 'ndjson')
+    output_format = args.output_format or _guess_format(args.output, 'ndjson')
+
+    state = _load_checkpoint(args.checkpoint) if args.checkpoint else {'rows': 0, 'offset': 0}
+    cache = GeocodeCache(SQLiteCache(args.cache)) if args.cache else None
+    limiter = RateLimiter(per_second=args.qps, per_day=args.qpd) if args.qps or args.qpd else None
+
+    if args.input:
+        input_file = io.open(args.input, 'r', encoding='utf-8', newline='')
+    else:
+        input_file = sys.stdin
+
+    if args.output:
+        output_file = _open_output(args.output, state['offset'])
+    else:
+        output_file = getattr(sys.stdout, 'buffer', sys.stdout)
+
+    addresses = _read_addresses(input_file, input_format, args.column)
+    addresses = itertools.islice(addresses, state['rows'], None)
+
+    # The second iterator only lags behind by the lookups in flight
+    addresses, lookups = itertools.tee(addresses)
+    transport = Transport(pool_size=args.concurrency)
+
+    try:
+        if output_format == 'csv' and state['offset'] == 0:
+            output_file.write(_format_csv(OUTPUT_FIELDS))
+
+        results = geocoding.get_geocodes(lookups, api_key, transport=transport, cache=cache,
+                                         limiter=limiter, concurrency=args.concurrency)
+        rows = state['rows']
+
+        for address, result in _zip(addresses, results):
+            record = _build_record(address, result)
+
+            if output_format == 'csv':
+                output_file.write(_format_csv([record[field] for field in OUTPUT_FIELDS]))
+            else:
+                output_file.write((json.dumps(record) + '\n').encode('utf-8'))
+
+            rows += 1
+
+            if args.checkpoint and rows % args.checkpoint_interval == 0:
+                _save_checkpoint(args.checkpoint, rows, output_file)
+
+        if args.checkpoint:
+            _save_checkpoint(args.checkpoint, rows, output_file)
+        else:
+            output_file.flush()
+    finally:
+        transport.close()
+
+        if args.input:
+            input_file.close()
+        if args.output:
+            output_file.close()
+
+    return 0
+
+
+def _build_parser():
+    parser = argparse.ArgumentParser(prog='python -m googler.maps.geocoding',
+                                     description='Geocode addresses in bulk.')
+    parser.add_argument('-k', '--key', help='API key (default: $GOOGLE_API_KEY)')
+    parser.add_argument('-i', '--input', help='input file (default: stdin)')
+    parser.add_argument('-o', '--output', help='output file (default: stdout)')
+    parser.add_argument('--input-format', choices=('csv', 'ndjson'),
+                        help='input format (default: guessed from the file name, else ndjson)')
+    parser.add_argument('--output-format', choices=('csv', 'ndjson'),
+                        help='output format (default: guessed from the file name, else ndjson)')
+    parser.add_argument('--column', default='address',
+                        help='CSV column or NDJSON field holding the address (default: address)')
+    parser.add_argument('-c', '--concurrency', type=int, default=geocoding.DEFAULT_CONCURRENCY,
+                        help='number of requests in flight (default: %(default)s)')
+    parser.add_argument('--checkpoint', help='checkpoint file for resuming interrupted runs')
+    parser.add_argument('--checkpoint-interval', type=int, default=DEFAULT_CHECKPOINT_INTERVAL,
+                        help='rows between two checkpoints (default: %(default)s)')
+    parser.add_argument('--cache', help='SQLite file to cache responses in')
+    parser.add_argument('--qps', type=float, help='maximum queries per second')
+    parser.add_argument('--qpd', type=int, help='maximum queries per day')
+    return parser
+
+
+def _guess_format(path, default):
+    if path and path.lower().endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def _read_addresses(f, format, column):
+    """
+    Yield the addresses of an input file, one per row.
+    """
+    if format == 'csv':
+        for row in csv.DictReader(f):
+            yield row[column]
+    else:
+        for line in f:
+            line = line.strip()
+
+            if not line:
+                continue
+
+            item = json.loads(line)
+            yield item[column] if isinstance(item, dict) else item
+
+
+def _build_record(address, result):
+    """
+    Build an output record from a get_geocodes() item.
+    """
+    record = dict.fromkeys(OUTPUT_FIELDS)
+    record['address'] = address
+
+    if isinstance(result, geocoding.GeocodeResult):
+        record['status'] = result.status
+        record['error'] = result.error_message
+        geocode = result.first
+
+        if geocode is not None:
+            record['formatted_address'] = geocode.formatted_address
+            record['latitude'] = geocode.latitude
+            record['longitude'] = geocode.longitude
+    else:
+        record['status'] = 'ERROR'
+        record['error'] = str(result) if result is not None else 'The request has failed'
+
+    return record
+
+
+def _format_csv(values):
+    buf = io.StringIO() if sys.version_info[0] >= 3 else io.BytesIO()
+    csv.writer(buf).writerow(['' if value is None else value for value in values])
+    value = buf.getvalue()
+    return value.encode('utf-8') if not isinstance(value, bytes) else value
+
+
+def _open_output(path, offset):
+    """
+    Open the output file for appending after `offset`, discarding anything
+    written after the last checkpoint.
+    """
+    f = io.open(path, 'r+b' if os.path.exists(path) else 'w+b')
+    f.seek(offset)
+    f.truncate()
+    return f
+
+
+def _load_checkpoint(path):
+    if not os.path.exists(path):
+        return {'rows': 0, 'offset': 0}
+
+    with io.open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_checkpoint(path, rows, output_file):
+    """
+    Record that `rows` rows have been written. The output is synced first,
+    so a checkpoint never points behind data which was lost.
+    """
+    output_file.flush()
+    os.fsync(output_file.fileno())
+
+    tmp_path = path + '.tmp'
+
+    with io.open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(compat.text_type(json.dumps({'rows': rows, 'offset': output_file.tell()})))
+
+    if hasattr(os, 'replace'):
+        os.replace(tmp_path, path)
+    else:
+        os.rename(tmp_path, path)
@@ -0,0 +1,176 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps.geocoding import GeocodeResult
+from googler.maps.spatial import EARTH_RADIUS
+
+import numpy
+
+"""
+This module implements a columnar representation of geocode batches and
+vectorized distance calculations on it. It requires NumPy.
+"""
+
+
+class GeocodeColumns(object):
+    """
+    A batch of Geocoding results as parallel arrays, one row per result.
+
+    Each row holds the first geocode of its result. Rows without a geocode
+    (failed lookups, ZERO_RESULTS, ...) have NaN coordinates and None as
+    formatted address.
+
+    :ivar latitude: float64 array of latitudes
+    :ivar longitude: float64 array of longitudes
+    :ivar formatted_address: object array of formatted addresses
+    :ivar status: object array of statuses ("ERROR" for failed lookups)
+    """
+    def __init__(self, latitude, longitude, formatted_address, status):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.formatted_address = formatted_address
+        self.status = status
+
+    def __len__(self):
+        return len(self.latitude)
+
+    def __getitem__(self, index):
+        """
+        Select rows by index, slice or boolean mask.
+
+        :return: GeocodeColumns object
+        """
+        return GeocodeColumns(self.latitude[index], self.longitude[index],
+                              self.formatted_address[index], self.status[index])
+
+    @classmethod
+    def from_results(cls, results):
+        """
+        Build columns from Geocoding results.
+
+        :param results: Iterable of GeocodeResult objects; other items (as yielded by
+                        get_geocodes() for failed lookups) become rows with status "ERROR"
+        :return: GeocodeColumns object
+        """
+        latitude = []
+        longitude = []
+        formatted_address = []
+        status = []
+
+        for result in results:
+            geocode = None
+
+            if isinstance(result, GeocodeResult):
+                status.append(result.status)
+
+                if result.status == 'OK':
+                    geocode = result.first
+            else:
+                status.append('ERROR')
+
+            if geocode is not None:
+                latitude.append(geocode.latitude)
+                longitude.append(geocode.longitude)
+                formatted_address.append(geocode.formatted_address)
+            else:
+                latitude.append(numpy.nan)
+                longitude.append(numpy.nan)
+                formatted_address.append(None)
+
+        return cls(numpy.array(latitude, dtype=numpy.float64),
+                   numpy.array(longitude, dtype=numpy.float64),
+                   _object_array(formatted_address),
+                   _object_array(status))
+
+    def distances_to(self, latitude, longitude):
+        """
+        Calculate the distance of every row to a point.
+
+        :param latitude: Latitude of the point
+        :param longitude: Longitude of the point
+        :return: float64 array of distances in meters (NaN for rows without a geocode)
+        """
+        return haversine(self.latitude, self.longitude, latitude, longitude)
+
+    def within(self, south, west, north, east):
+        """
+        Select the rows within a bounding box.
+
+        :return: GeocodeColumns object
+        """
+        return self[bbox_mask(self.latitude, self.longitude, south, west, north, east)]
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """
+    Calculate great-circle distances between points, element-wise.
+
+    Arguments are arrays or scalars in degrees and are broadcast against each other.
+
+    :return: float64 array of distances in meters
+    """
+    lat1, lng1, lat2, lng2 = [numpy.radians(numpy.asarray(x, dtype=numpy.float64))
+                              for x in (lat1, lng1, lat2, lng2)]
+    a = numpy.sin((lat2 - lat1) / 2) ** 2 + \
+        numpy.cos(lat1) * numpy.cos(lat2) * numpy.sin((lng2 - lng1) / 2) ** 2
+
+    return 2 * EARTH_RADIUS * numpy.arcsin(numpy.sqrt(numpy.minimum(a, 1.0)))
+
+
+def distance_matrix(lat1, lng1, lat2=None, lng2=None):
+    """
+    Calculate the pairwise distances between two sets of points.
+
+    :param lat1: Latitudes of the first set
+    :param lng1: Longitudes of the first set
+    :param lat2: Latitudes of the second set (optional); defaults to the first set
+    :param lng2: Longitudes of the second set (optional); defaults to the first set
+    :return: float64 array of shape (len(lat1), len(lat2)) of distances in meters
+    """
+    if lat2 is None:
+        lat2, lng2 = lat1, lng1
+
+    lat1 = numpy.asarray(lat1, dtype=numpy.float64)[:, numpy.newaxis]
+    lng1 = numpy.asarray(lng1, dtype=numpy.float64)[:, numpy.newaxis]
+
+    return haversine(lat1, lng1, numpy.asarray(lat2, dtype=numpy.float64)[numpy.newaxis, :],
+                     numpy.asarray(lng2, dtype=numpy.float64)[numpy.newaxis, :])
+
+
+def bbox_mask(lat, lng, south, west, north, east):
+    """
+    Test which points lie within a bounding box.
+
+    The box may cross the antimeridian, in which case `west` is larger than `east`.
+
+    :param lat: Array of latitudes
+    :param lng: Array of longitudes
+    :return: Boolean array
+    """
+    lat = numpy.asarray(lat, dtype=numpy.float64)
+    lng = numpy.asarray(lng, dtype=numpy.float64)
+    mask = (lat >= south) & (lat <= north)
+
+    if west <= east:
+        return mask & (lng >= west) & (lng <= east)
+    return mask & ((lng >= west) | (lng <= east))
+
+
+def _object_array(values):
+    # numpy.array() would turn a list of strings into a fixed width string array
+    array = numpy.empty(len(values), dtype=object)
+    array[:] = values
+    return array
@@ -14,70 +14,505 @@
 # limitations under the License.
 ##
 
-from googler.utils.http import get_headers
+from googler.maps.address import canonical_key, normalize_address
+from googler.utils import decode, lazy, metrics
+from googler.utils.singleflight import SingleFlight
 
-import requests
+import collections
+import hashlib
+import itertools
+import sys
+import time
+
+# Imported on first use, to keep importing this module cheap
+ElementTree = lazy.module('xml.etree.ElementTree')
+futures = lazy.module('concurrent.futures')
+http = lazy.module('googler.utils.http')
+requests = lazy.module('requests')
 
 # Base URL for the Geocoding API
 API_URL = 'maps.googleapis.com/maps/api/geocode'
 
+# Default number of concurrent requests made by get_geocodes()
+DEFAULT_CONCURRENCY = 10
+
+# Size of the chunks XML responses are read and parsed in
+XML_CHUNK_SIZE = 16 * 1024
+
+# Lookups currently in flight, for coalescing identical ones
+_flights = SingleFlight()
+
+# Tuples of address component types, shared by all geocodes
+_component_types = {}
+
 
 class Geocode(object):
+    """
+    A single geocode.
+
+    Only the fields exposed are kept, not the decoded result they were read
+    from. Address components are packed into tuples, and only decoded into
+    dicts again when address_components is accessed.
+    """
+    __slots__ = ('latitude', 'longitude', 'formatted_address', '_components')
+
     def __init__(self, result):
-        self.address_components = result.get('address_components')
+        location = result['geometry']['location']
+        components = result.get('address_components')
+        self.latitude = location['lat']
+        self.longitude = location['lng']
         self.formatted_address = result.get('formatted_address')
-        self.latitude = result['geometry']['location']['lat']
-        self.longitude = result['geometry']['location']['lng']
+        self._components = None
+
+        if components is not None:
+            self._components = tuple(_pack_component(c) for c in components)
 
     def __repr__(self):
         return '<Geocode: %f %f>' % (self.latitude, self.longitude)
 
+    @property
+    def address_components(self):
+        if self._components is None:
+            return None
+
+        return [{'long_name': long_name, 'short_name': short_name, 'types': list(types)}
+                for long_name, short_name, types in self._components]
+
+    def get_component(self, type_, short=False):
+        """
+        Get the name of the first address component of a specific type.
+
+        :param type_: Component type, e.g. "locality" or "postal_code"
+        :param short: Return the short name instead of the long name
+        :return: Component name, or None
+        """
+        for long_name, short_name, types in self._components or ():
+            if type_ in types:
+                return short_name if short else long_name
+
+        return None
+
 
 class GeocodeResult(object):
-    def __init__(self, data):
-        self.status = data['status']
-        self.error_message = None
-        self.results = []
+    """
+    The result of a Geocoding lookup.
 
-        if self.status != 'OK':
-            self.error_message = data['error_message']
+    The decoded response is not kept: only the status and a compact Geocode
+    per result, so viewports, types and the like can be freed right away.
+    """
+    __slots__ = ('status', 'error_message', '_geocodes')
 
-        for result in data['results']:
-            self.results.append(Geocode(result))
+    def __init__(self, data):
+        self.status = data['status']
+        self.error_message = data.get('error_message') if self.status != 'OK' else None
+        self._geocodes = tuple(Geocode(result) for result in data['results'])
 
     def __iter__(self):
-        return self.results.__iter__()
+        return iter(self._geocodes)
 
     def __len__(self):
         if self.status != 'OK':
             return 0
-        return len(self.results)
+        return len(self._geocodes)
+
+    def __getitem__(self, index):
+        return self._geocodes[index]
 
+    @property
+    def results(self):
+        return list(self._geocodes)
 
-def get_geocode(address, api_key, format='json', use_tls=True):
+    @property
+    def first(self):
+        """
+        The first geocode, or None if there are no results.
+        """
+        return self._geocodes[0] if self._geocodes else None
+
+
+def get_geocode(address, api_key, format='json', use_tls=True, transport=None, cache=None,
+                limiter=None, exclude=None, coalesce=True, hedge=None):
     """
     Perform a Geocoding lookup (Latitude/Longitude).
 
+    If a rate limiter is given, the request waits for it, and requests rejected
+    with OVER_QUERY_LIMIT are retried after the limiter's backoff delay.
+
+    Unless `coalesce` is disabled, concurrent lookups of the same address share
+    a single request and its result.
+
+    The address is normalized (see googler.maps.address) before anything else,
+    and the cache and request coalescing use its canonical key, so different
+    spellings of an address share results.
+
+    If a Hedger is given, a request which is slow compared to the recently
+    observed latency is sent a second time, and the first answer is taken.
+
     :param address: Address to geocode
     :param api_key: API key
     :param format: Output format. Can be "json" or "xml"
     :param use_tls: Specifies whether the request is made with https
+    :param transport: Transport to use (optional); defaults to the shared transport
+    :param cache: GeocodeCache to look up and store responses in (optional)
+    :param limiter: RateLimiter to pass requests through (optional)
+    :param exclude: Result fields to drop from the decoded response before it is cached, e.g.
+                    ("address_components",) (optional); this saves memory, not parsing time
+    :param coalesce: Specifies whether concurrent identical lookups share one request
+    :param hedge: Hedger to duplicate slow requests with (optional)
     :return:
     """
+    with metrics.trace('geocode') as event:
+        address = normalize_address(address)
+        url, params = _build_request(address, api_key, format, use_tls)
+
+        if cache is not None:
+            data = cache.get(address, api_key, format, exclude)
+
+            if data is not None:
+                event.cache = 'hit'
+                event.status = data.get('status')
+                return GeocodeResult(data)
+
+            event.cache = 'miss'
+
+        if transport is None:
+            transport = http.get_default_transport()
+
+        args = (address, api_key, format, url, params, transport, cache, limiter, exclude, hedge)
+
+        if coalesce:
+            key = (url, _request_key(address, api_key, format, exclude))
+            result = _flights.do(key, _fetch, *args)
+        else:
+            result = _fetch(*args)
+
+        if result is not None:
+            event.status = result.status
+
+        return result
+
+
+def get_geocodes(addresses, api_key, format='json', use_tls=True, concurrency=DEFAULT_CONCURRENCY,
+                 **kwargs):
+    """
+    Perform Geocoding lookups for many addresses concurrently.
+
+    This is a generator yielding one item per address, in input order. Addresses
+    are consumed lazily and at most `concurrency` requests are in flight at any
+    time, so arbitrarily large iterables can be processed in constant memory.
+
+    A failing lookup does not abort the batch: its item is the exception that was
+    raised instead of a GeocodeResult (or None, as returned by get_geocode() when
+    the request failed).
+
+    Further keyword arguments (transport, cache, limiter, ...) are passed on to
+    get_geocode() and are shared by all lookups of the batch. To avoid discarding
+    connections, the transport's pool size should be at least as large as
+    `concurrency`.
+
+    :param addresses: Iterable of addresses to geocode
+    :param api_key: API key
+    :param format: Output format. Can be "json" or "xml"
+    :param use_tls: Specifies whether the requests are made with https
+    :param concurrency: Maximum number of requests in flight
+    :return: Generator of GeocodeResult objects, None or exceptions
+    """
+    if concurrency < 1:
+        raise ValueError('concurrency must be at least 1')
+
+    if kwargs.get('transport') is None:
+        kwargs['transport'] = http.get_default_transport()
+
+    # Keep some more lookups queued than there are workers, so that a slow
+    # lookup at the head of the queue does not leave the workers idle.
+    window = concurrency * 2
+    pending = collections.deque()
+    executor = futures.ThreadPoolExecutor(max_workers=concurrency)
+
+    try:
+        for address in addresses:
+            pending.append(executor.submit(_get_geocode_or_error, address, api_key,
+                                           format, use_tls, kwargs))
+
+            if len(pending) >= window:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def _get_geocode_or_error(address, api_key, format, use_tls, kwargs):
+    """
+    Call get_geocode() and return the raised exception instead of propagating it.
+    """
+    try:
+        return get_geocode(address, api_key, format, use_tls, **kwargs)
+    except Exception as e:
+        return e
+
+
+def _fetch(address, api_key, format, url, params, transport, cache, limiter, exclude,
+           hedge=None):
+    """
+    Perform the request of a Geocoding lookup and store the response in the cache.
+
+    :return: GeocodeResult object, or None if the request has failed
+    """
+    event = metrics.current_event()
+    attempt = 0
+
+    while True:
+        try:
+            if hedge is not None:
+                # The requests may be made in other threads, so the event is not passed on
+                data = hedge.call(_request, url, params, transport, format, exclude, limiter, None)
+            else:
+                data = _request(url, params, transport, format, exclude, limiter, event)
+        except (requests.RequestException, ValueError) as e:
+            # Server errors and bodies which are no Geocoding response fail the request
+            if event is not None:
+                event.error = type(e).__name__
+            return None
+
+        if limiter is None:
+            break
+        elif data.get('status') != 'OVER_QUERY_LIMIT':
+            limiter.recover()
+            break
+        elif attempt >= limiter.max_retries:
+            # Still rejected; the rate must not recover
+            break
+
+        time.sleep(limiter.throttle(attempt))
+        attempt += 1
+
+        if event is not None:
+            event.retries += 1
+
+    if cache is not None:
+        cache.set(address, api_key, format, data, exclude)
+
+    return GeocodeResult(data)
+
+
+def _request(url, params, transport, format, exclude, limiter, event):
+    """
+    Perform a single Geocoding request.
+
+    :raises: requests.RequestException if the request has failed, ValueError if the
+             response cannot be decoded
+    :return: Decoded response
+    """
+    if limiter is not None:
+        limiter.acquire()
+
+    if format == 'xml':
+        # Parse the body while it is received instead of buffering it
+        r = transport.get(url, params=params, stream=True)
+    else:
+        r = transport.get(url, params=params)
+
+    # The transport hands 5xx responses back once its retries are used up
+    if r.status_code >= 500:
+        raise requests.HTTPError('%d Server Error' % r.status_code, response=r)
+
+    with metrics.timed('parse'):
+        if format == 'xml':
+            return _decode_response(_count_received(r.iter_content(XML_CHUNK_SIZE), event),
+                                    format, exclude)
+
+        return _decode_response(r.content, format, exclude)
+
+
+def _count_received(chunks, event):
+    """
+    Add the size of streamed response chunks to an event while passing them on.
+    """
+    for chunk in chunks:
+        if event is not None:
+            event.bytes_received += len(chunk)
+        yield chunk
+
+
+def _request_key(address, api_key, format, exclude=None):
+    """
+    Build a key identifying the response to a lookup.
+
+    The address is reduced to its canonical key. Responses with fields dropped
+    are kept apart from complete ones, and the API key is only included as a hash.
+
+    :return: Key string
+    """
+    scope = hashlib.sha1((api_key or '').encode('utf-8')).hexdigest()[:16]
+    address = canonical_key(address)
+
+    if exclude:
+        format = '%s-%s' % (format, ','.join(sorted(exclude)))
+
+    return '%s:%s:%s' % (scope, format, address)
+
+
+def _build_request(address, api_key, format, use_tls):
+    """
+    Build URL and query parameters for a Geocoding request.
+
+    :return: Tuple of URL and parameters dict
+    """
     if format not in ('json', 'xml'):
         raise AttributeError('format argument must be "json" or "xml"')
 
     url = 'https' if use_tls else 'http'
     url += '://%s/%s' % (API_URL, format)
-    headers = get_headers()
     params = {'address': address}
 
-    try:
-        r = requests.get(url, params=params, headers=headers)
-    except requests.RequestException as e:
-        return None
+    if api_key:
+        params['key'] = api_key
+
+    return url, params
+
+
+def _decode_response(content, format, exclude=None):
+    """
+    Decode the body of a Geocoding response.
+
+    :param content: Response body (bytes); XML bodies may also be an iterable of chunks
+    :param format: Output format the request was made with
+    :param exclude: Result fields to drop once the body has been decoded (optional)
+    :raises: ValueError if the body is not a Geocoding response
+    :return: Decoded response in the structure of the JSON format
+    """
+    if format == 'json':
+        data = decode.loads(content)
+
+        if not isinstance(data, dict) or 'status' not in data:
+            raise ValueError('Not a Geocoding response')
     else:
-        if format == 'json':
-            return GeocodeResult(r.json())
-        else:
-            raise NotImplementedError('xml support is currently not available')
\ No newline at end of file
+        data = _decode_xml((content,) if isinstance(content, bytes) else content)
+
+    # The fields are parsed anyway: a parser hook dropping them would make the
+    # stdlib parser much slower, and orjson has none
+    if exclude:
+        for result in data.get('results', ()):
+            for field in exclude:
+                result.pop(field, None)
+
+    return data
+
+
+def _decode_xml(chunks):
+    """
+    Decode a XML response incrementally into the structure of the JSON format.
+
+    Each <result> element is converted as soon as it is complete and then
+    discarded, so the document is never held in memory as a whole.
+
+    :param chunks: Iterable of response body chunks (bytes)
+    :raises: ValueError if the body is not a Geocoding response
+    :return: Decoded response
+    """
+    data = {'results': []}
+    parser = ElementTree.XMLPullParser(events=('start', 'end'))
+    root = None
+    depth = 0
+
+    try:
+        for chunk in itertools.chain(chunks, (None,)):
+            if chunk is None:
+                parser.close()
+            else:
+                parser.feed(chunk)
+
+            for event, elem in parser.read_events():
+                if event == 'start':
+                    if root is None:
+                        # Error pages of proxies and the like are no responses
+                        if elem.tag != 'GeocodeResponse':
+                            raise ValueError('Not a Geocoding response: <%s>' % elem.tag)
+                        root = elem
+                    depth += 1
+                    continue
+
+                depth -= 1
+
+                # Only handle direct children of <GeocodeResponse>
+                if depth != 1:
+                    continue
+
+                if elem.tag == 'result':
+                    data['results'].append(_decode_xml_result(elem))
+                elif elem.tag in ('status', 'error_message'):
+                    data[elem.tag] = elem.text
+
+                root.clear()
+    except ElementTree.ParseError as e:
+        raise ValueError('Malformed Geocoding response: %s' % e)
+
+    if 'status' not in data:
+        raise ValueError('Geocoding response without status')
+
+    return data
+
+
+def _decode_xml_result(elem):
+    """
+    Convert a <result> element.
+    """
+    result = {
+        'types': [t.text for t in elem.findall('type')],
+        'formatted_address': elem.findtext('formatted_address'),
+        'address_components': [{
+            'long_name': c.findtext('long_name'),
+            'short_name': c.findtext('short_name'),
+            'types': [t.text for t in c.findall('type')]
+        } for c in elem.findall('address_component')]
+    }
+
+    for name in ('place_id', 'partial_match'):
+        value = elem.findtext(name)
+
+        if value is not None:
+            result[name] = value if name != 'partial_match' else value == 'true'
+
+    geometry = elem.find('geometry')
+
+    if geometry is not None:
+        result['geometry'] = {
+            'location': _decode_xml_point(geometry.find('location')),
+            'location_type': geometry.findtext('location_type')
+        }
+
+        for name in ('viewport', 'bounds'):
+            box = geometry.find(name)
+
+            if box is not None:
+                result['geometry'][name] = {
+                    'northeast': _decode_xml_point(box.find('northeast')),
+                    'southwest': _decode_xml_point(box.find('southwest'))
+                }
+
+    return result
+
+
+def _decode_xml_point(elem):
+    return {'lat': float(elem.findtext('lat')), 'lng': float(elem.findtext('lng'))}
+
+
+def _pack_component(component):
+    """
+    Pack an address component into a (long_name, short_name, types) tuple.
+
+    There are only a few distinct combinations of types, so one tuple of each
+    is shared by all components.
+    """
+    types = tuple(component.get('types', ()))
+    return (component.get('long_name'), component.get('short_name'),
+            _component_types.setdefault(types, types))
+
+
+if __name__ == '__main__':
+    from googler.maps.cli import main
+    sys.exit(main())
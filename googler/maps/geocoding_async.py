@@ -0,0 +1,111 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps.address import normalize_address
+from googler.maps.geocoding import GeocodeResult, _build_request, _decode_response, _request_key
+from googler.utils.aio import REQUEST_ERRORS, AsyncSingleFlight, get_default_async_transport
+
+import asyncio
+
+"""
+This module implements coroutine versions of the functions in
+googler.maps.geocoding. It requires Python 3.5 or higher and aiohttp.
+"""
+
+# Lookups currently in flight, for coalescing identical ones
+_flights = AsyncSingleFlight()
+
+
+async def get_geocode_async(address, api_key, format='json', use_tls=True, transport=None,
+                            cache=None, limiter=None, exclude=None, coalesce=True):
+    """
+    Perform a Geocoding lookup (Latitude/Longitude) without blocking the event loop.
+
+    :param address: Address to geocode
+    :param api_key: API key
+    :param format: Output format. Can be "json" or "xml"
+    :param use_tls: Specifies whether the request is made with https
+    :param transport: AsyncTransport to use (optional); defaults to the shared transport
+    :param cache: GeocodeCache to look up and store responses in (optional)
+    :param limiter: RateLimiter to pass requests through (optional)
+    :param exclude: Result fields to drop from the decoded response before it is cached, e.g.
+                    ("address_components",) (optional); this saves memory, not parsing time
+    :param coalesce: Specifies whether concurrent identical lookups share one request
+    :return: GeocodeResult object, or None if the request has failed
+    """
+    address = normalize_address(address)
+    url, params = _build_request(address, api_key, format, use_tls)
+
+    if cache is not None:
+        data = cache.get(address, api_key, format, exclude)
+
+        if data is not None:
+            return GeocodeResult(data)
+
+    if transport is None:
+        transport = get_default_async_transport()
+
+    args = (address, api_key, format, url, params, transport, cache, limiter, exclude)
+
+    if coalesce:
+        key = (url, _request_key(address, api_key, format, exclude))
+        return await _flights.do(key, _fetch, *args)
+    else:
+        return await _fetch(*args)
+
+
+async def _fetch(address, api_key, format, url, params, transport, cache, limiter, exclude):
+    """
+    Perform the request of a Geocoding lookup and store the response in the cache.
+
+    :return: GeocodeResult object, or None if the request has failed
+    """
+    attempt = 0
+
+    while True:
+        if limiter is not None:
+            await asyncio.sleep(limiter.reserve())
+
+        try:
+            r = await transport.get(url, params=params)
+        except REQUEST_ERRORS:
+            return None
+
+        # An outage of the API is answered with 5xx responses
+        if r.status_code >= 500:
+            return None
+
+        try:
+            data = _decode_response(r.content, format, exclude)
+        except ValueError:
+            return None
+
+        if limiter is None:
+            break
+        elif data.get('status') != 'OVER_QUERY_LIMIT':
+            limiter.recover()
+            break
+        elif attempt >= limiter.max_retries:
+            # Still rejected; the rate must not recover
+            break
+
+        await asyncio.sleep(limiter.throttle(attempt))
+        attempt += 1
+
+    if cache is not None:
+        cache.set(address, api_key, format, data, exclude)
+
+    return GeocodeResult(data)
@@ -0,0 +1,256 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+import math
+import threading
+
+"""
+This module implements a spatial index over geocodes, for answering proximity
+queries locally instead of through the API.
+"""
+
+# Mean earth radius in meters
+EARTH_RADIUS = 6371008.8
+
+# Length of one degree of latitude in meters
+METERS_PER_DEGREE = EARTH_RADIUS * math.pi / 180
+
+# Default grid cell size in degrees (about 1.1 km of latitude)
+DEFAULT_CELL_SIZE = 0.01
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """
+    Calculate the great-circle distance between two points.
+
+    :param lat1: Latitude of the first point
+    :param lng1: Longitude of the first point
+    :param lat2: Latitude of the second point
+    :param lng2: Longitude of the second point
+    :return: Distance in meters
+    """
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialIndex(object):
+    """
+    A grid index over the coordinates of geocodes.
+
+    Geocodes are filed into cells of `cell_size` degrees, so nearest neighbour
+    and bounding box queries only look at the cells around the query instead
+    of every geocode. Entries are added and removed incrementally, each under
+    a key (adding a key again replaces its geocode).
+
+    Any object with `latitude` and `longitude` attributes can be indexed.
+
+    If `validate` is set, it is called with the key of every entry before it
+    is returned by a query; entries for which it returns False are dropped
+    from the index instead. It must not call the index itself.
+    """
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE, validate=None):
+        """
+        :param cell_size: Grid cell size in degrees
+        :param validate: Function telling whether an entry is still valid (optional)
+        """
+        self.cell_size = cell_size
+        self.validate = validate
+        self._columns = int(math.ceil(360.0 / cell_size))
+        self._rows = int(math.ceil(180.0 / cell_size))
+        self._cells = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _cell(self, lat, lng):
+        row = min(self._rows - 1, int(math.floor((lat + 90.0) / self.cell_size)))
+        column = int(math.floor((lng + 180.0) / self.cell_size)) % self._columns
+        return row, column
+
+    def add(self, key, geocode):
+        """
+        Add a geocode to the index.
+
+        :param key: Key of the entry
+        :param geocode: Geocode object
+        """
+        cell = self._cell(geocode.latitude, geocode.longitude)
+
+        with self._lock:
+            self._remove(key)
+            self._cells.setdefault(cell, {})[key] = geocode
+            self._entries[key] = cell
+
+    def remove(self, key):
+        """
+        Remove an entry from the index, if present.
+
+        :param key: Key of the entry
+        """
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        with self._lock:
+            self._cells.clear()
+            self._entries.clear()
+
+    def _remove(self, key):
+        cell = self._entries.pop(key, None)
+
+        if cell is not None:
+            entries = self._cells[cell]
+            del entries[key]
+
+            if not entries:
+                del self._cells[cell]
+
+    def nearest(self, latitude, longitude, max_distance=None):
+        """
+        Find the indexed geocode nearest to a point.
+
+        :param latitude: Latitude of the point
+        :param longitude: Longitude of the point
+        :param max_distance: Maximum distance in meters (optional)
+        :return: Tuple of geocode and distance in meters, or None
+        """
+        best = None
+        best_distance = max_distance if max_distance is not None else float('inf')
+        row, column = self._cell(latitude, longitude)
+        stale = []
+
+        with self._lock:
+            radius = 0
+
+            while self._cells:
+                # Once a ring holds more cells than are populated, a scan over
+                # all populated cells is cheaper than growing the ring further
+                scan = (2 * radius + 1) ** 2 > len(self._cells)
+                cells = self._cells.values() if scan else self._ring(row, column, radius)
+
+                for entries in cells:
+                    for key, geocode in entries.items():
+                        distance = haversine(latitude, longitude, geocode.latitude, geocode.longitude)
+
+                        if distance > best_distance:
+                            continue
+
+                        # Only candidates are validated, not every entry looked at
+                        if self.validate is not None and not self.validate(key):
+                            stale.append(key)
+                        else:
+                            best, best_distance = geocode, distance
+
+                if scan or self._ring_distance(latitude, radius) > best_distance:
+                    break
+
+                radius += 1
+
+            for key in stale:
+                self._remove(key)
+
+        if best is None:
+            return None
+        return best, best_distance
+
+    def within(self, south, west, north, east):
+        """
+        Find all indexed geocodes within a bounding box.
+
+        The box may cross the antimeridian, in which case `west` is larger than `east`.
+
+        :param south: Southern latitude
+        :param west: Western longitude
+        :param north: Northern latitude
+        :param east: Eastern longitude
+        :return: List of geocodes
+        """
+        first_row, first_column = self._cell(south, west)
+        last_row, last_column = self._cell(north, east)
+
+        if west > east and first_column == last_column:
+            # The box wraps around the globe, leaving a gap within one column
+            columns = self._columns
+        else:
+            columns = (last_column - first_column) % self._columns + 1
+
+        found = []
+        stale = []
+
+        with self._lock:
+            if (last_row - first_row + 1) * columns > len(self._cells):
+                cells = self._cells.values()
+            else:
+                cells = [self._cells.get((row, (first_column + i) % self._columns))
+                         for row in range(first_row, last_row + 1) for i in range(columns)]
+
+            for entries in cells:
+                for key, geocode in (entries or {}).items():
+                    if south <= geocode.latitude <= north and _in_range(geocode.longitude, west, east):
+                        if self.validate is not None and not self.validate(key):
+                            stale.append(key)
+                        else:
+                            found.append(geocode)
+
+            for key in stale:
+                self._remove(key)
+
+        return found
+
+    def _ring(self, row, column, radius):
+        """
+        Return the populated cells at Chebyshev distance `radius` from a cell.
+        """
+        cells = []
+
+        for r in range(max(0, row - radius), min(self._rows - 1, row + radius) + 1):
+            if abs(r - row) == radius:
+                offsets = range(-radius, radius + 1)
+            else:
+                offsets = (-radius, radius) if radius else (0,)
+
+            for offset in offsets:
+                entries = self._cells.get((r, (column + offset) % self._columns))
+
+                if entries:
+                    cells.append(entries)
+
+        return cells
+
+    def _ring_distance(self, latitude, radius):
+        """
+        Return a lower bound of the distance from a point to any cell outside
+        the ring of `radius` around its cell.
+        """
+        # Longitude degrees shrink towards the poles, so use the narrowest
+        # latitude the next ring can reach
+        reach = radius * self.cell_size
+        lat = min(90.0, abs(latitude) + reach + self.cell_size)
+        return reach * METERS_PER_DEGREE * math.cos(math.radians(lat))
+
+
+def _in_range(longitude, west, east):
+    if west <= east:
+        return west <= longitude <= east
+    return longitude >= west or longitude <= east
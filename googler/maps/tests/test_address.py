@@ -0,0 +1,70 @@
+# coding: utf-8
+
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps import geocoding
+from googler.maps.cache import GeocodeCache
+
+import unittest
+
+
+class TestAddress(unittest.TestCase):
+    """
+    Test case to test address normalization and canonical keys.
+    """
+    def test_normalize(self):
+        self.assertEqual(geocoding.normalize_address(u'  1600\tAmphitheatre Pkwy \n'),
+                         u'1600 Amphitheatre Pkwy')
+        # Fullwidth digits and compatibility characters are unified
+        self.assertEqual(geocoding.normalize_address(u'１６００ Amphitheatre Pkwy'),
+                         u'1600 Amphitheatre Pkwy')
+
+    def test_canonical_key(self):
+        spellings = (
+            u'1600 Amphitheatre Parkway, Mountain View, CA',
+            u'1600 amphitheatre pkwy, mountain view, ca',
+            u'1600 Amphitheatre Pkwy., Mountain View,  CA',
+            u'  1600 AMPHITHEATRE PKWY; , Mountain View , CA ',
+        )
+        keys = set(geocoding.canonical_key(spelling) for spelling in spellings)
+
+        self.assertEqual(keys, set([u'1600 amphitheatre parkway, mountain view, ca']))
+
+    def test_abbreviations_and_punctuation(self):
+        self.assertEqual(geocoding.canonical_key(u"123 O'Farrell St. #4, San Francisco"),
+                         u'123 ofarrell street 4, san francisco')
+        self.assertEqual(geocoding.canonical_key(u'10 N Main St - Winston-Salem'),
+                         u'10 north main street winston-salem')
+        self.assertEqual(geocoding.canonical_key(u'Straße des 17. Juni, Berlin'),
+                         u'strasse des 17 juni, berlin')
+
+    def test_ambiguous_abbreviations(self):
+        # State codes are only expanded within the street
+        self.assertEqual(geocoding.canonical_key(u'12 Hartford Ct, Hartford, CT'),
+                         u'12 hartford court, hartford, ct')
+        self.assertEqual(geocoding.canonical_key(u'Mt Vernon, NE'), u'mount vernon, ne')
+        self.assertEqual(geocoding.canonical_key(u'Hartford CT'), u'hartford ct')
+        self.assertNotEqual(geocoding.canonical_key(u'Hartford Ct'),
+                            geocoding.canonical_key(u'Hartford, CT'))
+
+    def test_cache_key(self):
+        self.assertEqual(GeocodeCache.make_key(u'5th Ave, New York', 'key', 'json'),
+                         GeocodeCache.make_key(u'5th Avenue,  New York', 'key', 'json'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps import cli, geocoding
+
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class _Interrupted(Exception):
+    pass
+
+
+class TestCli(unittest.TestCase):
+    """
+    Test case to test the bulk geocoding command line interface.
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.input = os.path.join(self.directory, 'addresses.csv')
+        self.checkpoint = os.path.join(self.directory, 'checkpoint.json')
+        self.looked_up = []
+        self.fail_at = None
+        self.get_geocode = geocoding.get_geocode
+        geocoding.get_geocode = self.fake_get_geocode
+
+        with io.open(self.input, 'w', encoding='utf-8', newline='') as f:
+            f.write(u'id,address\n')
+
+            for i in range(20):
+                f.write(u'%d,Street %d\n' % (i, i))
+
+    def tearDown(self):
+        geocoding.get_geocode = self.get_geocode
+        shutil.rmtree(self.directory)
+
+    def fake_get_geocode(self, address, api_key, format='json', use_tls=True, **kwargs):
+        if address == self.fail_at:
+            raise _Interrupted(address)
+
+        self.looked_up.append(address)
+
+        if address == 'Street 3':
+            return geocoding.GeocodeResult({'status': 'ZERO_RESULTS', 'results': []})
+
+        return geocoding.GeocodeResult({'status': 'OK', 'results': [{
+            'formatted_address': address.upper(),
+            'geometry': {'location': {'lat': 1.5, 'lng': 2.5}}
+        }]})
+
+    def run_cli(self, output, *args):
+        argv = ['--key', 'key', '--input', self.input, '--output', output, '-c', '1']
+        return cli.main(argv + list(args))
+
+    def test_ndjson_output(self):
+        output = os.path.join(self.directory, 'out.ndjson')
+        self.assertEqual(self.run_cli(output), 0)
+
+        with io.open(output, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+
+        self.assertEqual([r['address'] for r in records], ['Street %d' % i for i in range(20)])
+        self.assertEqual(records[0]['formatted_address'], 'STREET 0')
+        self.assertEqual(records[0]['latitude'], 1.5)
+        self.assertEqual(records[3]['status'], 'ZERO_RESULTS')
+
+    def test_resume(self):
+        output = os.path.join(self.directory, 'out.csv')
+        self.fail_at = 'Street 13'
+
+        # get_geocodes() reports errors per item, so make the failure escape
+        # the batch to interrupt the run
+        get_geocodes = geocoding.get_geocodes
+
+        def interrupted_get_geocodes(addresses, *args, **kwargs):
+            for result in get_geocodes(addresses, *args, **kwargs):
+                if isinstance(result, _Interrupted):
+                    raise result
+                yield result
+
+        geocoding.get_geocodes = interrupted_get_geocodes
+
+        try:
+            self.assertRaises(_Interrupted, self.run_cli, output, '--checkpoint', self.checkpoint,
+                              '--checkpoint-interval', '5')
+        finally:
+            geocoding.get_geocodes = get_geocodes
+
+        with io.open(self.checkpoint, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['rows'], 10)
+
+        self.fail_at = None
+        del self.looked_up[:]
+        self.assertEqual(self.run_cli(output, '--checkpoint', self.checkpoint), 0)
+
+        self.assertEqual(self.looked_up, ['Street %d' % i for i in range(10, 20)])
+
+        with io.open(output, encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+
+        self.assertEqual([r['address'] for r in rows], ['Street %d' % i for i in range(20)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps import geocoding, spatial
+
+import math
+import unittest
+
+try:
+    from googler.maps import columnar
+except ImportError:
+    columnar = None
+
+
+def _result(lat, lng, address):
+    return geocoding.GeocodeResult({'status': 'OK', 'results': [{
+        'formatted_address': address,
+        'geometry': {'location': {'lat': lat, 'lng': lng}}
+    }]})
+
+
+@unittest.skipIf(columnar is None, 'numpy is not installed')
+class TestColumnar(unittest.TestCase):
+    """
+    Test case to test columnar export and vectorized distance calculations.
+    """
+    def setUp(self):
+        self.columns = columnar.GeocodeColumns.from_results([
+            _result(48.8566, 2.3522, 'Paris'),
+            _result(51.5074, -0.1278, 'London'),
+            geocoding.GeocodeResult({'status': 'ZERO_RESULTS', 'results': []}),
+            None,
+            _result(52.5200, 13.4050, 'Berlin'),
+        ])
+
+    def test_columns(self):
+        self.assertEqual(len(self.columns), 5)
+        self.assertEqual(self.columns.latitude.dtype.name, 'float64')
+        self.assertEqual(list(self.columns.status), ['OK', 'OK', 'ZERO_RESULTS', 'ERROR', 'OK'])
+        self.assertEqual(self.columns.formatted_address[2], None)
+        self.assertTrue(math.isnan(self.columns.latitude[3]))
+
+    def test_distances_match_scalar(self):
+        distances = self.columns.distances_to(48.8566, 2.3522)
+
+        self.assertAlmostEqual(distances[0], 0.0)
+        self.assertAlmostEqual(distances[1], spatial.haversine(48.8566, 2.3522, 51.5074, -0.1278), places=3)
+        self.assertTrue(math.isnan(distances[2]))
+
+    def test_distance_matrix(self):
+        lat, lng = self.columns.latitude[[0, 1, 4]], self.columns.longitude[[0, 1, 4]]
+        matrix = columnar.distance_matrix(lat, lng)
+
+        self.assertEqual(matrix.shape, (3, 3))
+        self.assertAlmostEqual(matrix[0, 0], 0.0)
+        self.assertAlmostEqual(matrix[1, 2], matrix[2, 1])
+        self.assertAlmostEqual(matrix[0, 2], spatial.haversine(48.8566, 2.3522, 52.52, 13.405), places=3)
+
+    def test_within(self):
+        found = self.columns.within(48, -1, 52, 3)
+
+        self.assertEqual(list(found.formatted_address), ['Paris', 'London'])
+        self.assertEqual(list(columnar.bbox_mask([0, 0, 0], [179.5, -179.5, 0], -1, 179, 1, -179)),
+                         [True, True, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
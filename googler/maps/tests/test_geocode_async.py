@@ -0,0 +1,90 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps import geocoding
+
+import asyncio
+import unittest
+
+try:
+    from aiohttp import web
+    from googler.maps.geocoding_async import get_geocode_async
+    from googler.utils.aio import AsyncTransport
+except ImportError:
+    web = None
+
+
+@unittest.skipIf(web is None, 'aiohttp is not installed')
+class TestGeocodeAsync(unittest.TestCase):
+    """
+    Test case to test the coroutine version of get_geocode against a local server.
+    """
+    def setUp(self):
+        self.api_url = geocoding.API_URL
+        self.requests = []
+
+    def tearDown(self):
+        geocoding.API_URL = self.api_url
+
+    async def handle_geocode(self, request):
+        self.requests.append(dict(request.query))
+
+        if request.query['address'] == 'unavailable':
+            return web.Response(status=503, text='<html>Service Unavailable</html>')
+
+        return web.json_response({'status': 'OK', 'results': [{
+            'formatted_address': request.query['address'],
+            'geometry': {'location': {'lat': 37.4229181, 'lng': -122.0854212}}
+        }]})
+
+    async def run_lookups(self, addresses):
+        app = web.Application()
+        app.router.add_get('/maps/api/geocode/json', self.handle_geocode)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        geocoding.API_URL = '127.0.0.1:%d/maps/api/geocode' % port
+
+        try:
+            async with AsyncTransport() as transport:
+                return await asyncio.gather(*[
+                    get_geocode_async(address, 'key', use_tls=False, transport=transport)
+                    for address in addresses
+                ])
+        finally:
+            await runner.cleanup()
+
+    def test_get_geocode_async(self):
+        results = asyncio.run(self.run_lookups(['address %d' % i for i in range(5)]))
+
+        self.assertEqual(len(results), 5)
+
+        for i, result in enumerate(results):
+            self.assertTrue(isinstance(result, geocoding.GeocodeResult))
+            self.assertEqual(result.results[0].formatted_address, 'address %d' % i)
+
+        self.assertEqual(self.requests[0]['key'], 'key')
+
+    def test_server_error(self):
+        results = asyncio.run(self.run_lookups(['unavailable']))
+
+        self.assertEqual(results, [None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps import geocoding
+
+import random
+import threading
+import time
+import unittest
+
+
+class TestGeocodeBatch(unittest.TestCase):
+    """
+    Test case to test concurrent batch geocoding.
+    """
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.get_geocode = geocoding.get_geocode
+        geocoding.get_geocode = self.fake_get_geocode
+
+    def tearDown(self):
+        geocoding.get_geocode = self.get_geocode
+
+    def fake_get_geocode(self, address, api_key, format='json', use_tls=True, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            time.sleep(random.random() / 100)
+
+            if address == 'fail':
+                raise ValueError(address)
+
+            return geocoding.GeocodeResult({'status': 'OK', 'results': [{
+                'formatted_address': address,
+                'geometry': {'location': {'lat': 1.0, 'lng': 2.0}}
+            }]})
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def test_order_and_errors(self):
+        addresses = ['address %d' % i for i in range(50)]
+        addresses[7] = 'fail'
+
+        results = list(geocoding.get_geocodes(iter(addresses), 'key', transport=object(),
+                                              concurrency=4))
+
+        self.assertEqual(len(results), len(addresses))
+        self.assertTrue(isinstance(results[7], ValueError))
+
+        for address, result in zip(addresses, results):
+            if address != 'fail':
+                self.assertEqual(result.results[0].formatted_address, address)
+
+        self.assertTrue(self.max_in_flight <= 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps import geocoding
+from googler.maps.cache import GeocodeCache
+from googler.utils.tests.fakes import FakeTransport
+
+import unittest
+
+
+class TestGeocodeCache(unittest.TestCase):
+    """
+    Test case to test caching of Geocoding responses.
+    """
+    def setUp(self):
+        responses = {
+            'Amphitheatre Pkwy': {'status': 'OK', 'results': [{
+                'formatted_address': '1600 Amphitheatre Pkwy, Mountain View, CA 94043, USA',
+                'geometry': {'location': {'lat': 37.4229181, 'lng': -122.0854212}}
+            }]},
+            'Nowhere': {'status': 'ZERO_RESULTS', 'results': []},
+            'Busy': {'status': 'OVER_QUERY_LIMIT', 'results': [], 'error_message': 'Slow down'},
+            'Unknown': {'status': 'NEW_STATUS', 'results': []}
+        }
+        self.transport = FakeTransport(lambda url, params: responses[params['address']])
+        self.cache = GeocodeCache(negative_ttl=60)
+
+    def geocode(self, address, api_key='key'):
+        return geocoding.get_geocode(address, api_key, transport=self.transport, cache=self.cache)
+
+    def test_hit(self):
+        first = self.geocode('Amphitheatre Pkwy')
+        second = self.geocode('  amphitheatre   PKWY ')
+
+        self.assertEqual(len(self.transport.requests), 1)
+        self.assertEqual(second.results[0].latitude, first.results[0].latitude)
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_key_scope(self):
+        self.geocode('Amphitheatre Pkwy', 'key')
+        self.geocode('Amphitheatre Pkwy', 'other-key')
+
+        self.assertEqual(len(self.transport.requests), 2)
+
+    def test_negative_answers(self):
+        self.assertEqual(len(self.geocode('Nowhere')), 0)
+        self.assertEqual(len(self.geocode('Nowhere')), 0)
+        self.assertEqual(len(self.transport.requests), 1)
+
+    def test_errors_are_not_cached(self):
+        self.assertEqual(self.geocode('Busy').error_message, 'Slow down')
+        self.geocode('Busy')
+
+        self.assertEqual(len(self.transport.requests), 2)
+
+    def test_unknown_status_is_not_cached(self):
+        self.geocode('Unknown')
+        self.geocode('Unknown')
+
+        self.assertEqual(len(self.transport.requests), 2)
+        self.assertEqual(len(self.cache.backend), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps import geocoding
+from googler.utils.hedge import Hedger
+from googler.utils.tests.fakes import FakeTransport, answer_geocode
+
+import threading
+import unittest
+
+
+class TestGeocodeHedge(unittest.TestCase):
+    """
+    Test case to test hedged Geocoding lookups.
+    """
+    def test_slow_request_is_hedged(self):
+        released = threading.Event()
+
+        def answer(url, params):
+            # The first request hangs until it is released
+            if len(transport.requests) == 1:
+                released.wait(5)
+            return answer_geocode((37.4229181, -122.0854212))
+
+        transport = FakeTransport(answer)
+        hedge = Hedger(budget=1, min_samples=1)
+        hedge.observe(0.01)
+
+        result = geocoding.get_geocode('Amphitheatre Pkwy', 'key', transport=transport,
+                                       hedge=hedge)
+        released.set()
+
+        self.assertEqual(result.status, 'OK')
+        self.assertAlmostEqual(result.first.latitude, 37.4229181)
+        self.assertEqual(len(transport.requests), 2)
+        self.assertEqual(hedge.wins, 1)
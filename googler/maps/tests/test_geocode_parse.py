@@ -19,6 +19,11 @@ from googler.maps import geocoding
 import json
 import unittest
 
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
 
 class TestEncryption(unittest.TestCase):
     """
@@ -97,6 +102,51 @@ class TestEncryption(unittest.TestCase):
 
         self.assertTrue(result)
 
+    def test_lazy_decoding(self):
+        result = geocoding.GeocodeResult(self.response)
+        geocode = result.first
+
+        self.assertFalse(hasattr(result, '__dict__'))
+        self.assertFalse(hasattr(geocode, '__dict__'))
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0].formatted_address, geocode.formatted_address)
+        self.assertAlmostEqual(geocode.latitude, 37.4229181)
+        self.assertAlmostEqual(geocode.longitude, -122.0854212)
+        self.assertEqual(geocode.get_component('locality'), 'Mountain View')
+        self.assertEqual(geocode.get_component('country', short=True), 'US')
+        self.assertEqual(geocode.get_component('premise'), None)
+        self.assertEqual(geocode.address_components,
+                         self.response['results'][0]['address_components'])
+
+    @unittest.skipIf(tracemalloc is None, 'tracemalloc is not available')
+    def test_memory(self):
+        body = json.dumps(self.response)
+        count = 1000
+
+        tracemalloc.start()
+
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            responses = [json.loads(body) for i in range(count)]
+            decoded = tracemalloc.get_traced_memory()[0] - start
+
+            results = [geocoding.GeocodeResult(response) for response in responses]
+            del responses
+            kept = tracemalloc.get_traced_memory()[0] - start
+        finally:
+            tracemalloc.stop()
+
+        # About 6.2 KiB per decoded response, and 1.7 KiB per result built from it
+        self.assertEqual(len(results), count)
+        self.assertTrue(kept < decoded / 2, (kept / count, decoded / count))
+
+    def test_zero_results(self):
+        result = geocoding.GeocodeResult({'status': 'ZERO_RESULTS', 'results': []})
+
+        self.assertFalse(result)
+        self.assertEqual(result.first, None)
+        self.assertEqual(result.error_message, None)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,132 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps import geocoding
+from googler.maps.cache import GeocodeCache
+from googler.utils.tests.fakes import FakeResponse, FakeTransport
+
+import unittest
+
+RESPONSE = b'''<?xml version="1.0" encoding="UTF-8"?>
+<GeocodeResponse>
+ <status>OK</status>
+ <result>
+  <type>street_address</type>
+  <formatted_address>1600 Amphitheatre Pkwy, Mountain View, CA 94043, USA</formatted_address>
+  <address_component>
+   <long_name>1600</long_name>
+   <short_name>1600</short_name>
+   <type>street_number</type>
+  </address_component>
+  <address_component>
+   <long_name>Mountain View</long_name>
+   <short_name>Mountain View</short_name>
+   <type>locality</type>
+   <type>political</type>
+  </address_component>
+  <geometry>
+   <location>
+    <lat>37.4229181</lat>
+    <lng>-122.0854212</lng>
+   </location>
+   <location_type>ROOFTOP</location_type>
+   <viewport>
+    <southwest>
+     <lat>37.4215691</lat>
+     <lng>-122.0867702</lng>
+    </southwest>
+    <northeast>
+     <lat>37.4242671</lat>
+     <lng>-122.0840722</lng>
+    </northeast>
+   </viewport>
+  </geometry>
+  <place_id>ChIJ2eUgeAK6j4ARbn5u_wAGqWA</place_id>
+ </result>
+ <result>
+  <type>route</type>
+  <formatted_address>Amphitheatre Pkwy, Mountain View, CA, USA</formatted_address>
+  <geometry>
+   <location>
+    <lat>37.4239</lat>
+    <lng>-122.0912</lng>
+   </location>
+  </geometry>
+  <partial_match>true</partial_match>
+ </result>
+</GeocodeResponse>
+'''
+
+
+class TestGeocodeXml(unittest.TestCase):
+    """
+    Test case to test incremental parsing of XML responses.
+    """
+    def test_decode(self):
+        data = geocoding._decode_response(RESPONSE, 'xml')
+        result = data['results'][0]
+
+        self.assertEqual(data['status'], 'OK')
+        self.assertEqual(len(data['results']), 2)
+        self.assertEqual(result['types'], ['street_address'])
+        self.assertEqual(result['address_components'][1]['types'], ['locality', 'political'])
+        self.assertEqual(result['geometry']['location'], {'lat': 37.4229181, 'lng': -122.0854212})
+        self.assertEqual(result['geometry']['viewport']['northeast']['lat'], 37.4242671)
+        self.assertEqual(result['place_id'], 'ChIJ2eUgeAK6j4ARbn5u_wAGqWA')
+        self.assertTrue(data['results'][1]['partial_match'])
+
+    def test_get_geocode(self):
+        transport = FakeTransport(lambda url, params: FakeResponse(RESPONSE, chunk_size=64))
+        result = geocoding.get_geocode('1600 Amphitheatre Pkwy', 'key', format='xml', transport=transport)
+        geocode = result.first
+
+        self.assertTrue(transport.urls[0].endswith('/xml'))
+        self.assertTrue(transport.streamed[0])
+        self.assertEqual(len(result), 2)
+        self.assertEqual(geocode.formatted_address, '1600 Amphitheatre Pkwy, Mountain View, CA 94043, USA')
+        self.assertEqual(geocode.get_component('locality'), 'Mountain View')
+        self.assertAlmostEqual(geocode.longitude, -122.0854212)
+
+    def test_error(self):
+        data = geocoding._decode_response(b'<GeocodeResponse><status>REQUEST_DENIED</status>'
+                                          b'<error_message>Invalid key</error_message>'
+                                          b'</GeocodeResponse>', 'xml')
+        result = geocoding.GeocodeResult(data)
+
+        self.assertEqual(result.status, 'REQUEST_DENIED')
+        self.assertEqual(result.error_message, 'Invalid key')
+        self.assertEqual(len(result), 0)
+
+    def test_not_a_response(self):
+        for body in (b'<html><body>Service Unavailable</body></html>', b'Service Unavailable',
+                     b'<GeocodeResponse><result/></GeocodeResponse>', RESPONSE[:200]):
+            self.assertRaises(ValueError, geocoding._decode_response, body, 'xml')
+
+    def test_get_geocode_failure(self):
+        page = b'<html><body>Service Unavailable</body></html>'
+        cache = GeocodeCache()
+
+        for response in (FakeResponse(page, 503), FakeResponse(page), FakeResponse(b'Error')):
+            transport = FakeTransport(lambda url, params: response)
+
+            self.assertIsNone(geocoding.get_geocode('1600 Amphitheatre Pkwy', 'key', format='xml',
+                                                    transport=transport, cache=cache))
+
+        self.assertEqual(len(cache.backend), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
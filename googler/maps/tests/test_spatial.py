@@ -0,0 +1,139 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps.cache import SWEEP_INTERVAL, GeocodeCache
+from googler.maps.geocoding import Geocode
+from googler.maps.spatial import SpatialIndex, haversine
+from googler.utils.cache import LRUCache
+
+import random
+import unittest
+
+
+def _geocode(lat, lng, address=None):
+    return Geocode({'formatted_address': address, 'geometry': {'location': {'lat': lat, 'lng': lng}}})
+
+
+class TestSpatialIndex(unittest.TestCase):
+    """
+    Test case to test nearest neighbour and bounding box queries.
+    """
+    def setUp(self):
+        self.random = random.Random(42)
+        self.index = SpatialIndex(cell_size=0.5)
+        self.geocodes = []
+
+        for i in range(500):
+            geocode = _geocode(self.random.uniform(40, 50), self.random.uniform(-10, 10))
+            self.geocodes.append(geocode)
+            self.index.add(i, geocode)
+
+    def test_haversine(self):
+        # Paris to London
+        distance = haversine(48.8566, 2.3522, 51.5074, -0.1278)
+        self.assertTrue(343000 < distance < 344000)
+
+    def test_nearest(self):
+        for i in range(50):
+            lat, lng = self.random.uniform(38, 52), self.random.uniform(-12, 12)
+            expected = min(self.geocodes, key=lambda g: haversine(lat, lng, g.latitude, g.longitude))
+            geocode, distance = self.index.nearest(lat, lng)
+
+            self.assertTrue(geocode is expected)
+
+    def test_nearest_max_distance(self):
+        self.assertEqual(self.index.nearest(-45.0, 170.0, max_distance=1000), None)
+
+    def test_within(self):
+        found = self.index.within(44, -2, 46, 3)
+        expected = [g for g in self.geocodes if 44 <= g.latitude <= 46 and -2 <= g.longitude <= 3]
+
+        self.assertEqual(set(map(id, found)), set(map(id, expected)))
+
+    def test_antimeridian(self):
+        index = SpatialIndex()
+        index.add('fiji', _geocode(-17.7, 179.99))
+
+        self.assertEqual(len(index.within(-18, 179.9, -17, -179.9)), 1)
+        self.assertTrue(index.nearest(-17.7, -179.99)[1] < 5000)
+
+    def test_within_wrapping_box(self):
+        # West and east fall into the same column, with nearly all columns in between
+        found = self.index.within(40, 3.3, 50, 3.2)
+        expected = [g for g in self.geocodes if not 3.2 < g.longitude < 3.3]
+
+        self.assertEqual(set(map(id, found)), set(map(id, expected)))
+
+    def test_remove(self):
+        self.index.remove(0)
+        self.index.add(1, _geocode(0.0, 0.0))
+
+        self.assertEqual(len(self.index), 499)
+        self.assertTrue(self.index.nearest(0.1, 0.1)[0] is not self.geocodes[1])
+
+    def test_cache_updates_index(self):
+        backend = LRUCache()
+        cache = GeocodeCache(backend)
+        cache.set('Amphitheatre Pkwy', 'key', 'json', {'status': 'OK', 'results': [{
+            'formatted_address': '1600 Amphitheatre Pkwy, Mountain View, CA 94043, USA',
+            'geometry': {'location': {'lat': 37.4229181, 'lng': -122.0854212}}
+        }]})
+
+        cache = GeocodeCache(backend, index=SpatialIndex())
+        cache.set('Nowhere', 'key', 'json', {'status': 'ZERO_RESULTS', 'results': []})
+        cache.set('Brandenburger Tor', 'key', 'json', {'status': 'OK', 'results': [{
+            'formatted_address': 'Pariser Platz, 10117 Berlin, Germany',
+            'geometry': {'location': {'lat': 52.5162746, 'lng': 13.3777041}}
+        }]})
+
+        self.assertEqual(len(cache.index), 2)
+        geocode, distance = cache.index.nearest(37.42, -122.08)
+        self.assertEqual(geocode.formatted_address, '1600 Amphitheatre Pkwy, Mountain View, CA 94043, USA')
+
+    def test_index_follows_cache(self):
+        def response(*points):
+            return {'status': 'OK', 'results': [
+                {'geometry': {'location': {'lat': lat, 'lng': lng}}} for lat, lng in points]}
+
+        cache = GeocodeCache(LRUCache(maxsize=1), index=SpatialIndex())
+        cache.set('Berlin', 'key', 'json', response((52.52, 13.40), (52.50, 13.35)))
+
+        # Rewriting a response with fewer results drops the surplus geocodes
+        cache.set('Berlin', 'key', 'json', response((52.52, 13.40)))
+        self.assertEqual(len(cache.index), 1)
+
+        # Geocodes of evicted responses are not returned, and dropped on the way
+        cache.set('Paris', 'key', 'json', response((48.86, 2.35)))
+        self.assertEqual(cache.index.within(52, 13, 53, 14), [])
+        self.assertAlmostEqual(cache.index.nearest(52.52, 13.40)[0].latitude, 48.86)
+        self.assertEqual(len(cache.index), 1)
+
+        cache.clear()
+        self.assertEqual(len(cache.index), 0)
+        self.assertEqual(cache.index.nearest(48.86, 2.35), None)
+
+    def test_sweep(self):
+        cache = GeocodeCache(LRUCache(maxsize=10), index=SpatialIndex())
+
+        for i in range(SWEEP_INTERVAL):
+            cache.set('Address %d' % i, 'key', 'json', {'status': 'OK', 'results': [
+                {'geometry': {'location': {'lat': i * 0.001, 'lng': 0.0}}}]})
+
+        self.assertEqual(len(cache.index), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
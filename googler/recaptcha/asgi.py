@@ -0,0 +1,192 @@
+##
+# Copyright (C) 2015 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.recaptcha import captcha, captcha2
+from googler.recaptcha.captcha_async import verify_async as verify_legacy_async
+from googler.recaptcha.captcha2_async import verify_async
+from googler.recaptcha.middleware import CHALLENGE_FIELD, DEFAULT_MAX_BODY_SIZE, ENVIRON_KEY, \
+    LEGACY_RESPONSE_FIELD, RESPONSE_FIELD, FormParser, is_form_post
+
+import asyncio
+
+"""
+This module implements an ASGI middleware which verifies the captcha of form posts.
+It requires Python 3.5 or higher and aiohttp.
+"""
+
+
+class RecaptchaMiddleware(object):
+    """
+    An ASGI middleware which verifies the captcha fields of form posts.
+
+    This is the counterpart of googler.recaptcha.wsgi.RecaptchaMiddleware:
+    the request body is buffered, and the verification is started as a task
+    as soon as the reCAPTCHA 2.0 token has been received. Legacy fields are
+    only verified once the whole body has been received without a token.
+
+    The application finds the task in scope["googler.recaptcha"]; awaiting
+    it returns a RecaptchaResponse (of captcha2, or of captcha for legacy
+    fields), or None if the request has no captcha fields. It is None for
+    requests which are not verified at all.
+
+    The buffered body is replayed to the application by receive().
+    """
+    def __init__(self, app, secret_key, private_key=None, paths=None,
+                 max_body_size=DEFAULT_MAX_BODY_SIZE, transport=None, tokens=None, breaker=None):
+        """
+        :param app: ASGI application
+        :param secret_key: reCAPTCHA 2.0 secret key
+        :param private_key: Legacy reCAPTCHA private key (optional); enables legacy verification
+        :param paths: Paths to verify form posts on (optional); defaults to all paths
+        :param max_body_size: Maximum size of the request bodies which are verified
+        :param transport: AsyncTransport to use (optional); defaults to the shared transport
+        :param tokens: TokenStore to check and record tokens in (optional)
+        :param breaker: CircuitBreaker to guard the requests with (optional)
+        """
+        self.app = app
+        self.secret_key = secret_key
+        self.private_key = private_key
+        self.paths = frozenset(paths) if paths is not None else None
+        self.max_body_size = max_body_size
+        self.transport = transport
+        self.tokens = tokens
+        self.breaker = breaker
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        scope = dict(scope)
+        scope[ENVIRON_KEY] = None
+
+        if self._should_verify(scope):
+            messages, scope[ENVIRON_KEY] = await self._read_form(scope, receive)
+            receive = _replay(messages, receive)
+
+        return await self.app(scope, receive, send)
+
+    def _should_verify(self, scope):
+        if self.paths is not None and scope.get('path') not in self.paths:
+            return False
+
+        headers = dict((name.lower(), value.decode('latin-1'))
+                       for name, value in scope.get('headers', ()))
+
+        return is_form_post(scope.get('method'), headers.get(b'content-type'),
+                            headers.get(b'content-length'), self.max_body_size)
+
+    async def _read_form(self, scope, receive):
+        """
+        Buffer the request body, and start the verification as soon as the
+        reCAPTCHA 2.0 token has been received.
+
+        :return: Tuple of the received messages and the verification task
+        """
+        parser = FormParser()
+        messages = []
+        task = None
+        size = 0
+
+        while True:
+            message = await receive()
+            messages.append(message)
+
+            if message['type'] != 'http.request':
+                break
+
+            body = message.get('body', b'')
+            size += len(body)
+
+            # A body without Content-Length may turn out too large; leave it alone
+            if size > self.max_body_size:
+                if task is not None:
+                    task.cancel()
+                return messages, None
+
+            parser.feed(body)
+
+            # Legacy fields must wait, since a token may still follow them
+            if task is None and parser.has_response:
+                task = self._start(parser.values, scope)
+
+            if not message.get('more_body', False):
+                break
+
+        parser.close()
+
+        if task is None and parser.has_fields:
+            task = self._start(parser.values, scope)
+        elif task is None:
+            task = asyncio.get_event_loop().create_future()
+            task.set_result(None)
+
+        return messages, task
+
+    def _start(self, values, scope):
+        client = scope.get('client')
+        remote_ip = client[0] if client else None
+
+        return asyncio.ensure_future(verify_form_async(
+            dict(values), self.secret_key, self.private_key, remote_ip,
+            transport=self.transport, tokens=self.tokens, breaker=self.breaker))
+
+
+async def verify_form_async(values, secret_key, private_key=None, remote_ip=None, transport=None,
+                            tokens=None, breaker=None):
+    """
+    Coroutine version of googler.recaptcha.middleware.verify_form().
+
+    :param values: dict of the captcha fields found by a FormParser
+    :param secret_key: reCAPTCHA 2.0 secret key
+    :param private_key: Legacy reCAPTCHA private key (optional); without it, legacy fields are ignored
+    :param remote_ip: User IP address (optional)
+    :param transport: AsyncTransport to use (optional); defaults to the shared transport
+    :param tokens: TokenStore to check and record tokens in (optional)
+    :param breaker: CircuitBreaker to guard the request with (optional)
+    :return: captcha2.RecaptchaResponse or captcha.RecaptchaResponse object, or None
+    """
+    if RESPONSE_FIELD in values:
+        try:
+            return await verify_async(secret_key, values[RESPONSE_FIELD], remote_ip,
+                                      transport=transport, tokens=tokens, breaker=breaker)
+        except captcha2.RecaptchaError as e:
+            return captcha2.RecaptchaResponse(False, e.error_codes)
+
+    if private_key and CHALLENGE_FIELD in values and LEGACY_RESPONSE_FIELD in values:
+        try:
+            await verify_legacy_async(values[CHALLENGE_FIELD], values[LEGACY_RESPONSE_FIELD],
+                                      private_key, remote_ip, transport=transport,
+                                      breaker=breaker)
+        except captcha.RecaptchaError as e:
+            return captcha.RecaptchaResponse(False, e.error_code)
+
+        return captcha.RecaptchaResponse(True)
+
+    return None
+
+
+def _replay(messages, receive):
+    """
+    Wrap receive(), to return buffered messages first.
+    """
+    messages = list(messages)
+
+    async def replay():
+        if messages:
+            return messages.pop(0)
+        return await receive()
+
+    return replay
@@ -16,10 +16,12 @@
 # limitations under the License.
 ##
 
-from googler.utils import compat
-from googler.utils.http import get_user_agent
+from googler.utils import compat, lazy, metrics
+from googler.utils.cache import LRUCache
 
-import requests
+# Imported on first use, so rendering HTML does not load requests
+http = lazy.module('googler.utils.http')
+requests = lazy.module('requests')
 
 # Base URL for the reCAPTCHA API
 API_URL = 'www.google.com/recaptcha/api'
@@ -37,6 +39,12 @@ DISPLAY_HTML = '''
 </noscript>
 '''
 
+# Maximum number of rendered HTML fragments kept
+FRAGMENT_CACHE_SIZE = 256
+
+# Rendered HTML fragments, by arguments
+_fragments = LRUCache(maxsize=FRAGMENT_CACHE_SIZE)
+
 # Error codes and their more verbose descriptions
 ERROR_CODES = {
     'invalid-site-private-key': 'Unable to verify the private key',
@@ -92,39 +100,99 @@ def get_html(public_key, use_tls=True, error=None):
     """
     Get HTML code to display a reCAPTCHA.
 
+    The code is rendered once per combination of arguments and then served
+    from a cache.
+
     :param public_key: Public API key
     :param use_tls: Specifies whether the request is made with https
     :param error: A optional error message to display
     :return: HTML code for reCAPTCHA
     """
-    error_param = ''
+    key = (public_key, use_tls, error)
+    html = _fragments.get(key)
 
-    if error:
-        error_param = '&error=%s' % error
+    if html is None:
+        error_param = ''
 
-    context = {
-        'api_url': _build_api_url(use_tls),
-        'public_key': public_key,
-        'error_param': error_param
-    }
+        if error:
+            error_param = '&error=%s' % error
 
-    return DISPLAY_HTML % context
+        context = {
+            'api_url': _build_api_url(use_tls),
+            'public_key': public_key,
+            'error_param': error_param
+        }
 
+        html = DISPLAY_HTML % context
+        _fragments.set(key, html)
 
-def verify(challenge, response, private_key, remote_ip, use_tls=True):
+    return html
+
+
+def verify(challenge, response, private_key, remote_ip, use_tls=True, transport=None, breaker=None):
     """
     Verify the reCAPTCHA response.
 
     On success, this function returns True. Otherwise, InvalidRecaptchaSolution
     is raised.
 
+    If a CircuitBreaker is given and refuses the request, because the API has
+    been failing or too many verifications are outstanding, no request is made:
+    the response is accepted if the breaker fails open, and RecaptchaError with
+    "recaptcha-not-reachable" is raised otherwise.
+
     :param challenge: The value of recaptcha_challenge_field from the form
     :param response: The value of recaptcha_response_field from the form
     :param private_key: Private API key
     :param remote_ip: User's IP address
     :param use_tls: Specifies whether the request is made with https
+    :param transport: Transport to use (optional); defaults to the shared transport
+    :param breaker: CircuitBreaker to guard the request with (optional)
     :return: True on success
     """
+    with metrics.trace('captcha.verify') as event:
+        url, payload = _build_verify_request(challenge, response, private_key, remote_ip, use_tls)
+        headers = _build_headers()
+
+        if transport is None:
+            transport = http.get_default_transport()
+
+        if breaker is not None and not breaker.acquire():
+            event.error = 'CircuitOpen'
+
+            if breaker.fail_open:
+                return True
+            raise RecaptchaError('recaptcha-not-reachable')
+
+        try:
+            r = transport.post(url, data=payload, headers=headers)
+
+            # An outage of the API is answered with 5xx responses
+            if r.status_code >= 500:
+                raise requests.HTTPError('%d Server Error' % r.status_code, response=r)
+
+            with metrics.timed('parse'):
+                result = _parse_response(r.text)
+        except RecaptchaError as e:
+            event.status = e.error_code
+            raise
+        except (requests.RequestException, ValueError, IndexError) as e:
+            event.error = type(e).__name__
+            raise RecaptchaError('recaptcha-not-reachable')
+        finally:
+            if breaker is not None:
+                breaker.release(event.error is None)
+
+        event.status = 'success'
+        return result
+
+
+def _build_verify_request(challenge, response, private_key, remote_ip, use_tls=True):
+    """
+    Build URL and payload for a verification request.
+
+    :return: Tuple of URL and payload dict
+    """
     url = '%s/verify' % _build_api_url(use_tls)
     payload = {
         'privatekey': private_key,
@@ -133,24 +201,28 @@ def verify(challenge, response, private_key, remote_ip, use_tls=True):
         'response': response
     }
 
-    headers = _build_headers()
+    return url, payload
+
 
-    try:
-        r = requests.post(url, data=payload, headers=headers)
-    except requests.RequestException:
-        raise RecaptchaError('recaptcha-not-reachable')
+def _parse_response(text):
+    """
+    Parse the body of a verification response.
+
+    :param text: Response body
+    :raises: RecaptchaError in case the solution was not accepted
+    :return: True on success
+    """
+    response = text.split('\n')
+
+    if response[0].strip() == 'true':
+        return True
     else:
-        response = r.text.split('\n')
+        error_code = response[1].strip()
 
-        if response[0].strip() == 'true':
-            return True
+        if error_code == 'incorrect-captcha-sol':
+            raise IncorrectRecaptchaSolution(error_code)
         else:
-            error_code = response[1].strip()
-
-            if error_code == 'incorrect-captcha-sol':
-                raise IncorrectRecaptchaSolution(error_code)
-            else:
-                raise RecaptchaError(error_code)
+            raise RecaptchaError(error_code)
 
 
 def _build_api_url(use_tls=True):
@@ -172,7 +244,7 @@ def _build_headers():
     """
     headers = {
         'Content-type': 'application/x-www-form-urlencoded',
-        'User-agent': get_user_agent()
+        'User-agent': http.get_user_agent()
     }
 
     return headers
\ No newline at end of file
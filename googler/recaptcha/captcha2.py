@@ -14,35 +14,64 @@
 # limitations under the License.
 ##
 
+from googler.recaptcha.tokens import INVALID
+from googler.utils import compat, decode, lazy, metrics
+from googler.utils.cache import LRUCache
 from googler.utils.compat import urlencode
+from googler.utils.singleflight import SingleFlight
 
-import requests
+import hashlib
+
+# Imported on first use, so rendering HTML does not load requests
+http = lazy.module('googler.utils.http')
+requests = lazy.module('requests')
 
 """
 This module implements methods to generate HTML code for use with reCAPTCHA 2.0
 as well as methods for verification of user response.
 """
 
+# URL of the verification endpoint
+VERIFY_URL = 'https://www.google.com/recaptcha/api/siteverify'
+
+# Maximum number of rendered HTML fragments kept
+FRAGMENT_CACHE_SIZE = 256
+
+# Verifications currently in flight, for coalescing identical ones
+_flights = SingleFlight()
+
+# Rendered HTML fragments, by function and arguments
+_fragments = LRUCache(maxsize=FRAGMENT_CACHE_SIZE)
+
 
 def head_html(**kwargs):
     """
     Return the HTML code to be placed into the <head> section of a HTML document.
 
+    The code is rendered once per combination of options and then served from
+    a cache.
+
     :param hl: User language (optional); If not specified, the language is auto-detected
+    :param onload: Name of a callback function called when the API is loaded (optional)
+    :param render: "explicit" or "onload" (optional)
     :return: HTML code
     """
+    options = tuple(sorted(kwargs.items()))
+    key = ('head',) + options
+    s = _fragments.get(key)
 
-    s = '<script src="https://www.google.com/recaptcha/api.js{}" async defer></script>'
+    if s is None:
+        s = '<script src="https://www.google.com/recaptcha/api.js{}" async defer></script>'
 
-    if kwargs:
-        for key, value in kwargs:
-            if key not in ('onload', 'render', 'hl'):
-                raise AttributeError('Invalid keyword argument: {!r}'.format(key))
-            if key == 'render' and value not in ('explicit', 'onload'):
+        for name, value in options:
+            if name not in ('onload', 'render', 'hl'):
+                raise AttributeError('Invalid keyword argument: {!r}'.format(name))
+            if name == 'render' and value not in ('explicit', 'onload'):
                 raise ValueError('Keyword argument {!r} must have one of '
-                                 'the following values: explicit, onload'.format(key))
+                                 'the following values: explicit, onload'.format(name))
 
-        s = s.format('?' + urlencode(kwargs))
+        s = s.format('?' + urlencode(options) if options else '')
+        _fragments.set(key, s)
 
     return s
 
@@ -51,56 +80,257 @@ def widget_html(site_key, theme=None, type_=None):
     """
     Return the HTML code for the reCAPTCHA widget.
 
+    The code is rendered once per combination of arguments and then served
+    from a cache.
+
     :param site_key: Site key
     :param theme: Theme, may be "dark" or "light" (optional)
     :param type_: Data type, may be "image" or "audio" (optional)
     :return: HTML code
     """
+    key = ('widget', site_key, theme, type_)
+    s = _fragments.get(key)
+
+    if s is None:
+        attrs = {'data-sitekey': site_key}
+        s = '<div class="g-recaptcha" {attrs}></div>'
 
-    attrs = {'data-sitekey': site_key}
-    s = '<div class="g-recaptcha" {attrs}></div>'
+        if theme:
+            if theme not in ('light', 'dark'):
+                raise ValueError('theme must be "light" or "dark"')
+            attrs['data-theme'] = theme
 
-    if theme:
-        if theme not in ('light', 'dark'):
-            raise ValueError('theme must be "light" or "dark"')
-        attrs['data-theme'] = theme
+        if type_:
+            if type_ not in ('image', 'audio'):
+                raise ValueError('type_ must be "image" or "audio"')
+            attrs['data-type'] = type_
 
-    if type_:
-        if type_ not in ('image', 'audio'):
-            raise ValueError('type_ must be "image" or "audio"')
-        attrs['data-type'] = type_
+        s = s.format(attrs=' '.join(['{}="{}"'.format(k, v) for k, v in attrs.items()]))
+        _fragments.set(key, s)
 
-    return s.format(attrs=' '.join(['{}="{}"'.format(k, v) for k, v in attrs.items()]))
+    return s
 
 
-def verify(secret_key, response, remote_ip=None):
+def verify(secret_key, response, remote_ip=None, transport=None, coalesce=False, tokens=None,
+           breaker=None):
     """
     Verify user response.
 
-    This method returns silently when the response is correct.
+    On success, a RecaptchaResponse object is returned. Otherwise, RecaptchaError
+    is raised.
+
+    If `coalesce` is enabled, concurrent verifications of the same token share
+    a single request. Tokens can only be used once, so only the first of them
+    gets the outcome; the others are rejected with "timeout-or-duplicate"
+    (DuplicateToken) if the token was valid, as the API would.
+
+    If a TokenStore is given, every token is verified only once: repeated
+    submissions are rejected without a request, with the original error codes
+    if the token was invalid and "timeout-or-duplicate" otherwise.
+
+    If a CircuitBreaker is given and refuses the request, because the API has
+    been failing or too many verifications are outstanding, no request is made:
+    if the breaker fails open, a RecaptchaResponse with `verified` set to False
+    is returned, otherwise RecaptchaError with "request-error" is raised.
 
     :param secret_key: Shared secret key
     :param response: User response token
     :param remote_ip: User IP address (optional)
+    :param transport: Transport to use (optional); defaults to the shared transport
+    :param coalesce: Specifies whether concurrent identical verifications share one request
+    :param tokens: TokenStore to check and record tokens in (optional)
+    :param breaker: CircuitBreaker to guard the request with (optional)
     :raises: RecaptchaError in case the response is invalid or cannot be verified
     :return: RecaptchaResponse object
     """
 
-    verification_url = 'https://www.google.com/recaptcha/api/siteverify'
+    with metrics.trace('captcha2.verify') as event:
+        data = _build_verify_request(secret_key, response, remote_ip)
+
+        if transport is None:
+            transport = http.get_default_transport()
+
+        if tokens is not None:
+            try:
+                _claim_token(tokens, secret_key, response)
+            except DuplicateToken as e:
+                event.cache = 'hit'
+                event.status = ','.join(e.error_codes)
+                raise
+
+            event.cache = 'miss'
+
+        try:
+            if coalesce:
+                result = _coalesce_verification(data, transport, breaker)
+            else:
+                result = _post_verification(data, transport, breaker)
+        except Exception as e:
+            if tokens is not None:
+                _settle_token(tokens, secret_key, response, e)
+            if isinstance(e, RecaptchaError) and event.error is None:
+                event.status = ','.join(e.error_codes) or 'failure'
+            raise
+
+        if tokens is not None:
+            _settle_token(tokens, secret_key, response)
+
+        event.status = 'success'
+        return result
+
+
+def _post_verification(data, transport, breaker=None):
+    """
+    Perform a verification request.
+
+    :return: RecaptchaResponse object
+    """
+    event = metrics.current_event()
+
+    if breaker is not None and not breaker.acquire():
+        if event is not None:
+            event.error = 'CircuitOpen'
+        if breaker.fail_open:
+            return RecaptchaResponse(True, verified=False)
+        raise RecaptchaError(['request-error'])
+
+    try:
+        r = transport.post(VERIFY_URL, data=data)
+
+        # An outage of the API is answered with 5xx responses
+        if r.status_code >= 500:
+            raise requests.HTTPError('%d Server Error' % r.status_code, response=r)
+
+        with metrics.timed('parse'):
+            result = _parse_response(decode.loads(r.content))
+    except RecaptchaError:
+        # A rejected token is a working API
+        if breaker is not None:
+            breaker.release(True)
+        raise
+    except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+        if breaker is not None:
+            breaker.release(False)
+        if event is not None:
+            event.error = type(e).__name__
+        raise RecaptchaError(['request-error'])
+
+    if breaker is not None:
+        breaker.release(True)
+
+    return result
+
+
+def _coalesce_verification(data, transport, breaker=None):
+    """
+    Perform a verification request, unless the same token is being verified already.
+
+    :raises: DuplicateToken if another call has verified the token
+    :return: RecaptchaResponse object
+    """
+    leader = []
+
+    def post():
+        leader.append(True)
+        return _post_verification(data, transport, breaker)
+
+    result = _flights.do(_verify_key(data), post)
+
+    # Responses accepted without a request are not a use of the token
+    if not leader and result.verified:
+        raise DuplicateToken(['timeout-or-duplicate'])
+
+    return result
+
+
+def _claim_token(tokens, secret_key, response):
+    """
+    Claim a token for verification.
+
+    :raises: DuplicateToken if the token has been submitted before
+    """
+    entry = tokens.claim(secret_key, response)
+
+    if entry is not None:
+        if entry['state'] == INVALID:
+            raise DuplicateToken(entry['error_codes'])
+        else:
+            raise DuplicateToken(['timeout-or-duplicate'])
+
+
+def _settle_token(tokens, secret_key, response, error=None):
+    """
+    Record the outcome of a token's verification. Tokens which could not be
+    verified at all are released, so they can be submitted again.
+    """
+    if error is None:
+        tokens.resolve(secret_key, response)
+    elif isinstance(error, RecaptchaError) and error.error_codes != ['request-error']:
+        tokens.resolve(secret_key, response, error.error_codes)
+    else:
+        tokens.release(secret_key, response)
+
+
+def _verify_key(data):
+    """
+    Build a key identifying a verification request, without exposing the secret.
+
+    :return: Key string
+    """
+    values = [data['secret'], data['response'], data.get('remoteip') or '']
+    return hashlib.sha1('\n'.join(values).encode('utf-8')).hexdigest()
+
+
+def _build_verify_request(secret_key, response, remote_ip=None):
+    """
+    Build the payload for a verification request.
+
+    :return: Payload dict
+    """
     data = {'secret': secret_key, 'response': response}
 
     if remote_ip:
         data['remoteip'] = remote_ip
 
-    try:
-        r = requests.post(verification_url, data=data)
-    except requests.RequestException:
-        raise RecaptchaError('request-error')
-    else:
-        resp = r.json()
+    return data
+
+
+def _parse_response(resp):
+    """
+    Parse a decoded verification response.
+
+    :param resp: Decoded JSON response
+    :raises: RecaptchaError in case the response is invalid
+    :return: RecaptchaResponse object
+    """
+    if not resp['success']:
+        raise RecaptchaError(resp.get('error-codes'))
+
+    return RecaptchaResponse(True, hostname=resp.get('hostname'),
+                             challenge_ts=resp.get('challenge_ts'))
+
 
-        if not resp['success']:
-            raise RecaptchaError(resp.get('error-codes'))
+class RecaptchaResponse(object):
+    """
+    A reCAPTCHA 2.0 verification response.
+
+    You can perform boolean testing on these objects for check whether
+    the response was valid or not.
+    """
+    def __init__(self, is_valid, error_codes=None, hostname=None, challenge_ts=None, verified=True):
+        self.is_valid = is_valid
+        self.error_codes = error_codes or []
+        self.hostname = hostname
+        self.challenge_ts = challenge_ts
+        # False if the response was accepted without verification, see verify()
+        self.verified = verified
+
+    if compat.PY3:
+        def __bool__(self):
+            return bool(self.is_valid)
+    else:
+        def __len__(self):
+            return 1 if self.is_valid else 0
 
 
 class RecaptchaError(ValueError):
@@ -137,5 +367,17 @@ class RecaptchaError(ValueError):
             return 'The response parameter is missing'
         elif s == 'invalid-input-response':
             return 'The response parameter is invalid or malformed'
+        elif s == 'bad-request':
+            return 'The request is invalid or malformed'
+        elif s == 'timeout-or-duplicate':
+            return 'The response is no longer valid: either is too old or has been used previously'
         else:
-            raise AttributeError('{!r} is not a valid error code'.format(s))
\ No newline at end of file
+            raise AttributeError('{!r} is not a valid error code'.format(s))
+
+
+class DuplicateToken(RecaptchaError):
+    """
+    Raised when a user response token is submitted again, and was rejected
+    without asking the API.
+    """
+    pass
@@ -0,0 +1,149 @@
+##
+# Copyright (C) 2015 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.recaptcha import captcha2
+from googler.recaptcha.captcha2 import DuplicateToken, RecaptchaError, RecaptchaResponse, \
+    _build_verify_request, _claim_token, _parse_response, _settle_token, _verify_key
+from googler.utils.aio import REQUEST_ERRORS, AsyncSingleFlight, get_default_async_transport
+
+"""
+This module implements coroutine versions of the functions in
+googler.recaptcha.captcha2. It requires Python 3.5 or higher and aiohttp.
+"""
+
+# Verifications currently in flight, for coalescing identical ones
+_flights = AsyncSingleFlight()
+
+
+async def verify_async(secret_key, response, remote_ip=None, transport=None, coalesce=False,
+                       tokens=None, breaker=None):
+    """
+    Verify user response without blocking the event loop.
+
+    On success, a RecaptchaResponse object is returned. Otherwise, RecaptchaError
+    is raised.
+
+    If `coalesce` is enabled, concurrent verifications of the same token share
+    a single request, as with googler.recaptcha.captcha2.verify(): only the
+    first of them gets the outcome. A CircuitBreaker is applied as with
+    verify() as well.
+
+    :param secret_key: Shared secret key
+    :param response: User response token
+    :param remote_ip: User IP address (optional)
+    :param transport: AsyncTransport to use (optional); defaults to the shared transport
+    :param coalesce: Specifies whether concurrent identical verifications share one request
+    :param tokens: TokenStore to check and record tokens in (optional)
+    :param breaker: CircuitBreaker to guard the request with (optional)
+    :raises: RecaptchaError in case the response is invalid or cannot be verified
+    :return: RecaptchaResponse object
+    """
+    data = _build_verify_request(secret_key, response, remote_ip)
+
+    if transport is None:
+        transport = get_default_async_transport()
+
+    if tokens is not None:
+        _claim_token(tokens, secret_key, response)
+
+    try:
+        if coalesce:
+            result = await _coalesce_verification(data, transport, breaker)
+        else:
+            result = await _post_verification(data, transport, breaker)
+    except BaseException as e:
+        # Cancelled verifications release the token as well
+        if tokens is not None:
+            _settle_token(tokens, secret_key, response, e)
+        raise
+
+    if tokens is not None:
+        _settle_token(tokens, secret_key, response)
+
+    return result
+
+
+async def _coalesce_verification(data, transport, breaker=None):
+    """
+    Perform a verification request, unless the same token is being verified already.
+
+    :raises: DuplicateToken if another call has verified the token
+    :return: RecaptchaResponse object
+    """
+    leader = []
+
+    async def post():
+        leader.append(True)
+        return await _post_verification(data, transport, breaker)
+
+    result = await _flights.do(_verify_key(data), post)
+
+    # Responses accepted without a request are not a use of the token
+    if not leader and result.verified:
+        raise DuplicateToken(['timeout-or-duplicate'])
+
+    return result
+
+
+async def _post_verification(data, transport, breaker=None):
+    """
+    Perform a verification request, guarded by a CircuitBreaker.
+
+    :return: RecaptchaResponse object
+    """
+    if breaker is not None and not breaker.acquire():
+        if breaker.fail_open:
+            return RecaptchaResponse(True, verified=False)
+        raise RecaptchaError(['request-error'])
+
+    # Unless the request completes, e.g. if it is cancelled, its outcome is unknown
+    success = None
+
+    try:
+        result = await _request_verification(data, transport)
+        success = True
+    except RecaptchaError as e:
+        # A rejected token is a working API
+        success = e.error_codes != ['request-error']
+        raise
+    finally:
+        if breaker is not None:
+            breaker.release(success)
+
+    return result
+
+
+async def _request_verification(data, transport):
+    """
+    Perform a verification request.
+
+    :return: RecaptchaResponse object
+    """
+    try:
+        r = await transport.post(captcha2.VERIFY_URL, data=data)
+    except REQUEST_ERRORS:
+        raise RecaptchaError(['request-error'])
+
+    # An outage of the API is answered with 5xx responses
+    if r.status_code >= 500:
+        raise RecaptchaError(['request-error'])
+
+    try:
+        return _parse_response(r.json())
+    except RecaptchaError:
+        raise
+    except (ValueError, KeyError, TypeError):
+        raise RecaptchaError(['request-error'])
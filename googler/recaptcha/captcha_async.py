@@ -0,0 +1,94 @@
+# coding: utf-8
+
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.recaptcha.captcha import RecaptchaError, _build_headers, _build_verify_request, \
+    _parse_response
+from googler.utils.aio import REQUEST_ERRORS, get_default_async_transport
+
+"""
+This module implements coroutine versions of the functions in
+googler.recaptcha.captcha. It requires Python 3.5 or higher and aiohttp.
+"""
+
+
+async def verify_async(challenge, response, private_key, remote_ip, use_tls=True, transport=None,
+                       breaker=None):
+    """
+    Verify the reCAPTCHA response without blocking the event loop.
+
+    On success, this function returns True. Otherwise, RecaptchaError
+    is raised. A CircuitBreaker is applied as with verify().
+
+    :param challenge: The value of recaptcha_challenge_field from the form
+    :param response: The value of recaptcha_response_field from the form
+    :param private_key: Private API key
+    :param remote_ip: User's IP address
+    :param use_tls: Specifies whether the request is made with https
+    :param transport: AsyncTransport to use (optional); defaults to the shared transport
+    :param breaker: CircuitBreaker to guard the request with (optional)
+    :return: True on success
+    """
+    url, payload = _build_verify_request(challenge, response, private_key, remote_ip, use_tls)
+    headers = _build_headers()
+
+    if transport is None:
+        transport = get_default_async_transport()
+
+    if breaker is not None and not breaker.acquire():
+        if breaker.fail_open:
+            return True
+        raise RecaptchaError('recaptcha-not-reachable')
+
+    # Unless the request completes, e.g. if it is cancelled, its outcome is unknown
+    success = None
+
+    try:
+        result = await _post_verification(url, payload, headers, transport)
+        success = True
+    except RecaptchaError as e:
+        # A rejected solution is a working API
+        success = e.error_code != 'recaptcha-not-reachable'
+        raise
+    finally:
+        if breaker is not None:
+            breaker.release(success)
+
+    return result
+
+
+async def _post_verification(url, payload, headers, transport):
+    """
+    Perform a verification request.
+
+    :return: True on success
+    """
+    try:
+        r = await transport.post(url, data=payload, headers=headers)
+    except REQUEST_ERRORS:
+        raise RecaptchaError('recaptcha-not-reachable')
+
+    # An outage of the API is answered with 5xx responses
+    if r.status_code >= 500:
+        raise RecaptchaError('recaptcha-not-reachable')
+
+    try:
+        return _parse_response(r.text)
+    except RecaptchaError:
+        raise
+    except (ValueError, IndexError):
+        raise RecaptchaError('recaptcha-not-reachable')
@@ -16,62 +16,262 @@
 # limitations under the License.
 ##
 
-from Crypto.Cipher import AES
-from googler.utils import compat
+from googler.utils import aes, compat
+from googler.utils.aes import BLOCK_SIZE
+from googler.utils.cache import LRUCache
 
 import base64
+import binascii
+import itertools
 
+# URL of the Mailhide page revealing an address, without scheme
+MAILHIDE_URL = 'www.google.com/recaptcha/mailhide/d?k=%(public_key)s&c=%(encrypted_email)s'
 
-def get_html(email, private_key, public_key, use_tls=True, label=None):
+# Anchor opening the Mailhide page in a popup
+HTML_ANCHOR_BEGIN = '''<a href="%(href)s" onclick="window.open('%(href)s', '', 'toolbar=0,scrollbars=0,''' \
+    '''location=0,statusbar=0,menubar=0,resizable=0,width=500,height=300');return false;" ''' \
+    '''title="Reveal this e-mail address">'''
+HTML_ANCHOR_END = '</a>'
+
+# Number of addresses encrypted at once when rendering HTML code
+DEFAULT_BATCH_SIZE = 1024
+
+# Mailhide objects used by the module-level functions, by keys and scheme
+_mailhides = LRUCache(maxsize=32)
+
+
+class Mailhide(object):
     """
-    Get Mailhide HTML code for a specific E-mail address.
+    Builds Mailhide URLs and HTML code for one pair of keys.
 
-    :param email: E-mail address to use for mailhide
-    :param private_key: Private key
-    :param public_key: Public key
-    :param use_tls: Specifies whether to use https for the URL
-    :param label: Optional - if present, it will display that label instead of a truncated E-mail address
-    :return: Mailhide HTML code
+    The private key is decoded and the cipher set up once, so creating one
+    object and reusing it for many addresses is much cheaper than calling the
+    module-level functions. The bulk methods additionally encrypt all addresses
+    at once. Objects are safe to share between threads.
+
+    AES is provided by the fastest installed crypto library, see googler.utils.aes.
     """
-    url = get_url(email, private_key, public_key, use_tls)
+    def __init__(self, private_key, public_key, use_tls=True, backend=None):
+        """
+        :param private_key: Private key
+        :param public_key: Public key
+        :param use_tls: Specifies whether to use https for the URLs
+        :param backend: Name of the AES backend to use (optional); defaults to the fastest one
+        """
+        self.public_key = public_key
+        self.use_tls = use_tls
+        self._url = ('https://' if use_tls else 'http://') + MAILHIDE_URL % {
+            'public_key': public_key,
+            'encrypted_email': ''
+        }
+        # The anchor around the href, which is inserted twice
+        self._anchor = HTML_ANCHOR_BEGIN.split('%(href)s')
+        # Mailhide uses CBC with a zero IV; chaining is done in encrypt_many()
+        # and decrypt_many(), so a single ECB cipher serves every address.
+        self._cipher = aes.new(base64.b16decode(private_key, casefold=True), backend)
+
+    def encrypt(self, email):
+        """
+        Encrypt an E-mail address with AES-128-CBC.
+
+        :param email: E-mail address
+        :return: Cipher text
+        """
+        return self.encrypt_many([email])[0]
+
+    def encrypt_many(self, emails):
+        """
+        Encrypt E-mail addresses with AES-128-CBC.
+
+        The addresses are encrypted block by block: the n-th blocks of all
+        addresses are chained with their predecessors and passed to the cipher
+        in a single call.
+
+        :param emails: Iterable of E-mail addresses
+        :return: List of cipher texts
+        """
+        padded = [_pad(email.encode('utf-8')) for email in emails]
+        encrypted = [[] for p in padded]
+        previous = [None] * len(padded)
+        offset = 0
+
+        while True:
+            indexes = [i for i, p in enumerate(padded) if len(p) > offset]
+
+            if not indexes:
+                break
+
+            blocks = b''.join([padded[i][offset:offset + BLOCK_SIZE] for i in indexes])
+
+            # The first blocks are chained with the zero IV, which leaves them unchanged
+            if offset:
+                blocks = _xor(blocks, b''.join([previous[i] for i in indexes]))
+
+            blocks = self._cipher.encrypt(blocks)
+
+            for n, i in enumerate(indexes):
+                previous[i] = blocks[n * BLOCK_SIZE:(n + 1) * BLOCK_SIZE]
+                encrypted[i].append(previous[i])
+
+            offset += BLOCK_SIZE
+
+        return [b''.join(blocks) for blocks in encrypted]
+
+    def decrypt(self, cipher_text):
+        """
+        Decrypt an encrypted E-mail address.
+
+        :param cipher_text: Encrypted E-mail address
+        :return: E-mail address in plain text
+        """
+        return self.decrypt_many([cipher_text])[0]
+
+    def decrypt_many(self, cipher_texts):
+        """
+        Decrypt encrypted E-mail addresses, with a single cipher call.
+
+        :param cipher_texts: Iterable of encrypted E-mail addresses
+        :return: List of E-mail addresses in plain text
+        """
+        cipher_texts = list(cipher_texts)
+        zero = _zero_block()
+
+        # In CBC mode, each block is chained with the previous cipher block
+        chain = b''.join([zero + c[:-BLOCK_SIZE] for c in cipher_texts])
+        blocks = _xor(self._cipher.decrypt(b''.join(cipher_texts)), chain)
+        emails = []
+        offset = 0
+
+        for c in cipher_texts:
+            emails.append(_unpad(blocks[offset:offset + len(c)]).decode('utf-8'))
+            offset += len(c)
+
+        return emails
+
+    def get_url(self, email):
+        """
+        Get the Mailhide URL for an E-mail address.
+
+        :param email: E-mail address
+        :return: Mailhide URL
+        """
+        return self.get_urls([email])[0]
+
+    def get_urls(self, emails):
+        """
+        Get the Mailhide URLs for E-mail addresses.
+
+        :param emails: Iterable of E-mail addresses
+        :return: List of Mailhide URLs
+        """
+        return [self._url + base64.urlsafe_b64encode(c).decode('utf-8')
+                for c in self.encrypt_many(emails)]
+
+    def get_html(self, email, label=None):
+        """
+        Get Mailhide HTML code for an E-mail address.
+
+        :param email: E-mail address
+        :param label: Optional - if present, it will display that label instead of a truncated E-mail address
+        :return: Mailhide HTML code
+        """
+        return self._render(email, self.get_url(email), label)
+
+    def get_htmls(self, emails, labels=None):
+        """
+        Get Mailhide HTML code for E-mail addresses.
+
+        :param emails: Iterable of E-mail addresses
+        :param labels: Optional - iterable of labels, one per address, or None for a truncated E-mail address
+        :return: List of Mailhide HTML code
+        """
+        emails = list(emails)
+        labels = list(labels) if labels is not None else [None] * len(emails)
+        return list(self.iter_htmls(zip(emails, labels)))
+
+    def iter_htmls(self, items, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Generate Mailhide HTML code for many E-mail addresses.
+
+        Items are consumed lazily and encrypted `batch_size` at a time, so
+        arbitrarily large iterables are rendered in constant memory.
+
+        :param items: Iterable of (E-mail address, label) pairs; label may be None
+        :param batch_size: Number of addresses encrypted at once
+        :return: Generator of HTML code, one per item
+        """
+        items = iter(items)
 
-    html_anchor_begin = '''<a href="%(href)s" onclick="window.open('%(href)s', '', 'toolbar=0,scrollbars=0,''' \
-            '''location=0,statusbar=0,menubar=0,resizable=0,width=500,height=300');return false;" ''' \
-            '''title="Reveal this e-mail address">'''
-    html_anchor_end = '</a>'
+        while True:
+            batch = list(itertools.islice(items, batch_size))
 
-    context = {
-        'a_begin': html_anchor_begin % {
-            'href': url
-        },
-        'a_end': html_anchor_end
-    }
+            if not batch:
+                break
+
+            urls = self.get_urls([email for email, label in batch])
+
+            for (email, label), url in zip(batch, urls):
+                yield self._render(email, url, label)
+
+    def write_htmls(self, items, write, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Write Mailhide HTML code for many E-mail addresses, e.g. into a response stream.
+
+        The HTML code of each batch is passed to `write` at once, without separators.
+
+        :param items: Iterable of (E-mail address, label) pairs; label may be None
+        :param write: Function taking a string, e.g. the write method of a file
+        :param batch_size: Number of addresses encrypted at once
+        :return: Number of items written
+        """
+        htmls = self.iter_htmls(items, batch_size)
+        count = 0
+
+        while True:
+            batch = list(itertools.islice(htmls, batch_size))
+
+            if not batch:
+                return count
+
+            write(''.join(batch))
+            count += len(batch)
+
+    def _render(self, email, url, label=None):
+        """
+        Render the Mailhide HTML code for an E-mail address and its URL.
+        """
+        begin, middle, end = self._anchor
+        anchor = begin + url + middle + url + end
+
+        if label:
+            return '%s%s%s' % (anchor, label, HTML_ANCHOR_END)
 
-    if not label:
         email_parts = email.split('@', 2)
         username = email_parts[0]
-        host = email_parts[1]
-        prefix = ''
+        length = len(username)
 
-        if len(username) in range(1, 4 + 1):
+        if length <= 4:
             prefix = username[:2]
-        elif len(username) in range(5, 6 + 1):
+        elif length <= 6:
             prefix = username[:3]
-        elif len(username) >= 7:
+        else:
             prefix = username[:4]
 
-        context.update({
-            'prefix': prefix,
-            'host': host
-        })
+        return prefix + anchor + '…' + HTML_ANCHOR_END + '@' + email_parts[1]
 
-        return '%(prefix)s%(a_begin)s…%(a_end)s@%(host)s' % context
-    else:
-        context.update({
-            'label': label
-        })
 
-        return '%(a_begin)s%(label)s%(a_end)s' % context
+def get_html(email, private_key, public_key, use_tls=True, label=None):
+    """
+    Get Mailhide HTML code for a specific E-mail address.
+
+    :param email: E-mail address to use for mailhide
+    :param private_key: Private key
+    :param public_key: Public key
+    :param use_tls: Specifies whether to use https for the URL
+    :param label: Optional - if present, it will display that label instead of a truncated E-mail address
+    :return: Mailhide HTML code
+    """
+    return _get_mailhide(private_key, public_key, use_tls).get_html(email, label)
 
 
 def get_url(email, private_key, public_key, use_tls=True):
@@ -84,17 +284,21 @@ def get_url(email, private_key, public_key, use_tls=True):
     :param use_tls: Specifies whether to use https for the URL
     :return: Mailhide URL
     """
-    enc = _encrypt_email_address(email, private_key)
+    return _get_mailhide(private_key, public_key, use_tls).get_url(email)
 
-    ctx = {
-        'public_key': public_key,
-        'encrypted_email': base64.urlsafe_b64encode(enc).decode('utf-8')
-    }
 
-    url = 'https' if use_tls else 'http'
-    url += '://www.google.com/recaptcha/mailhide/d?k=%(public_key)s&c=%(encrypted_email)s' % ctx
+def _get_mailhide(private_key, public_key, use_tls=True):
+    """
+    Return a shared Mailhide object for a pair of keys, creating it on first use.
+    """
+    key = (private_key, public_key, use_tls)
+    mailhide = _mailhides.get(key)
+
+    if mailhide is None:
+        mailhide = Mailhide(private_key, public_key, use_tls)
+        _mailhides.set(key, mailhide)
 
-    return url
+    return mailhide
 
 
 def _decrypt_email_address(cipher_text, private_key):
@@ -104,15 +308,7 @@ def _decrypt_email_address(cipher_text, private_key):
     :param private_key: Private key
     :return: E-mail address in plain text
     """
-    if compat.PY2:
-        iv = chr(0) * 16
-    else:
-        iv = bytes([0] * 16)
-    key = base64.b16decode(private_key, casefold=True)
-    cipher = AES.new(key, AES.MODE_CBC, iv)
-    plain_text = _unpad(cipher.decrypt(cipher_text))
-
-    return plain_text.decode('utf-8')
+    return _get_mailhide(private_key, None).decrypt(cipher_text)
 
 
 def _encrypt_email_address(email, private_key):
@@ -122,17 +318,28 @@ def _encrypt_email_address(email, private_key):
     :param email: E-mail address
     :return:
     """
-    padded_email = _pad(email.encode('utf-8'))
-    key = base64.b16decode(private_key, casefold=True)
+    return _get_mailhide(private_key, None).encrypt(email)
 
-    # Create an initialization vector (16 times 0x00)
+
+def _zero_block():
+    """
+    Return a block of 16 times 0x00, the initialization vector used by Mailhide.
+    """
     if compat.PY2:
-        iv = chr(0) * 16
+        return chr(0) * BLOCK_SIZE
     else:
-        iv = bytes([0] * 16)
-    cipher = AES.new(key, AES.MODE_CBC, iv)
+        return bytes([0] * BLOCK_SIZE)
 
-    return cipher.encrypt(padded_email)
+
+def _xor(a, b):
+    """
+    XOR two byte strings of the same length.
+    """
+    if compat.PY2:
+        x = int(binascii.hexlify(a), 16) ^ int(binascii.hexlify(b), 16)
+        return binascii.unhexlify('%0*x' % (len(a) * 2, x))
+    else:
+        return (int.from_bytes(a, 'big') ^ int.from_bytes(b, 'big')).to_bytes(len(a), 'big')
 
 
 def _pad(s):
@@ -142,7 +349,7 @@ def _pad(s):
     :param s: Source string
     :return: Padded string
     """
-    x = AES.block_size - len(s) % AES.block_size
+    x = BLOCK_SIZE - len(s) % BLOCK_SIZE
 
     if compat.PY2:
         pad = chr(x) * x
@@ -160,4 +367,4 @@ def _unpad(s):
     if compat.PY2:
         return s[:-ord(s[-1])]
     else:
-        return s[:-s[-1]]
\ No newline at end of file
+        return s[:-s[-1]]
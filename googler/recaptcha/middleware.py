@@ -0,0 +1,170 @@
+##
+# Copyright (C) 2015 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.recaptcha import captcha, captcha2
+from googler.utils import compat
+
+"""
+This module implements the parts shared by the WSGI and ASGI middleware in
+googler.recaptcha.wsgi and googler.recaptcha.asgi.
+"""
+
+# Key of the WSGI environ or ASGI scope the verification is attached to
+ENVIRON_KEY = 'googler.recaptcha'
+
+# Content type of the form posts which are verified
+FORM_CONTENT_TYPE = 'application/x-www-form-urlencoded'
+
+# Form field holding the reCAPTCHA 2.0 user response token
+RESPONSE_FIELD = 'g-recaptcha-response'
+
+# Form fields of the legacy reCAPTCHA
+CHALLENGE_FIELD = 'recaptcha_challenge_field'
+LEGACY_RESPONSE_FIELD = 'recaptcha_response_field'
+
+# Maximum size in bytes of a request body which is buffered and parsed
+DEFAULT_MAX_BODY_SIZE = 1024 * 1024
+
+# Size of the chunks request bodies are read in
+CHUNK_SIZE = 64 * 1024
+
+
+class FormParser(object):
+    """
+    An incremental parser of urlencoded form bodies, picking out the captcha fields.
+
+    Feed it the body chunk by chunk; each field is available in `values` as
+    soon as the chunk completing it was fed.
+    """
+    FIELDS = (RESPONSE_FIELD, CHALLENGE_FIELD, LEGACY_RESPONSE_FIELD)
+
+    def __init__(self):
+        self.values = {}
+        self._names = dict((name.encode('ascii'), name) for name in self.FIELDS)
+        self._partial = []
+
+    def feed(self, chunk):
+        """
+        Parse a chunk of the body.
+
+        :param chunk: Chunk (bytes)
+        """
+        self._partial.append(chunk)
+
+        # Wait for the end of the current field, instead of joining on every chunk
+        if b'&' not in chunk:
+            return
+
+        pairs = b''.join(self._partial).split(b'&')
+        self._partial = [pairs.pop()]
+        self._parse(pairs)
+
+    def close(self):
+        """
+        Parse the last field, after the whole body was fed.
+        """
+        self._parse([b''.join(self._partial)])
+        self._partial = []
+
+    @property
+    def has_response(self):
+        """
+        Specifies whether the reCAPTCHA 2.0 token has been found.
+        """
+        return RESPONSE_FIELD in self.values
+
+    @property
+    def has_fields(self):
+        """
+        Specifies whether a complete set of captcha fields has been found.
+        """
+        return self.has_response or (CHALLENGE_FIELD in self.values and
+                                     LEGACY_RESPONSE_FIELD in self.values)
+
+    def _parse(self, pairs):
+        for pair in pairs:
+            name, sep, value = pair.partition(b'=')
+            name = self._names.get(name)
+
+            # The first occurrence of a field counts
+            if name is not None and name not in self.values:
+                self.values[name] = _unquote(value)
+
+
+def is_form_post(method, content_type, content_length, max_body_size):
+    """
+    Determine whether a request is a form post to verify.
+
+    :param method: Request method
+    :param content_type: Content-Type header, or None
+    :param content_length: Content-Length header, or None
+    :param max_body_size: Maximum size of the body
+    :return: True if the request body should be parsed
+    """
+    if method != 'POST' or not content_type:
+        return False
+
+    if content_type.split(';', 1)[0].strip().lower() != FORM_CONTENT_TYPE:
+        return False
+
+    try:
+        return content_length is None or int(content_length) <= max_body_size
+    except ValueError:
+        return False
+
+
+def verify_form(values, secret_key, private_key=None, remote_ip=None, **kwargs):
+    """
+    Verify the captcha fields of a form, with captcha2.verify(), or with
+    captcha.verify() if only the legacy fields are present.
+
+    Rejected responses are returned as well, not raised.
+
+    :param values: dict of the captcha fields found by a FormParser
+    :param secret_key: reCAPTCHA 2.0 secret key
+    :param private_key: Legacy reCAPTCHA private key (optional); without it, legacy fields are ignored
+    :param remote_ip: User IP address (optional)
+    :param kwargs: Further arguments passed to the verify function (transport, ...)
+    :return: captcha2.RecaptchaResponse or captcha.RecaptchaResponse object, or None
+    """
+    if RESPONSE_FIELD in values:
+        try:
+            return captcha2.verify(secret_key, values[RESPONSE_FIELD], remote_ip, **kwargs)
+        except captcha2.RecaptchaError as e:
+            return captcha2.RecaptchaResponse(False, e.error_codes)
+
+    if private_key and CHALLENGE_FIELD in values and LEGACY_RESPONSE_FIELD in values:
+        kwargs.pop('tokens', None)
+
+        try:
+            captcha.verify(values[CHALLENGE_FIELD], values[LEGACY_RESPONSE_FIELD], private_key,
+                           remote_ip, **kwargs)
+        except captcha.RecaptchaError as e:
+            return captcha.RecaptchaResponse(False, e.error_code)
+
+        return captcha.RecaptchaResponse(True)
+
+    return None
+
+
+def _unquote(value):
+    """
+    Decode an urlencoded value.
+    """
+    if compat.PY2:
+        return compat.unquote_plus(value).decode('utf-8', 'replace')
+    else:
+        return compat.unquote_plus(value.decode('utf-8', 'replace'))
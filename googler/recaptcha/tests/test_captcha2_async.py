@@ -0,0 +1,140 @@
+##
+# Copyright (C) 2015 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.recaptcha import captcha2
+from googler.recaptcha.tokens import TokenStore
+from googler.utils.breaker import CircuitBreaker
+from googler.utils.tests.fakes import FakeTransport, answer_verification
+
+import asyncio
+import unittest
+
+try:
+    from aiohttp import web
+    from googler.recaptcha.captcha_async import verify_async as verify_legacy_async
+    from googler.recaptcha.captcha2_async import verify_async
+    from googler.utils.aio import AsyncTransport
+except ImportError:
+    web = None
+
+
+class _HangingTransport(FakeTransport):
+    """
+    A transport whose requests never get an answer.
+    """
+    async def post(self, url, data=None, headers=None):
+        FakeTransport.post(self, url, data, headers)
+        await asyncio.Event().wait()
+
+
+@unittest.skipIf(web is None, 'aiohttp is not installed')
+class TestCaptcha2Async(unittest.TestCase):
+    """
+    Test case to test the coroutine version of verify against a local server.
+    """
+    def setUp(self):
+        self.verify_url = captcha2.VERIFY_URL
+
+    def tearDown(self):
+        captcha2.VERIFY_URL = self.verify_url
+
+    async def handle_siteverify(self, request):
+        data = await request.post()
+
+        if data['response'] == 'valid':
+            return web.json_response({'success': True, 'hostname': 'example.com'})
+        else:
+            return web.json_response({'success': False, 'error-codes': ['invalid-input-response']})
+
+    async def run_verifications(self):
+        app = web.Application()
+        app.router.add_post('/recaptcha/api/siteverify', self.handle_siteverify)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        captcha2.VERIFY_URL = 'http://127.0.0.1:%d/recaptcha/api/siteverify' % port
+
+        try:
+            async with AsyncTransport() as transport:
+                response = await verify_async('secret', 'valid', transport=transport)
+
+                try:
+                    await verify_async('secret', 'invalid', transport=transport)
+                except captcha2.RecaptchaError as e:
+                    error = e
+                else:
+                    error = None
+
+                return response, error
+        finally:
+            await runner.cleanup()
+
+    def test_verify_async(self):
+        response, error = asyncio.run(self.run_verifications())
+
+        self.assertTrue(isinstance(response, captcha2.RecaptchaResponse))
+        self.assertTrue(response)
+        self.assertEqual(response.hostname, 'example.com')
+        self.assertEqual(error.error_codes, ['invalid-input-response'])
+
+
+@unittest.skipIf(web is None, 'aiohttp is not installed')
+class TestCancellation(unittest.TestCase):
+    """
+    Test case to test that cancelled verifications give back what they hold.
+    """
+    def setUp(self):
+        self.transport = _HangingTransport(answer_verification)
+        self.breaker = CircuitBreaker(max_concurrency=1)
+
+    def cancel(self, coroutine):
+        async def run():
+            task = asyncio.ensure_future(coroutine)
+
+            while not self.transport.requested.is_set():
+                await asyncio.sleep(0)
+
+            task.cancel()
+
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+
+    def test_captcha2(self):
+        tokens = TokenStore()
+        self.cancel(verify_async('secret', 'valid', transport=self.transport, tokens=tokens,
+                                 breaker=self.breaker))
+
+        self.assertEqual(self.breaker.outstanding, 0)
+        self.assertEqual(self.breaker.failures, 0)
+        self.assertTrue(self.breaker.acquire())
+        # The token can be submitted again
+        self.assertIsNone(tokens.claim('secret', 'valid'))
+
+    def test_captcha(self):
+        self.cancel(verify_legacy_async('challenge', 'valid', 'private', '127.0.0.1',
+                                        transport=self.transport, breaker=self.breaker))
+
+        self.assertEqual(self.breaker.outstanding, 0)
+        self.assertEqual(self.breaker.failures, 0)
+        self.assertTrue(self.breaker.acquire())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -15,9 +15,31 @@
 ##
 
 from googler.recaptcha import mailhide
+from googler.utils import aes
 
+import binascii
 import unittest
 
+# Output of get_html() for x@example.com and johndoe@example.com, each without and with a label
+MAILHIDE_HTMLS = [
+    u'x<a href="http://www.google.com/recaptcha/mailhide/d?k=PUBLIC&c=wBG7nOgntKqWeDpF9ucVNQ==" '
+    u'onclick="window.open(\'http://www.google.com/recaptcha/mailhide/d?k=PUBLIC&c=wBG7nOgntKqWeDpF9ucVNQ==\', \'\', '
+    u'\'toolbar=0,scrollbars=0,location=0,statusbar=0,menubar=0,resizable=0,width=500,height=300\');return false;" '
+    u'title="Reveal this e-mail address">\u2026</a>@example.com',
+    u'<a href="http://www.google.com/recaptcha/mailhide/d?k=PUBLIC&c=wBG7nOgntKqWeDpF9ucVNQ==" '
+    u'onclick="window.open(\'http://www.google.com/recaptcha/mailhide/d?k=PUBLIC&c=wBG7nOgntKqWeDpF9ucVNQ==\', \'\', '
+    u'\'toolbar=0,scrollbars=0,location=0,statusbar=0,menubar=0,resizable=0,width=500,height=300\');return false;" '
+    u'title="Reveal this e-mail address">Mail</a>',
+    u'john<a href="http://www.google.com/recaptcha/mailhide/d?k=PUBLIC&c=whWIqk0r4urZ-3S7y7uSceC9_ECd3hpAGy71E2o0HpI=" '
+    u'onclick="window.open(\'http://www.google.com/recaptcha/mailhide/d?k=PUBLIC&c=whWIqk0r4urZ-3S7y7uSceC9_ECd3hpAGy71E2o0HpI=\', \'\', '
+    u'\'toolbar=0,scrollbars=0,location=0,statusbar=0,menubar=0,resizable=0,width=500,height=300\');return false;" '
+    u'title="Reveal this e-mail address">\u2026</a>@example.com',
+    u'<a href="http://www.google.com/recaptcha/mailhide/d?k=PUBLIC&c=whWIqk0r4urZ-3S7y7uSceC9_ECd3hpAGy71E2o0HpI=" '
+    u'onclick="window.open(\'http://www.google.com/recaptcha/mailhide/d?k=PUBLIC&c=whWIqk0r4urZ-3S7y7uSceC9_ECd3hpAGy71E2o0HpI=\', \'\', '
+    u'\'toolbar=0,scrollbars=0,location=0,statusbar=0,menubar=0,resizable=0,width=500,height=300\');return false;" '
+    u'title="Reveal this e-mail address">Mail</a>'
+]
+
 
 class TestEncryption(unittest.TestCase):
     """
@@ -38,6 +60,46 @@ class TestEncryption(unittest.TestCase):
             dec = mailhide._decrypt_email_address(enc, self.private_key)
             self.assertEqual(email, dec)
 
+    def test_cbc(self):
+        # Encrypted with AES-128-CBC and a zero IV by another implementation
+        expected = binascii.unhexlify(b'c21588aa4d2be2ead9fb74bbcbbb9271e0bdfc409dde1a401b2ef5136a341e92')
+        self.assertEqual(mailhide._encrypt_email_address('johndoe@example.com', self.private_key),
+                         expected)
+
+    def test_backends(self):
+        emails = list(self.email_address_list)
+        expected = mailhide.Mailhide(self.private_key, 'PUBLIC').get_urls(emails)
+
+        for backend in aes.available_backends():
+            encoder = mailhide.Mailhide(self.private_key, 'PUBLIC', backend=backend)
+            self.assertEqual(encoder.get_urls(emails), expected, backend)
+
+    def test_bulk(self):
+        encoder = mailhide.Mailhide(self.private_key, 'PUBLIC')
+        emails = list(self.email_address_list)
+        encrypted = encoder.encrypt_many(emails)
+
+        self.assertEqual(encrypted, [encoder.encrypt(email) for email in emails])
+        self.assertEqual(encoder.decrypt_many(encrypted), emails)
+        self.assertEqual(encoder.get_urls(emails),
+                         [mailhide.get_url(email, self.private_key, 'PUBLIC') for email in emails])
+        self.assertEqual(encoder.get_htmls(emails, [None, 'Mail me', None]),
+                         [mailhide.get_html(emails[0], self.private_key, 'PUBLIC'),
+                          mailhide.get_html(emails[1], self.private_key, 'PUBLIC', label='Mail me'),
+                          mailhide.get_html(emails[2], self.private_key, 'PUBLIC')])
+        self.assertEqual(encoder.encrypt_many([]), [])
+
+    def test_streaming(self):
+        encoder = mailhide.Mailhide(self.private_key, 'PUBLIC', use_tls=False)
+        items = [(email, label) for email in self.email_address_list[:2] for label in (None, 'Mail')]
+        written = []
+
+        self.assertEqual(list(encoder.iter_htmls(iter(items), batch_size=3)), MAILHIDE_HTMLS)
+        self.assertEqual(encoder.write_htmls(iter(items), written.append, batch_size=3), len(items))
+        self.assertEqual(len(written), 2)
+        self.assertEqual(''.join(written), ''.join(MAILHIDE_HTMLS))
+        self.assertEqual([mailhide.get_html(email, self.private_key, 'PUBLIC', False, label)
+                          for email, label in items], MAILHIDE_HTMLS)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
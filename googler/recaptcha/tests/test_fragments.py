@@ -0,0 +1,58 @@
+##
+# Copyright (C) 2015 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.recaptcha import captcha, captcha2
+
+import unittest
+
+
+class TestFragments(unittest.TestCase):
+    """
+    Test case to test rendering and caching of the HTML fragments.
+    """
+    def test_head_html(self):
+        self.assertEqual(captcha2.head_html(),
+                         '<script src="https://www.google.com/recaptcha/api.js" async defer></script>')
+        self.assertEqual(captcha2.head_html(render='explicit', hl='de', onload='ready'),
+                         '<script src="https://www.google.com/recaptcha/api.js'
+                         '?hl=de&onload=ready&render=explicit" async defer></script>')
+
+    def test_head_html_validation(self):
+        for i in range(2):
+            self.assertRaises(AttributeError, captcha2.head_html, theme='dark')
+            self.assertRaises(ValueError, captcha2.head_html, render='later')
+
+    def test_widget_html(self):
+        html = captcha2.widget_html('SITE-KEY', theme='dark', type_='audio')
+
+        self.assertEqual(html, '<div class="g-recaptcha" data-sitekey="SITE-KEY" data-theme="dark" '
+                               'data-type="audio"></div>')
+        self.assertIs(captcha2.widget_html('SITE-KEY', theme='dark', type_='audio'), html)
+
+        for i in range(2):
+            self.assertRaises(ValueError, captcha2.widget_html, 'SITE-KEY', theme='blue')
+
+    def test_get_html(self):
+        html = captcha.get_html('PUBLIC-KEY', error='incorrect-captcha-sol')
+
+        self.assertIn('https://www.google.com/recaptcha/api/challenge?k=PUBLIC-KEY'
+                      '&error=incorrect-captcha-sol', html)
+        self.assertIs(captcha.get_html('PUBLIC-KEY', error='incorrect-captcha-sol'), html)
+        self.assertNotIn('error=', captcha.get_html('PUBLIC-KEY', use_tls=False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+##
+# Copyright (C) 2015 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.recaptcha import captcha, captcha2
+from googler.recaptcha.middleware import FormParser
+from googler.recaptcha.wsgi import RecaptchaMiddleware
+from googler.utils.tests.fakes import FakeTransport, answer_verification
+
+import io
+import unittest
+
+
+class _Input(object):
+    """
+    A request body which only delivers its second part after the
+    verification request has been made.
+    """
+    def __init__(self, head, tail, transport):
+        self.parts = [head, tail]
+        self.transport = transport
+        self.waited = None
+
+    def read(self, size=-1):
+        if len(self.parts) == 1:
+            self.waited = self.transport.requested.wait(5)
+        return self.parts.pop(0) if self.parts else b''
+
+
+class TestFormParser(unittest.TestCase):
+    """
+    Test case to test the incremental form parser.
+    """
+    def test_chunks(self):
+        body = b'name=x&g-recaptcha-response=a%2Fb+c&recaptcha_challenge_field=ch&' \
+               b'recaptcha_response_field=r'
+        parser = FormParser()
+
+        for i in range(0, len(body), 5):
+            parser.feed(body[i:i + 5])
+
+        self.assertEqual(parser.values, {'g-recaptcha-response': 'a/b c',
+                                         'recaptcha_challenge_field': 'ch'})
+        parser.close()
+        self.assertEqual(parser.values['recaptcha_response_field'], 'r')
+
+    def test_first_value_counts(self):
+        parser = FormParser()
+        parser.feed(b'g-recaptcha-response=a&g-recaptcha-response=b')
+        parser.close()
+
+        self.assertEqual(parser.values, {'g-recaptcha-response': 'a'})
+
+
+class TestWSGIMiddleware(unittest.TestCase):
+    """
+    Test case to test the WSGI middleware.
+    """
+    def setUp(self):
+        self.transport = FakeTransport(answer_verification)
+        self.seen = {}
+        self.middleware = RecaptchaMiddleware(self.app, 'secret', private_key='private',
+                                              transport=self.transport)
+
+    def app(self, environ, start_response):
+        future = environ['googler.recaptcha']
+        self.seen['response'] = future.result() if future is not None else None
+        self.seen['body'] = environ['wsgi.input'].read(int(environ.get('CONTENT_LENGTH') or 0))
+        start_response('200 OK', [])
+        return [b'']
+
+    def call(self, body, method='POST', content_type='application/x-www-form-urlencoded',
+             stream=None):
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': '/',
+            'CONTENT_TYPE': content_type,
+            'CONTENT_LENGTH': str(len(body)),
+            'REMOTE_ADDR': '127.0.0.1',
+            'wsgi.input': stream or io.BytesIO(body)
+        }
+        self.middleware(environ, lambda status, headers: None)
+        return self.seen['response']
+
+    def test_verifies_while_reading(self):
+        stream = _Input(b'g-recaptcha-response=valid&', b'comment=hello', self.transport)
+        response = self.call(b'g-recaptcha-response=valid&comment=hello', stream=stream)
+
+        self.assertTrue(stream.waited)
+        self.assertTrue(isinstance(response, captcha2.RecaptchaResponse))
+        self.assertTrue(response)
+        self.assertEqual(self.seen['body'], b'g-recaptcha-response=valid&comment=hello')
+
+    def test_invalid(self):
+        response = self.call(b'comment=hello&g-recaptcha-response=invalid')
+
+        self.assertFalse(response)
+        self.assertEqual(response.error_codes, ['invalid-input-response'])
+
+    def test_legacy(self):
+        response = self.call(b'recaptcha_challenge_field=ch&recaptcha_response_field=valid')
+
+        self.assertTrue(isinstance(response, captcha.RecaptchaResponse))
+        self.assertTrue(response)
+
+        response = self.call(b'recaptcha_challenge_field=ch&recaptcha_response_field=wrong')
+
+        self.assertFalse(response)
+        self.assertEqual(response.error_code, 'incorrect-captcha-sol')
+
+    def test_token_after_legacy_fields(self):
+        response = self.call(b'recaptcha_challenge_field=ch&recaptcha_response_field=wrong&'
+                             b'g-recaptcha-response=valid')
+
+        self.assertTrue(isinstance(response, captcha2.RecaptchaResponse))
+        self.assertTrue(response)
+        self.assertEqual(len(self.transport.requests), 1)
+
+    def test_no_fields(self):
+        self.assertIsNone(self.call(b'comment=hello'))
+        self.assertEqual(self.transport.requests, [])
+
+    def test_skipped_requests(self):
+        self.assertIsNone(self.call(b'g-recaptcha-response=valid', method='GET'))
+        self.assertIsNone(self.call(b'{}', content_type='application/json'))
+
+        self.middleware.max_body_size = 4
+        self.assertIsNone(self.call(b'g-recaptcha-response=valid'))
+        self.assertEqual(self.transport.requests, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
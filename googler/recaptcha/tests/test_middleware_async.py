@@ -0,0 +1,124 @@
+##
+# Copyright (C) 2015 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.recaptcha import captcha, captcha2
+from googler.utils.breaker import CircuitBreaker
+from googler.utils.tests.fakes import FakeTransport, answer_verification
+
+import asyncio
+import unittest
+
+try:
+    from googler.recaptcha import asgi
+except ImportError:
+    asgi = None
+
+
+class _AsyncTransport(FakeTransport):
+    async def post(self, url, data=None, headers=None):
+        return FakeTransport.post(self, url, data, headers)
+
+
+@unittest.skipIf(asgi is None, 'aiohttp is not installed')
+class TestASGIMiddleware(unittest.TestCase):
+    """
+    Test case to test the ASGI middleware.
+    """
+    def setUp(self):
+        self.transport = _AsyncTransport(answer_verification)
+        self.seen = {}
+        self.middleware = asgi.RecaptchaMiddleware(self.app, 'secret', private_key='private',
+                                                   transport=self.transport)
+
+    async def app(self, scope, receive, send):
+        task = scope['googler.recaptcha']
+        self.seen['response'] = (await task) if task is not None else None
+        body = b''
+
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+
+            if not message.get('more_body'):
+                break
+
+        self.seen['body'] = body
+
+    def call(self, chunks, content_type=b'application/x-www-form-urlencoded'):
+        scope = {
+            'type': 'http',
+            'method': 'POST',
+            'path': '/',
+            'headers': [(b'content-type', content_type)],
+            'client': ('127.0.0.1', 1234)
+        }
+        messages = [{'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1}
+                    for i, chunk in enumerate(chunks)]
+
+        async def receive():
+            # The verification starts with the first chunk
+            if len(messages) < len(chunks):
+                await asyncio.sleep(0)
+                self.seen['posted'] = self.transport.requested.is_set()
+            return messages.pop(0)
+
+        asyncio.run(self.middleware(scope, receive, None))
+        return self.seen['response']
+
+    def test_verifies_while_receiving(self):
+        response = self.call([b'g-recaptcha-response=valid&', b'comment=hello'])
+
+        self.assertTrue(self.seen['posted'])
+        self.assertTrue(isinstance(response, captcha2.RecaptchaResponse))
+        self.assertTrue(response)
+        self.assertEqual(self.seen['body'], b'g-recaptcha-response=valid&comment=hello')
+
+    def test_invalid(self):
+        response = self.call([b'g-recaptcha-response=invalid'])
+
+        self.assertFalse(response)
+        self.assertEqual(response.error_codes, ['invalid-input-response'])
+
+    def test_legacy(self):
+        response = self.call([b'recaptcha_challenge_field=ch&', b'recaptcha_response_field=valid'])
+
+        self.assertTrue(isinstance(response, captcha.RecaptchaResponse))
+        self.assertTrue(response)
+
+    def test_token_after_legacy_fields(self):
+        response = self.call([b'recaptcha_challenge_field=ch&recaptcha_response_field=wrong&',
+                              b'g-recaptcha-response=valid'])
+
+        self.assertTrue(isinstance(response, captcha2.RecaptchaResponse))
+        self.assertTrue(response)
+        self.assertEqual(len(self.transport.requests), 1)
+
+    def test_breaker(self):
+        self.middleware.breaker = CircuitBreaker(max_concurrency=0)
+        response = self.call([b'g-recaptcha-response=valid'])
+
+        self.assertFalse(response)
+        self.assertEqual(response.error_codes, ['request-error'])
+        self.assertEqual(self.transport.requests, [])
+
+    def test_skipped_requests(self):
+        self.assertIsNone(self.call([b'{}'], content_type=b'application/json'))
+        self.assertEqual(self.seen['body'], b'{}')
+        self.assertEqual(self.transport.requests, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
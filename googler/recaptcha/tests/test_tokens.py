@@ -0,0 +1,94 @@
+##
+# Copyright (C) 2015 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.recaptcha import captcha2
+from googler.recaptcha.tokens import TokenStore
+from googler.utils.cache import SQLiteCache
+from googler.utils.tests.fakes import FakeTransport, answer_verification
+
+import os
+import requests
+import shutil
+import tempfile
+import unittest
+
+
+class TestTokenStore(unittest.TestCase):
+    """
+    Test case to test that tokens are only verified once.
+    """
+    def setUp(self):
+        self.unreachable = False
+        self.transport = FakeTransport(self.answer)
+        self.tokens = TokenStore()
+
+    def answer(self, url, data):
+        if self.unreachable:
+            raise requests.ConnectionError()
+        return answer_verification(url, data)
+
+    def verify(self, response, tokens=None):
+        return captcha2.verify('secret', response, transport=self.transport,
+                               tokens=tokens or self.tokens)
+
+    def test_duplicate_valid_token(self):
+        self.assertTrue(self.verify('valid'))
+
+        with self.assertRaises(captcha2.DuplicateToken) as cm:
+            self.verify('valid')
+
+        self.assertEqual(cm.exception.error_codes, ['timeout-or-duplicate'])
+        self.assertEqual(len(self.transport.requests), 1)
+
+    def test_duplicate_invalid_token(self):
+        for i in range(2):
+            with self.assertRaises(captcha2.RecaptchaError) as cm:
+                self.verify('invalid')
+
+            self.assertEqual(cm.exception.error_codes, ['invalid-input-response'])
+
+        self.assertTrue(isinstance(cm.exception, captcha2.DuplicateToken))
+        self.assertEqual(len(self.transport.requests), 1)
+
+    def test_request_error_releases_token(self):
+        self.unreachable = True
+
+        with self.assertRaises(captcha2.RecaptchaError) as cm:
+            self.verify('valid')
+
+        self.assertEqual(cm.exception.error_codes, ['request-error'])
+
+        self.unreachable = False
+        self.assertTrue(self.verify('valid'))
+        self.assertEqual(len(self.transport.requests), 2)
+
+    def test_shared_backend(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'tokens.sqlite')
+
+        try:
+            self.assertTrue(self.verify('valid', TokenStore(SQLiteCache(path))))
+
+            with self.assertRaises(captcha2.DuplicateToken):
+                self.verify('valid', TokenStore(SQLiteCache(path)))
+        finally:
+            shutil.rmtree(directory)
+
+        self.assertEqual(len(self.transport.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
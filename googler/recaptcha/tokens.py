@@ -0,0 +1,112 @@
+##
+# Copyright (C) 2015 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.utils.cache import LRUCache
+
+import hashlib
+
+"""
+This module implements a store of recently verified reCAPTCHA 2.0 tokens, to be
+passed to googler.recaptcha.captcha2.verify().
+"""
+
+# Default time to live of a token (tokens expire after two minutes; keep some margin)
+DEFAULT_TTL = 5 * 60
+
+# Default maximum number of tokens kept in memory
+DEFAULT_MAXSIZE = 100000
+
+# Token states
+PENDING = 'pending'
+VALID = 'valid'
+INVALID = 'invalid'
+
+
+class TokenStore(object):
+    """
+    A store of recently verified user response tokens and their outcomes.
+
+    Tokens can only be verified once: a token is claimed before it is sent to
+    the API, so any repeated submission of it - a double-clicked form, a
+    retried request or a replayed token - finds the claim and is answered
+    without a request.
+
+    The tokens are kept in a cache backend (see googler.utils.cache), which
+    defaults to an in-memory LRUCache. Use a backend shared between processes,
+    such as SQLiteCache, so all workers see the same tokens.
+    """
+    def __init__(self, backend=None, ttl=DEFAULT_TTL):
+        """
+        :param backend: Cache backend (optional); defaults to a LRUCache
+        :param ttl: Time to live of a token in seconds
+        """
+        self.backend = backend if backend is not None else LRUCache(DEFAULT_MAXSIZE, ttl)
+        self.ttl = ttl
+
+    def claim(self, secret_key, response):
+        """
+        Claim a token for verification.
+
+        :param secret_key: Shared secret key
+        :param response: User response token
+        :return: None if the token was claimed, otherwise its entry, a dict with
+                 "state" (PENDING, VALID or INVALID) and "error_codes"
+        """
+        key = self.make_key(secret_key, response)
+
+        if self.backend.add(key, {'state': PENDING, 'error_codes': []}, self.ttl):
+            return None
+
+        # The entry may have expired since add() saw it
+        return self.backend.get(key) or {'state': PENDING, 'error_codes': []}
+
+    def resolve(self, secret_key, response, error_codes=None):
+        """
+        Record the outcome of the verification of a claimed token.
+
+        :param secret_key: Shared secret key
+        :param response: User response token
+        :param error_codes: Error codes if the token was rejected (optional)
+        """
+        entry = {'state': INVALID if error_codes else VALID, 'error_codes': error_codes or []}
+        self.backend.set(self.make_key(secret_key, response), entry, self.ttl)
+
+    def release(self, secret_key, response):
+        """
+        Drop the claim of a token which could not be verified, so it can be
+        submitted again.
+
+        :param secret_key: Shared secret key
+        :param response: User response token
+        """
+        self.backend.delete(self.make_key(secret_key, response))
+
+    def clear(self):
+        """
+        Remove all tokens.
+        """
+        self.backend.clear()
+
+    @staticmethod
+    def make_key(secret_key, response):
+        """
+        Build the key of a token, without exposing the secret or the token.
+
+        :param secret_key: Shared secret key
+        :param response: User response token
+        :return: Key string
+        """
+        return 'token:' + hashlib.sha1((secret_key + '\n' + response).encode('utf-8')).hexdigest()
@@ -0,0 +1,164 @@
+##
+# Copyright (C) 2015 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.recaptcha.middleware import CHUNK_SIZE, DEFAULT_MAX_BODY_SIZE, ENVIRON_KEY, \
+    FormParser, is_form_post, verify_form
+from googler.utils import lazy
+
+import io
+import threading
+
+futures = lazy.module('concurrent.futures')
+
+"""
+This module implements a WSGI middleware which verifies the captcha of form posts.
+"""
+
+# Default number of threads verifying captchas
+DEFAULT_MAX_WORKERS = 16
+
+
+class RecaptchaMiddleware(object):
+    """
+    A WSGI middleware which verifies the captcha fields of form posts.
+
+    The request body is buffered, and the verification is started in a
+    thread as soon as the reCAPTCHA 2.0 token has been read, so it runs while
+    the rest of the body is received and the application handles the request.
+    Legacy fields are only verified once the whole body has been read without
+    a token.
+
+    The application finds a concurrent.futures.Future in
+    environ["googler.recaptcha"], whose result is a RecaptchaResponse (of
+    captcha2, or of captcha for legacy fields), or None if the request has no
+    captcha fields. It is None for requests which are not verified at all:
+
+        def app(environ, start_response):
+            future = environ['googler.recaptcha']
+            response = future.result() if future is not None else None
+
+            if not response:
+                ...
+
+        app = RecaptchaMiddleware(app, secret_key)
+
+    The body is replaced by the buffered one, so the application reads it
+    as usual.
+    """
+    def __init__(self, app, secret_key, private_key=None, paths=None,
+                 max_body_size=DEFAULT_MAX_BODY_SIZE, executor=None, transport=None, tokens=None,
+                 breaker=None):
+        """
+        :param app: WSGI application
+        :param secret_key: reCAPTCHA 2.0 secret key
+        :param private_key: Legacy reCAPTCHA private key (optional); enables legacy verification
+        :param paths: Paths to verify form posts on (optional); defaults to all paths
+        :param max_body_size: Maximum size of the request bodies which are verified
+        :param executor: Executor to verify in (optional); defaults to a thread pool
+        :param transport: Transport to use (optional); defaults to the shared transport
+        :param tokens: TokenStore to check and record tokens in (optional)
+        :param breaker: CircuitBreaker to guard the requests with (optional)
+        """
+        self.app = app
+        self.secret_key = secret_key
+        self.private_key = private_key
+        self.paths = frozenset(paths) if paths is not None else None
+        self.max_body_size = max_body_size
+        self.transport = transport
+        self.tokens = tokens
+        self.breaker = breaker
+        self._executor = executor
+        self._executor_lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        environ[ENVIRON_KEY] = None
+
+        if self._should_verify(environ):
+            environ[ENVIRON_KEY] = self._read_form(environ)
+
+        return self.app(environ, start_response)
+
+    @property
+    def executor(self):
+        """
+        The executor verifications run in.
+        """
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = futures.ThreadPoolExecutor(max_workers=DEFAULT_MAX_WORKERS)
+
+        return self._executor
+
+    def _should_verify(self, environ):
+        if self.paths is not None and environ.get('PATH_INFO') not in self.paths:
+            return False
+
+        # Without a length, the body cannot be read safely
+        content_length = environ.get('CONTENT_LENGTH')
+
+        if not content_length:
+            return False
+
+        return is_form_post(environ.get('REQUEST_METHOD'), environ.get('CONTENT_TYPE'),
+                            content_length, self.max_body_size)
+
+    def _read_form(self, environ):
+        """
+        Buffer the request body, and start the verification as soon as the
+        reCAPTCHA 2.0 token has been read.
+
+        :return: Future
+        """
+        stream = environ['wsgi.input']
+        remaining = int(environ['CONTENT_LENGTH'])
+        parser = FormParser()
+        chunks = []
+        future = None
+
+        while remaining > 0:
+            chunk = stream.read(min(CHUNK_SIZE, remaining))
+
+            if not chunk:
+                break
+
+            chunks.append(chunk)
+            remaining -= len(chunk)
+            parser.feed(chunk)
+
+            # Legacy fields must wait, since a token may still follow them
+            if future is None and parser.has_response:
+                future = self._submit(parser.values, environ)
+
+        parser.close()
+
+        if future is None and parser.has_fields:
+            future = self._submit(parser.values, environ)
+        elif future is None:
+            # Nothing to verify, so there's no need to wait for a thread
+            future = futures.Future()
+            future.set_result(None)
+
+        body = b''.join(chunks)
+        environ['wsgi.input'] = io.BytesIO(body)
+        environ['CONTENT_LENGTH'] = str(len(body))
+
+        return future
+
+    def _submit(self, values, environ):
+        return self.executor.submit(verify_form, dict(values), self.secret_key, self.private_key,
+                                    environ.get('REMOTE_ADDR'), transport=self.transport,
+                                    tokens=self.tokens, breaker=self.breaker)
@@ -0,0 +1,174 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+import importlib
+import os
+import threading
+
+"""
+This module implements AES ciphers on top of the fastest installed crypto library.
+
+The supported backends, from fastest to slowest, are:
+
+* `cryptography`: the cryptography package (OpenSSL)
+* `cryptodome`: the Cryptodome package, provided by pycryptodomex
+* `crypto`: the Crypto package, provided by pycryptodome or pycrypto
+
+The backend is picked when the first cipher is created, and nothing is imported
+before. Set the GOOGLER_AES_BACKEND environment variable to force a backend.
+
+Ciphers only implement ECB mode on whole blocks; modes are built on top of it
+by the callers. All backends produce identical output.
+"""
+
+# Size of an AES block in bytes
+BLOCK_SIZE = 16
+
+# Environment variable to force a backend
+BACKEND_VARIABLE = 'GOOGLER_AES_BACKEND'
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+class _CryptographyCipher(object):
+    def __init__(self, key):
+        from cryptography.hazmat.backends import default_backend
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+        self._cipher = Cipher(algorithms.AES(key), modes.ECB(), backend=default_backend())
+
+    def encrypt(self, data):
+        # Contexts are cheap and not thread-safe, so one is created per call
+        context = self._cipher.encryptor()
+        return context.update(data) + context.finalize()
+
+    def decrypt(self, data):
+        context = self._cipher.decryptor()
+        return context.update(data) + context.finalize()
+
+
+class _PyCryptoCipher(object):
+    def __init__(self, key, package):
+        AES = __import__(package + '.Cipher.AES', fromlist=['AES'])
+        self._cipher = AES.new(key, AES.MODE_ECB)
+
+    def encrypt(self, data):
+        return self._cipher.encrypt(data)
+
+    def decrypt(self, data):
+        return self._cipher.decrypt(data)
+
+
+def _cryptography(key):
+    return _CryptographyCipher(key)
+
+
+def _cryptodome(key):
+    return _PyCryptoCipher(key, 'Cryptodome')
+
+
+def _crypto(key):
+    return _PyCryptoCipher(key, 'Crypto')
+
+
+# Backends by name, in order of preference
+BACKENDS = (
+    ('cryptography', _cryptography),
+    ('cryptodome', _cryptodome),
+    ('crypto', _crypto)
+)
+
+# Modules whose presence tells that a backend is installed
+_MODULES = {
+    'cryptography': 'cryptography.hazmat.primitives.ciphers',
+    'cryptodome': 'Cryptodome.Cipher.AES',
+    'crypto': 'Crypto.Cipher.AES'
+}
+
+
+def available_backends():
+    """
+    Determine the installed backends.
+
+    :return: List of backend names, in order of preference
+    """
+    return [name for name, factory in BACKENDS if _is_installed(name)]
+
+
+def get_backend():
+    """
+    Return the name of the backend used by default, picking it on first use.
+
+    Only the backends preferred over the picked one are imported.
+
+    :raises: ImportError if no backend is installed
+    :raises: ValueError if the environment variable names an unknown backend
+    :return: Backend name
+    """
+    global _backend
+
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _pick_backend()
+
+    return _backend
+
+
+def _pick_backend():
+    forced = os.environ.get(BACKEND_VARIABLE)
+
+    if forced:
+        if forced not in _MODULES:
+            raise ValueError('Unknown AES backend in %s: %r' % (BACKEND_VARIABLE, forced))
+        return forced
+
+    for name, factory in BACKENDS:
+        if _is_installed(name):
+            return name
+
+    raise ImportError('AES requires cryptography, pycryptodomex, pycryptodome or pycrypto')
+
+
+def _is_installed(name):
+    try:
+        importlib.import_module(_MODULES[name])
+    except ImportError:
+        return False
+    return True
+
+
+def new(key, backend=None):
+    """
+    Create an AES cipher in ECB mode.
+
+    The cipher has encrypt(data) and decrypt(data) methods, which take and
+    return byte strings whose length is a multiple of BLOCK_SIZE. It is safe
+    to share between threads.
+
+    :param key: Key (16, 24 or 32 bytes)
+    :param backend: Name of the backend to use (optional); defaults to get_backend()
+    :return: Cipher object
+    """
+    if backend is None:
+        backend = get_backend()
+
+    for name, factory in BACKENDS:
+        if name == backend:
+            return factory(key)
+
+    raise ValueError('Unknown AES backend: {!r}'.format(backend))
@@ -0,0 +1,214 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.utils.http import DEFAULT_BACKOFF_FACTOR, DEFAULT_POOL_SIZE, DEFAULT_RETRIES, \
+    DEFAULT_TIMEOUT, RETRY_STATUS_CODES, get_headers
+from googler.utils import decode
+
+import aiohttp
+import asyncio
+import weakref
+
+"""
+This module implements the asyncio counterpart of googler.utils.http. It requires
+Python 3.5 or higher and aiohttp.
+"""
+
+# Exceptions raised by AsyncTransport when a request fails
+REQUEST_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+# Default transports, one per event loop
+_default_transports = weakref.WeakKeyDictionary()
+
+
+class Response(object):
+    """
+    A completely read HTTP response.
+    """
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return decode.loads(self.content)
+
+
+class AsyncTransport(object):
+    """
+    An asyncio HTTP transport with a keep-alive connection pool.
+
+    This mirrors googler.utils.http.Transport: connections are kept open and
+    reused, requests are subject to connect and read timeouts, and GET requests
+    are retried with exponential backoff on connection errors and 5xx responses.
+    POST requests are only retried when the connection could not be established.
+
+    A transport is bound to the event loop it is first used in.
+    """
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF_FACTOR):
+        """
+        :param pool_size: Maximum number of connections per host
+        :param timeout: Timeout in seconds; either a single value or a (connect, read) tuple
+        :param retries: Number of retries on connection errors and 5xx responses
+        :param backoff_factor: Backoff factor between retries
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            if isinstance(self.timeout, tuple):
+                connect_timeout, read_timeout = self.timeout
+            else:
+                connect_timeout = read_timeout = self.timeout
+
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.pool_size)
+            timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                                  headers=get_headers())
+
+        return self._session
+
+    async def request(self, method, url, params=None, data=None, headers=None):
+        """
+        Perform a HTTP request using the connection pool.
+
+        :param method: HTTP method
+        :param url: URL
+        :param params: Query parameters (optional)
+        :param data: Form data (optional)
+        :param headers: Additional headers (optional)
+        :raises: One of REQUEST_ERRORS if the request has failed
+        :return: Response object
+        """
+        session = self._get_session()
+        idempotent = method in ('GET', 'HEAD')
+        attempt = 0
+
+        while True:
+            try:
+                async with session.request(method, url, params=params, data=data,
+                                           headers=headers) as r:
+                    content = await r.read()
+
+                    if not (idempotent and r.status in RETRY_STATUS_CODES and attempt < self.retries):
+                        return Response(r.status, content, r.headers)
+            except aiohttp.ClientConnectorError:
+                if attempt >= self.retries:
+                    raise
+            except REQUEST_ERRORS:
+                if not idempotent or attempt >= self.retries:
+                    raise
+
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+            attempt += 1
+
+    async def get(self, url, **kwargs):
+        """
+        Perform a GET request.
+
+        :param url: URL
+        :return: Response object
+        """
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        """
+        Perform a POST request.
+
+        :param url: URL
+        :return: Response object
+        """
+        return await self.request('POST', url, **kwargs)
+
+    async def close(self):
+        """
+        Close all pooled connections.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+def get_default_async_transport():
+    """
+    Return the transport shared by all coroutines of the running event loop
+    which do not receive an explicit one. It is created on first use.
+
+    :return: AsyncTransport object
+    """
+    loop = asyncio.get_event_loop()
+    transport = _default_transports.get(loop)
+
+    if transport is None:
+        transport = _default_transports[loop] = AsyncTransport()
+
+    return transport
+
+
+class AsyncSingleFlight(object):
+    """
+    Coalesces concurrent coroutine calls with the same key.
+
+    This is the asyncio counterpart of googler.utils.singleflight.SingleFlight:
+    while a call for a key is running in an event loop, further calls for that
+    key in the same loop await it and share its result (or its exception). Cancelling
+    one of the callers does not cancel the call for the others.
+    """
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, func, *args, **kwargs):
+        """
+        Await `func(*args, **kwargs)`, unless a call for `key` is already running.
+
+        :param key: Hashable key identifying the call
+        :param func: Coroutine function to call
+        :return: Result of the coroutine
+        """
+        loop = asyncio.get_event_loop()
+        key = (loop, key)
+        task = self._calls.get(key)
+
+        if task is None:
+            # The call runs as its own task, so cancelling any caller, including
+            # the first one, does not cancel it for the others
+            task = self._calls[key] = asyncio.ensure_future(func(*args, **kwargs))
+            task.add_done_callback(lambda done: self._finish(key, done))
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+        # Mark the exception as retrieved, in case nobody waits for it anymore
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,152 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+import threading
+import time
+
+"""
+This module implements a circuit breaker, to fail fast while an API is down.
+"""
+
+# Circuit states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitBreaker(object):
+    """
+    A thread-safe circuit breaker with a cap on outstanding requests.
+
+    Share one instance between all threads making requests against the same
+    API. Each request first calls acquire(); if it returns True, the request is
+    made and its outcome reported with release(). Otherwise the request must
+    not be made, and the caller applies its failure policy right away instead
+    of waiting for a request which is likely to fail:
+
+    * The circuit opens after `failure_threshold` consecutive failures. While
+      it is open, acquire() returns False.
+    * After `recovery_timeout` seconds, the circuit is half-open: up to
+      `probes` requests are let through. If they succeed, the circuit closes;
+      if one fails, it opens again.
+    * If `max_concurrency` is set, acquire() also returns False while that many
+      requests are outstanding, so a slow API cannot tie up all workers.
+
+    `fail_open` tells callers whether to accept (True) or reject (False) what
+    they could not verify while requests are refused.
+    """
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0, probes=1, max_concurrency=None,
+                 fail_open=False):
+        """
+        :param failure_threshold: Number of consecutive failures which open the circuit
+        :param recovery_timeout: Seconds the circuit stays open before requests are probed
+        :param probes: Number of successful requests in half-open state which close the circuit
+        :param max_concurrency: Maximum number of outstanding requests (optional)
+        :param fail_open: Specifies whether callers accept instead of reject while requests are refused
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.probes = probes
+        self.max_concurrency = max_concurrency
+        self.fail_open = fail_open
+        self.failures = 0
+        self.outstanding = 0
+        self._state = CLOSED
+        self._opened = None
+        self._probing = 0
+        self._probed = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """
+        The current state: CLOSED, OPEN or HALF_OPEN.
+        """
+        with self._lock:
+            self._update(time.time())
+            return self._state
+
+    def _update(self, now):
+        if self._state == OPEN and now - self._opened >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._probing = 0
+            self._probed = 0
+
+    def acquire(self):
+        """
+        Ask for permission to make a request. A True result must be followed
+        by a call of release().
+
+        :return: True if the request may be made
+        """
+        with self._lock:
+            self._update(time.time())
+
+            if self._state == OPEN:
+                return False
+
+            if self.max_concurrency is not None and self.outstanding >= self.max_concurrency:
+                return False
+
+            if self._state == HALF_OPEN:
+                if self._probing + self._probed >= self.probes:
+                    return False
+                self._probing += 1
+
+            self.outstanding += 1
+            return True
+
+    def release(self, success):
+        """
+        Report the outcome of a request.
+
+        Only failures of the API itself, such as connection errors or timeouts,
+        should be reported as such; rejected input is a success.
+
+        :param success: Specifies whether the request has succeeded, or None if its
+                        outcome is unknown (e.g. it was cancelled); then only its slot is given back
+        """
+        with self._lock:
+            self.outstanding -= 1
+            probe = self._state == HALF_OPEN and self._probing > 0
+
+            if probe:
+                self._probing -= 1
+
+            if success is None:
+                return
+            elif success:
+                self.failures = 0
+
+                if probe:
+                    self._probed += 1
+
+                    if self._probed >= self.probes:
+                        self._state = CLOSED
+            else:
+                self.failures += 1
+
+                if probe or self.failures >= self.failure_threshold:
+                    self._state = OPEN
+                    self._opened = time.time()
+
+    def reset(self):
+        """
+        Close the circuit and forget all failures.
+        """
+        with self._lock:
+            self._state = CLOSED
+            self.failures = 0
@@ -0,0 +1,348 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.utils import lazy
+
+import collections
+import json
+import os
+import threading
+import time
+
+# Imported on first use, since only SQLiteCache needs it
+sqlite3 = lazy.module('sqlite3')
+
+"""
+This module implements cache backends. A backend maps string keys to
+JSON-serializable values, each with an optional time to live.
+"""
+
+
+class BaseCache(object):
+    """
+    Interface for cache backends.
+
+    Implementations must be safe to use from multiple threads.
+    """
+    def get(self, key):
+        """
+        Look up a value.
+
+        :param key: Cache key
+        :return: Cached value, or None if it is missing or expired
+        """
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value.
+
+        :param key: Cache key
+        :param value: JSON-serializable value
+        :param ttl: Time to live in seconds (optional); None uses the backend's default
+        """
+        raise NotImplementedError
+
+    def add(self, key, value, ttl=None):
+        """
+        Store a value, unless the key already holds one which has not expired.
+
+        Backends shared between processes should override this with an atomic
+        implementation; this one only checks and sets in two steps.
+
+        :param key: Cache key
+        :param value: JSON-serializable value
+        :param ttl: Time to live in seconds (optional); None uses the backend's default
+        :return: True if the value was stored
+        """
+        if self.get(key) is not None:
+            return False
+
+        self.set(key, value, ttl)
+        return True
+
+    def delete(self, key):
+        """
+        Remove a value, if present.
+
+        :param key: Cache key
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        """
+        Remove all values.
+        """
+        raise NotImplementedError
+
+    def items(self):
+        """
+        Iterate over all entries which have not expired.
+
+        :return: Iterator of (key, value) tuples
+        """
+        raise NotImplementedError
+
+    def keys(self):
+        """
+        Iterate over the keys of all entries which have not expired, without
+        marking them as used.
+
+        :return: Iterator of keys
+        """
+        for key, value in self.items():
+            yield key
+
+
+class LRUCache(BaseCache):
+    """
+    An in-memory cache which evicts the least recently used entries once it
+    holds more than `maxsize` entries.
+    """
+    def __init__(self, maxsize=1024, ttl=None):
+        """
+        :param maxsize: Maximum number of entries
+        :param ttl: Default time to live in seconds (optional); None keeps entries until evicted
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+
+            if entry is None:
+                return None
+
+            expires, value = entry
+
+            if expires is not None and expires <= time.time():
+                return None
+
+            # Re-insert to mark the entry as most recently used
+            self._entries[key] = entry
+            return value
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+
+        expires = time.time() + ttl if ttl is not None else None
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires, value)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def add(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+
+        now = time.time()
+        expires = now + ttl if ttl is not None else None
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and (entry[0] is None or entry[0] > now):
+                return False
+
+            self._entries.pop(key, None)
+            self._entries[key] = (expires, value)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def items(self):
+        now = time.time()
+
+        with self._lock:
+            entries = list(self._entries.items())
+
+        for key, (expires, value) in entries:
+            if expires is None or expires > now:
+                yield key, value
+
+
+class SQLiteCache(BaseCache):
+    """
+    A persistent cache stored in a SQLite database file.
+
+    The database can be shared by several processes (and threads) at once, so
+    workers on one host see each other's entries and keep them across restarts.
+    Values are stored as JSON.
+
+    Expired entries are removed lazily. If `maxsize` is given, the oldest
+    entries are removed from time to time to keep the database at about
+    that size.
+    """
+    # Number of writes between two purges of expired and surplus entries
+    PURGE_INTERVAL = 1000
+
+    def __init__(self, path, ttl=None, maxsize=None, timeout=5.0):
+        """
+        :param path: Path of the database file
+        :param ttl: Default time to live in seconds (optional); None keeps entries forever
+        :param maxsize: Approximate maximum number of entries (optional)
+        :param timeout: Seconds to wait for a lock held by another process
+        """
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = 0
+
+        conn = self._connect()
+        conn.execute('CREATE TABLE IF NOT EXISTS cache '
+                     '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL, created REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS cache_created ON cache (created)')
+
+    def __len__(self):
+        row = self._connect().execute('SELECT COUNT(*) FROM cache WHERE expires IS NULL OR expires > ?',
+                                      (time.time(),)).fetchone()
+        return row[0]
+
+    def _connect(self):
+        """
+        Return the connection of the current thread and process, creating it if needed.
+        """
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+
+        # Connections must not be shared with forked worker processes
+        if conn is None or self._local.pid != pid:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = pid
+
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute('SELECT value, expires FROM cache WHERE key = ?',
+                                      (key,)).fetchone()
+
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+
+        now = time.time()
+        expires = now + ttl if ttl is not None else None
+
+        self._connect().execute('INSERT OR REPLACE INTO cache (key, value, expires, created) '
+                                'VALUES (?, ?, ?, ?)', (key, json.dumps(value), expires, now))
+
+        self._writes += 1
+
+        if self._writes % self.PURGE_INTERVAL == 0:
+            self.purge()
+
+    def add(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+
+        now = time.time()
+        expires = now + ttl if ttl is not None else None
+        conn = self._connect()
+
+        # Take the write lock up front, so no other process can insert the key in between
+        conn.execute('BEGIN IMMEDIATE')
+
+        try:
+            conn.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, now))
+            cursor = conn.execute('INSERT OR IGNORE INTO cache (key, value, expires, created) '
+                                  'VALUES (?, ?, ?, ?)', (key, json.dumps(value), expires, now))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        if cursor.rowcount != 1:
+            return False
+
+        self._writes += 1
+
+        if self._writes % self.PURGE_INTERVAL == 0:
+            self.purge()
+
+        return True
+
+    def delete(self, key):
+        self._connect().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        self._connect().execute('DELETE FROM cache')
+
+    def items(self):
+        cursor = self._connect().execute('SELECT key, value FROM cache WHERE expires IS NULL OR expires > ?',
+                                         (time.time(),))
+
+        for key, value in cursor:
+            yield key, json.loads(value)
+
+    def keys(self):
+        cursor = self._connect().execute('SELECT key FROM cache WHERE expires IS NULL OR expires > ?',
+                                         (time.time(),))
+
+        for row in cursor:
+            yield row[0]
+
+    def purge(self):
+        """
+        Remove expired entries and, if `maxsize` is set, the oldest entries
+        exceeding it.
+        """
+        conn = self._connect()
+        conn.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+
+        if self.maxsize is not None:
+            conn.execute('DELETE FROM cache WHERE key IN '
+                         '(SELECT key FROM cache ORDER BY created DESC LIMIT -1 OFFSET ?)',
+                         (self.maxsize,))
+
+    def close(self):
+        """
+        Close the connection of the current thread.
+        """
+        conn = getattr(self._local, 'conn', None)
+
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -23,9 +23,9 @@ if PY2:
     text_type = unicode
     bytes_type = str
 
-    from urllib import urlencode
+    from urllib import unquote_plus, urlencode
 else:
     text_type = str
     bytes_type = bytes
 
-    from urllib.parse import urlencode
\ No newline at end of file
+    from urllib.parse import unquote_plus, urlencode
\ No newline at end of file
@@ -0,0 +1,45 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.utils import lazy
+
+import json
+import sys
+
+# Imported on first use, if it is installed
+orjson = lazy.module('orjson', optional=True)
+
+"""
+This module implements decoding of API responses. JSON is parsed straight from
+the response body, using orjson if it is installed.
+"""
+
+
+def loads(content):
+    """
+    Decode a JSON document.
+
+    :param content: JSON document (bytes or text)
+    :return: Decoded object
+    """
+    if orjson:
+        return orjson.loads(content)
+
+    # The json module only accepts bytes since Python 3.6
+    if isinstance(content, bytes) and sys.version_info < (3, 6):
+        content = content.decode('utf-8')
+
+    return json.loads(content)
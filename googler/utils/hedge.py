@@ -0,0 +1,189 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.utils import lazy
+
+import collections
+import threading
+import time
+
+futures = lazy.module('concurrent.futures')
+
+"""
+This module implements hedged requests, to cut the tail latency of an API.
+"""
+
+# Default number of threads requests are made in
+DEFAULT_MAX_WORKERS = 32
+
+# Number of latencies observed after which the hedging delay is recomputed
+_REFRESH_INTERVAL = 16
+
+
+class Hedger(object):
+    """
+    A thread-safe policy for hedged requests.
+
+    A request which has not answered within the `percentile` of the recently
+    observed latencies is sent a second time, and whichever answer arrives
+    first is taken. The slower request is not cancelled, but its answer is
+    discarded.
+
+    Every call earns `budget` hedges, e.g. 0.05 for at most one extra request
+    per 20 calls, and credit for at most `burst` hedges is kept, so bursts of
+    slow answers cannot multiply the load. Nothing is hedged until
+    `min_samples` latencies have been observed.
+
+    Requests are made in a thread pool; share one instance between all
+    threads making requests against the same API, and make sure its pool is
+    larger than the number of concurrent calls.
+    """
+    def __init__(self, percentile=95, budget=0.05, burst=10, window=1000, min_samples=20,
+                 executor=None):
+        """
+        :param percentile: Percentile of the observed latency after which a request is hedged
+        :param budget: Number of hedges earned per call
+        :param burst: Maximum number of hedges which can be saved up
+        :param window: Number of recent latencies the percentile is computed from
+        :param min_samples: Number of latencies to observe before requests are hedged
+        :param executor: Executor to make requests in (optional); defaults to a thread pool
+        """
+        if not 0 < percentile < 100:
+            raise ValueError('percentile must be between 0 and 100')
+
+        self.percentile = percentile
+        self.budget = budget
+        self.burst = burst
+        self.min_samples = min_samples
+        self.calls = 0
+        self.hedges = 0
+        self.wins = 0
+        self._latencies = collections.deque(maxlen=window)
+        self._delay = None
+        self._stale = 0
+        self._credit = 0.0
+        self._executor = executor
+        self._lock = threading.Lock()
+
+    @property
+    def delay(self):
+        """
+        Seconds after which a request is hedged, or None while too few
+        latencies have been observed.
+        """
+        with self._lock:
+            refresh = self._delay is None or self._stale >= _REFRESH_INTERVAL
+
+            if self._stale and refresh and len(self._latencies) >= self.min_samples:
+                latencies = sorted(self._latencies)
+                index = int(len(latencies) * self.percentile / 100.0)
+                self._delay = latencies[min(index, len(latencies) - 1)]
+                self._stale = 0
+
+            return self._delay
+
+    @property
+    def executor(self):
+        """
+        The executor requests are made in.
+        """
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = futures.ThreadPoolExecutor(max_workers=DEFAULT_MAX_WORKERS)
+
+        return self._executor
+
+    def observe(self, seconds):
+        """
+        Add the latency of a request. Hedges are not observed, so the
+        latency is not skewed by the requests they have won.
+
+        :param seconds: Latency in seconds
+        """
+        with self._lock:
+            self._latencies.append(seconds)
+            self._stale += 1
+
+    def call(self, fn, *args):
+        """
+        Call a function making a request, and call it again if it is too slow.
+
+        :param fn: Function making the request; it is called with `args`
+        :return: Return value of the first call which returned
+        :raises: The exception of the first call if both calls have raised
+        """
+        delay = self.delay
+
+        with self._lock:
+            self.calls += 1
+            self._credit = min(self.burst, self._credit + self.budget)
+
+        if delay is None:
+            started = time.time()
+            result = fn(*args)
+            self.observe(time.time() - started)
+            return result
+
+        started = time.time()
+        primary = self.executor.submit(fn, *args)
+        primary.add_done_callback(lambda future: self._observe_future(future, started))
+
+        try:
+            return primary.result(timeout=delay)
+        except futures.TimeoutError:
+            # The request itself may have timed out, or has just finished
+            if primary.done():
+                return primary.result()
+
+        if not self._spend():
+            return primary.result()
+
+        hedge = self.executor.submit(fn, *args)
+        pending = (primary, hedge)
+
+        while pending:
+            done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+            succeeded = [future for future in done if future.exception() is None]
+
+            if succeeded:
+                break
+
+        if hedge in succeeded and primary not in succeeded:
+            with self._lock:
+                self.wins += 1
+            return hedge.result()
+
+        # Prefer the original request, also to report its error if both have failed
+        return primary.result()
+
+    def _spend(self):
+        """
+        Take a hedge from the budget.
+
+        :return: True if a hedge may be sent
+        """
+        with self._lock:
+            if self._credit < 1:
+                return False
+
+            self._credit -= 1
+            self.hedges += 1
+            return True
+
+    def _observe_future(self, future, started):
+        if not future.cancelled() and future.exception() is None:
+            self.observe(time.time() - started)
@@ -15,6 +15,38 @@
 ##
 
 from googler import __version__ as _version
+from googler.utils import metrics
+from requests.adapters import HTTPAdapter
+
+import requests
+import threading
+
+try:
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+    from urllib3.util.retry import Retry
+except ImportError:
+    from requests.packages.urllib3.connection import HTTPConnection, HTTPSConnection
+    from requests.packages.urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+    from requests.packages.urllib3.util.retry import Retry
+
+# Connect and read timeouts (in seconds) used when none are given
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# Number of keep-alive connections kept per host
+DEFAULT_POOL_SIZE = 10
+
+# Number of retries on connection errors and 5xx responses
+DEFAULT_RETRIES = 3
+
+# Backoff factor between retries (0.1s, 0.2s, 0.4s, ...)
+DEFAULT_BACKOFF_FACTOR = 0.1
+
+# Status codes which are retried
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
 
 
 def get_user_agent():
@@ -32,4 +64,206 @@ def get_headers():
 
     :return: dict
     """
-    return {'User-agent': get_user_agent()}
\ No newline at end of file
+    return {'User-agent': get_user_agent()}
+
+
+class _TimedConnectionMixin(object):
+    """
+    Adds the time spent connecting and waiting for responses to the current
+    metrics event.
+    """
+    def _new_conn(self):
+        with metrics.timed('connect'):
+            return super(_TimedConnectionMixin, self)._new_conn()
+
+    def getresponse(self, *args, **kwargs):
+        with metrics.timed('response'):
+            return super(_TimedConnectionMixin, self).getresponse(*args, **kwargs)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        event = metrics.current_event()
+
+        if event is None:
+            return HTTPSConnection.connect(self)
+
+        # connect() opens the socket through _new_conn(), which is timed on its own
+        connect = event.timings.get('connect', 0)
+        start = metrics.timer()
+        HTTPSConnection.connect(self)
+        connect = event.timings.get('connect', 0) - connect
+        event.add_timing('tls', metrics.timer() - start - connect)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    """
+    A HTTPAdapter whose connections report their timings to googler.utils.metrics.
+    """
+    def init_poolmanager(self, *args, **kwargs):
+        HTTPAdapter.init_poolmanager(self, *args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool
+        }
+
+
+class Transport(object):
+    """
+    A reusable HTTP transport with a keep-alive connection pool.
+
+    A transport is safe to share between threads. Connections to the same
+    host are kept open and reused, so only the first request pays for the
+    TCP and TLS handshake.
+
+    Idempotent requests are retried with exponential backoff on connection
+    errors and 5xx responses. Non-idempotent requests (POST) are only retried
+    when the connection could not be established, since the server never saw
+    them.
+
+    Requests made while an API call is traced (see googler.utils.metrics) add
+    their timings, sizes, status code and retries to its event.
+    """
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF_FACTOR):
+        """
+        :param pool_size: Number of keep-alive connections kept per host
+        :param timeout: Timeout in seconds; either a single value or a (connect, read) tuple
+        :param retries: Number of retries on connection errors and 5xx responses
+        :param backoff_factor: Backoff factor between retries
+        """
+        self.timeout = timeout
+
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                      backoff_factor=backoff_factor, status_forcelist=RETRY_STATUS_CODES,
+                      raise_on_status=False)
+        adapter = _TimedHTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.headers.update(get_headers())
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def request(self, method, url, **kwargs):
+        """
+        Perform a HTTP request using the connection pool.
+
+        :param method: HTTP method
+        :param url: URL
+        :param kwargs: Additional arguments passed to requests
+        :return: requests.Response object
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        event = metrics.current_event()
+
+        if event is None:
+            return self.session.request(method, url, **kwargs)
+
+        stream = kwargs.pop('stream', False)
+        r = self.session.request(method, url, stream=True, **kwargs)
+
+        event.status_code = r.status_code
+        event.retries += _count_retries(r)
+        event.bytes_sent += _request_size(r.request)
+
+        if not stream:
+            with metrics.timed('transfer'):
+                event.bytes_received += len(r.content)
+
+        return r
+
+    def get(self, url, **kwargs):
+        """
+        Perform a GET request.
+
+        :param url: URL
+        :return: requests.Response object
+        """
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """
+        Perform a POST request.
+
+        :param url: URL
+        :return: requests.Response object
+        """
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        """
+        Close all pooled connections.
+        """
+        self.session.close()
+
+
+def _count_retries(r):
+    """
+    :return: Number of retries urllib3 has made for a response
+    """
+    retries = getattr(r.raw, 'retries', None)
+    return len(retries.history) if retries is not None else 0
+
+
+def _request_size(request):
+    """
+    Estimate the size of a prepared request on the wire.
+
+    :return: Size in bytes
+    """
+    size = len(request.method) + len(request.url) + 11
+
+    for name, value in request.headers.items():
+        size += len(name) + len(value) + 4
+
+    if request.body:
+        size += len(request.body)
+
+    return size
+
+
+def get_default_transport():
+    """
+    Return the transport shared by all API calls which do not receive
+    an explicit one. It is created on first use.
+
+    :return: Transport object
+    """
+    global _default_transport
+
+    if _default_transport is None:
+        with _default_transport_lock:
+            if _default_transport is None:
+                _default_transport = Transport()
+
+    return _default_transport
+
+
+def set_default_transport(transport):
+    """
+    Replace the shared default transport.
+
+    :param transport: Transport object, or None to create a new one on next use
+    """
+    global _default_transport
+
+    with _default_transport_lock:
+        _default_transport = transport
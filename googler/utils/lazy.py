@@ -0,0 +1,125 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+import importlib
+
+"""
+This module implements deferred imports, to keep importing googler cheap.
+Heavy dependencies such as requests are only imported when they are first used.
+"""
+
+# Marks a module which has not been imported yet
+_MISSING = object()
+
+
+class LazyModule(object):
+    """
+    A stand-in for a module, which imports it on first attribute access.
+
+    If the module is optional, a missing module does not raise on import;
+    the object is then false, and should be tested before attributes are
+    accessed:
+
+        orjson = lazy.module('orjson', optional=True)
+
+        if orjson:
+            orjson.loads(content)
+    """
+    def __init__(self, name, optional=False):
+        """
+        :param name: Absolute module name
+        :param optional: Specifies whether the module may be missing
+        """
+        self.__dict__['_name'] = name
+        self.__dict__['_optional'] = optional
+        self.__dict__['_module'] = _MISSING
+
+    def __repr__(self):
+        return '<LazyModule: %s>' % self._name
+
+    def _load(self):
+        module = self._module
+
+        if module is _MISSING:
+            try:
+                module = importlib.import_module(self._name)
+            except ImportError:
+                if not self._optional:
+                    raise
+                module = None
+
+            self.__dict__['_module'] = module
+
+        return module
+
+    def __getattr__(self, name):
+        module = self._load()
+
+        if module is None:
+            raise AttributeError('Module {!r} is not installed'.format(self._name))
+
+        return getattr(module, name)
+
+    def __bool__(self):
+        return self._load() is not None
+
+    __nonzero__ = __bool__
+
+
+def module(name, optional=False):
+    """
+    Return a stand-in for a module, which is imported on first use.
+
+    :param name: Absolute module name
+    :param optional: Specifies whether the module may be missing
+    :return: LazyModule object
+    """
+    return LazyModule(name, optional)
+
+
+def exports(package, names):
+    """
+    Build a module-level __getattr__ function (PEP 562) which imports
+    re-exported names from their modules on first access.
+
+    Python versions before 3.7 do not call module-level __getattr__; there,
+    use load_exports() to import the names eagerly instead.
+
+    :param package: Name of the package the function is for, for error messages
+    :param names: dict mapping names to the modules they are defined in
+    :return: Function
+    """
+    def __getattr__(name):
+        if name not in names:
+            raise AttributeError('module {!r} has no attribute {!r}'.format(package, name))
+
+        value = getattr(importlib.import_module(names[name]), name)
+        # Cache the value, so __getattr__ is not called again
+        setattr(importlib.import_module(package), name, value)
+        return value
+
+    return __getattr__
+
+
+def load_exports(namespace, names):
+    """
+    Import re-exported names eagerly into a namespace.
+
+    :param namespace: dict to import into, e.g. globals()
+    :param names: dict mapping names to the modules they are defined in
+    """
+    for name, module_name in names.items():
+        namespace[name] = getattr(importlib.import_module(module_name), name)
@@ -0,0 +1,383 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.utils import lazy
+
+import bisect
+import contextlib
+import threading
+import time
+
+# Imported on first use, since it is only needed to report failures
+logging = lazy.module('logging')
+
+"""
+This module implements the instrumentation of API calls.
+
+Every call of get_geocode(), captcha.verify() and captcha2.verify() is traced
+by an Event, which collects the time spent in each phase of the call, the bytes
+transferred, the status and the cache outcome. Finished events are passed to the
+listeners of a Metrics registry, which also aggregates them into counters and
+latency histograms that can be exported to a sink.
+
+The phases of a call are:
+
+* `connect`: DNS lookup and TCP connect of new connections
+* `tls`: TLS handshake of new connections
+* `response`: waiting for the response headers, i.e. network and server time
+* `transfer`: reading the response body
+* `parse`: decoding the response (for streamed responses, this includes reading it)
+* `total`: the whole call, including time spent in the library itself
+"""
+
+# Upper bounds (in seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Most precise clock available
+timer = getattr(time, 'perf_counter', time.time)
+
+_local = threading.local()
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+
+class Event(object):
+    """
+    The record of a single API call.
+    """
+    __slots__ = ('name', 'status', 'status_code', 'error', 'cache', 'retries', 'bytes_sent',
+                 'bytes_received', 'timings')
+
+    def __init__(self, name):
+        #: Name of the API call, e.g. "geocode"
+        self.name = name
+        #: Status reported by the API, e.g. "OK" or an error code
+        self.status = None
+        #: HTTP status code of the last response
+        self.status_code = None
+        #: Name of the exception if the call has failed without a response
+        self.error = None
+        #: "hit" or "miss" if a cache was consulted
+        self.cache = None
+        #: Number of retried requests
+        self.retries = 0
+        #: Approximate size of the requests sent
+        self.bytes_sent = 0
+        #: Size of the response bodies received
+        self.bytes_received = 0
+        #: Seconds spent per phase
+        self.timings = {}
+
+    def __repr__(self):
+        return '<Event: %s %s %.3fs>' % (self.name, self.status or self.error,
+                                         self.timings.get('total', 0))
+
+    def add_timing(self, phase, seconds):
+        """
+        Add time spent in a phase. Phases passed several times, e.g. because
+        a request was retried, are summed up.
+
+        :param phase: Phase name
+        :param seconds: Duration in seconds
+        """
+        self.timings[phase] = self.timings.get(phase, 0) + seconds
+
+
+class Histogram(object):
+    """
+    A histogram of observed values with fixed buckets.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        :param buckets: Sorted upper bounds of the buckets
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        """
+        Add a value.
+
+        :param value: Value
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q):
+        """
+        Estimate a percentile by the upper bound of the bucket it falls in.
+
+        :param q: Percentile between 0 and 100
+        :return: Upper bound, None if nothing was observed, or inf if it is beyond the last bucket
+        """
+        return percentile(self.snapshot(), q)
+
+    def snapshot(self):
+        """
+        :return: dict with the cumulative bucket counts, count and sum
+        """
+        buckets = []
+        seen = 0
+
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            buckets.append((bound, seen))
+
+        return {'buckets': buckets, 'count': self.count, 'sum': self.sum}
+
+
+class Metrics(object):
+    """
+    A registry of counters and latency histograms fed by API call events.
+
+    Counters are named "<call>.<counter>", e.g. "geocode.calls" or
+    "geocode.status.ZERO_RESULTS"; histograms "<call>.<phase>", e.g.
+    "geocode.response". A registry is safe to share between threads.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        :param buckets: Upper bounds of the latency histogram buckets
+        """
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener):
+        """
+        Register a function which is called with every finished Event.
+
+        Listeners are called in the thread which made the API call. Exceptions
+        raised by a listener are logged and do not affect the call.
+
+        :param listener: Function taking an Event
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """
+        Unregister a listener.
+
+        :param listener: Function which was passed to add_listener()
+        """
+        self._listeners.remove(listener)
+
+    def record(self, event):
+        """
+        Add a finished Event to the counters and histograms and pass it to the listeners.
+
+        :param event: Event object
+        """
+        prefix = event.name + '.'
+        counts = [('calls', 1), ('retries', event.retries), ('bytes_sent', event.bytes_sent),
+                  ('bytes_received', event.bytes_received)]
+
+        if event.error is not None:
+            counts.append(('errors', 1))
+        if event.status is not None:
+            counts.append(('status.%s' % event.status, 1))
+        if event.cache is not None:
+            counts.append(('cache.%s' % event.cache, 1))
+
+        with self._lock:
+            for name, value in counts:
+                name = prefix + name
+                self.counters[name] = self.counters.get(name, 0) + value
+
+            for phase, seconds in event.timings.items():
+                name = prefix + phase
+                histogram = self.histograms.get(name)
+
+                if histogram is None:
+                    histogram = self.histograms[name] = Histogram(self.buckets)
+
+                histogram.observe(seconds)
+
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception:
+                logging.getLogger(__name__).exception('Metrics listener %r has failed', listener)
+
+    def snapshot(self):
+        """
+        :return: dict with the current "counters" and "histograms"
+        """
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'histograms': dict((name, histogram.snapshot())
+                                   for name, histogram in self.histograms.items())
+            }
+
+    def export(self, sink):
+        """
+        Pass a snapshot to a sink.
+
+        :param sink: BaseSink object
+        """
+        sink.export(self.snapshot())
+
+    def reset(self):
+        """
+        Reset all counters and histograms.
+        """
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+class BaseSink(object):
+    """
+    Base class for exporting metric snapshots to a monitoring system.
+    """
+    def export(self, snapshot):
+        """
+        Export a snapshot.
+
+        :param snapshot: dict as returned by Metrics.snapshot()
+        """
+        raise NotImplementedError()
+
+
+class LoggingSink(BaseSink):
+    """
+    A sink writing counters and p50/p99 latencies to a logger.
+    """
+    def __init__(self, logger=None, level=None):
+        """
+        :param logger: Logger to write to (optional); defaults to the logger of this module
+        :param level: Log level (optional); defaults to INFO
+        """
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self.level = level if level is not None else logging.INFO
+
+    def export(self, snapshot):
+        for name, value in sorted(snapshot['counters'].items()):
+            self.logger.log(self.level, '%s %s', name, value)
+
+        for name, data in sorted(snapshot['histograms'].items()):
+            self.logger.log(self.level, '%s count=%d p50<=%s p99<=%s', name, data['count'],
+                            percentile(data, 50), percentile(data, 99))
+
+
+def percentile(snapshot, q):
+    """
+    Estimate a percentile from a histogram snapshot by the upper bound of the
+    bucket it falls in.
+
+    :param snapshot: dict as returned by Histogram.snapshot()
+    :param q: Percentile between 0 and 100
+    :return: Upper bound, None if nothing was observed, or inf if it is beyond the last bucket
+    """
+    if not snapshot['count']:
+        return None
+
+    rank = q / 100.0 * snapshot['count']
+
+    for bound, count in snapshot['buckets']:
+        if count >= rank:
+            return bound
+
+
+@contextlib.contextmanager
+def trace(name, metrics=None):
+    """
+    Trace an API call. The Event is the current event of the thread until
+    the block is left, and is then recorded.
+
+    If the block raises before an API status was set, the name of the exception
+    is recorded as the error.
+
+    :param name: Name of the API call
+    :param metrics: Metrics to record the event in (optional); defaults to the shared registry
+    :return: Event object
+    """
+    event = Event(name)
+    previous = getattr(_local, 'event', None)
+    _local.event = event
+    start = timer()
+
+    try:
+        yield event
+    except Exception as e:
+        if event.error is None and event.status is None:
+            event.error = type(e).__name__
+        raise
+    finally:
+        event.add_timing('total', timer() - start)
+        _local.event = previous
+        (metrics or get_default_metrics()).record(event)
+
+
+@contextlib.contextmanager
+def timed(phase):
+    """
+    Add the time spent in the block to a phase of the current event, if any.
+
+    :param phase: Phase name
+    """
+    event = getattr(_local, 'event', None)
+
+    if event is None:
+        yield
+        return
+
+    start = timer()
+
+    try:
+        yield
+    finally:
+        event.add_timing(phase, timer() - start)
+
+
+def current_event():
+    """
+    :return: The Event of the API call being traced in this thread, or None
+    """
+    return getattr(_local, 'event', None)
+
+
+def get_default_metrics():
+    """
+    Return the registry all API calls are recorded in. It is created on first use.
+
+    :return: Metrics object
+    """
+    global _default_metrics
+
+    if _default_metrics is None:
+        with _default_metrics_lock:
+            if _default_metrics is None:
+                _default_metrics = Metrics()
+
+    return _default_metrics
+
+
+def set_default_metrics(metrics):
+    """
+    Replace the shared registry.
+
+    :param metrics: Metrics object, or None to create a new one on next use
+    """
+    global _default_metrics
+
+    with _default_metrics_lock:
+        _default_metrics = metrics
@@ -0,0 +1,140 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+import random
+import threading
+import time
+
+"""
+This module implements a client-side rate limiter for API quotas.
+"""
+
+# Seconds per day, for daily quotas
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+class _TokenBucket(object):
+    """
+    A token bucket refilled at `rate` tokens per second, holding at most
+    `capacity` tokens. The bucket may go into debt; callers then wait until
+    their token would have been available.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = self.capacity
+        self.updated = time.time()
+
+    def reserve(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class RateLimiter(object):
+    """
+    A thread-safe rate limiter for queries per second and per day.
+
+    Share one instance between all threads making requests against the same
+    quota. Each request first calls acquire(), which blocks until the request
+    fits into the configured rates.
+
+    The limiter also adapts to the server: when a request is rejected for being
+    over the quota, throttle() halves the effective queries per second and
+    returns a backoff delay to wait before retrying. Each accepted request
+    then lets the rate recover a bit towards the configured one.
+
+    The daily quota is enforced as a rolling window, i.e. once it is used up,
+    requests are spread over the rest of the day.
+    """
+    def __init__(self, per_second=None, per_day=None, burst=None, max_retries=5,
+                 backoff=1.0, max_backoff=60.0):
+        """
+        :param per_second: Queries per second (optional)
+        :param per_day: Queries per day (optional)
+        :param burst: Number of queries which may be made at once (optional); defaults to per_second
+        :param max_retries: Number of retries for requests rejected for being over the quota
+        :param backoff: Base backoff delay in seconds, doubled for every retry
+        :param max_backoff: Maximum backoff delay in seconds
+        """
+        self.per_second = per_second
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate_factor = 1.0
+        self._buckets = []
+        self._second = None
+        self._lock = threading.Lock()
+
+        if per_second:
+            self._second = _TokenBucket(per_second, burst or max(1, per_second))
+            self._buckets.append(self._second)
+
+        if per_day:
+            self._buckets.append(_TokenBucket(float(per_day) / SECONDS_PER_DAY, per_day))
+
+    def reserve(self):
+        """
+        Reserve a request and return the number of seconds to wait before making it.
+
+        :return: Delay in seconds
+        """
+        now = time.time()
+
+        with self._lock:
+            return max([bucket.reserve(now) for bucket in self._buckets] or [0.0])
+
+    def acquire(self):
+        """
+        Block until a request may be made.
+        """
+        delay = self.reserve()
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def throttle(self, attempt):
+        """
+        Reduce the rate after a request was rejected for being over the quota.
+
+        :param attempt: Number of the retry about to be made, starting at 0
+        :return: Delay in seconds to wait before retrying
+        """
+        with self._lock:
+            self.rate_factor = max(0.01, self.rate_factor / 2)
+
+            if self._second is not None:
+                self._second.rate = self.per_second * self.rate_factor
+
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def recover(self):
+        """
+        Let the rate recover after a request was accepted.
+        """
+        if self.rate_factor >= 1.0:
+            return
+
+        with self._lock:
+            self.rate_factor = min(1.0, self.rate_factor + 0.05)
+
+            if self._second is not None:
+                self._second.rate = self.per_second * self.rate_factor
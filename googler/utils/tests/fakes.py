@@ -0,0 +1,134 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+import json
+import threading
+import time
+
+"""
+This module implements a fake transport for the test cases, which answers
+requests without network access.
+"""
+
+
+class FakeResponse(object):
+    """
+    A completely read HTTP response.
+    """
+    def __init__(self, content=b'', status_code=200, chunk_size=None):
+        """
+        :param content: Body (bytes), or a value to encode as JSON
+        :param status_code: HTTP status code
+        :param chunk_size: Size of the chunks iter_content() yields, regardless of the requested size (optional)
+        """
+        if not isinstance(content, bytes):
+            content = json.dumps(content).encode('utf-8')
+
+        self.content = content
+        self.status_code = status_code
+        self.chunk_size = chunk_size
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size=1):
+        chunk_size = self.chunk_size or chunk_size
+
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+
+class FakeTransport(object):
+    """
+    A transport which answers requests with a function.
+
+    The function is called with the URL and the query parameters (GET) or
+    form data (POST) of every request. It returns a FakeResponse, a body or a
+    value to encode as JSON, or raises to fail the request.
+
+    The parameters and URLs of all requests are recorded in `requests` and
+    `urls`, the streaming flags of GET requests in `streamed`, and the
+    `requested` event is set once a request has been made.
+    """
+    def __init__(self, answer, delay=0):
+        """
+        :param answer: Function answering requests
+        :param delay: Seconds every request takes
+        """
+        self.answer = answer
+        self.delay = delay
+        self.requests = []
+        self.urls = []
+        self.streamed = []
+        self.requested = threading.Event()
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, stream=False):
+        self.streamed.append(stream)
+        return self._request(url, params)
+
+    def post(self, url, data=None, headers=None):
+        return self._request(url, data)
+
+    def _request(self, url, payload):
+        with self._lock:
+            self.requests.append(payload)
+            self.urls.append(url)
+
+        self.requested.set()
+
+        if self.delay:
+            time.sleep(self.delay)
+
+        response = self.answer(url, payload)
+
+        if not isinstance(response, FakeResponse):
+            response = FakeResponse(response)
+
+        return response
+
+
+def answer_verification(url, data):
+    """
+    Answer reCAPTCHA 2.0 and legacy verification requests: the response "valid"
+    is accepted, any other one rejected.
+    """
+    valid = data['response'] == 'valid'
+
+    if 'secret' in data:
+        if valid:
+            return {'success': True, 'hostname': 'example.com'}
+        return {'success': False, 'error-codes': ['invalid-input-response']}
+
+    return b'true\n' if valid else b'false\nincorrect-captcha-sol'
+
+
+def answer_geocode(*points):
+    """
+    Build a Geocoding response.
+
+    :param points: (latitude, longitude) tuples of the results
+    :return: Decoded response
+    """
+    if not points:
+        return {'status': 'ZERO_RESULTS', 'results': []}
+
+    return {'status': 'OK', 'results': [
+        {'geometry': {'location': {'lat': lat, 'lng': lng}}} for lat, lng in points]}
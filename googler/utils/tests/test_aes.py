@@ -0,0 +1,69 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.utils import aes
+
+import binascii
+import os
+import unittest
+
+# Example vector of FIPS-197, appendix C.1
+KEY = binascii.unhexlify(b'000102030405060708090a0b0c0d0e0f')
+PLAIN_TEXT = binascii.unhexlify(b'00112233445566778899aabbccddeeff')
+CIPHER_TEXT = binascii.unhexlify(b'69c4e0d86a7b0430d8cdb78070b4c55a')
+
+
+class TestAES(unittest.TestCase):
+    """
+    Test case to test that all installed AES backends produce the same output.
+    """
+    def setUp(self):
+        self.backends = aes.available_backends()
+
+        if not self.backends:
+            self.skipTest('No AES backend is installed')
+
+    def test_known_answer(self):
+        for backend in self.backends:
+            cipher = aes.new(KEY, backend)
+
+            self.assertEqual(cipher.encrypt(PLAIN_TEXT * 3), CIPHER_TEXT * 3, backend)
+            self.assertEqual(cipher.decrypt(CIPHER_TEXT), PLAIN_TEXT, backend)
+
+    def test_default_backend(self):
+        self.assertEqual(aes.get_backend(), self.backends[0])
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, aes.new, KEY, 'rot13')
+
+    def test_forced_backend(self):
+        previous = aes._backend
+        aes._backend = None
+        os.environ[aes.BACKEND_VARIABLE] = 'rot13'
+
+        try:
+            self.assertRaises(ValueError, aes.get_backend)
+            self.assertIsNone(aes._backend)
+
+            os.environ[aes.BACKEND_VARIABLE] = self.backends[-1]
+            self.assertEqual(aes.get_backend(), self.backends[-1])
+        finally:
+            del os.environ[aes.BACKEND_VARIABLE]
+            aes._backend = previous
+
+
+if __name__ == '__main__':
+    unittest.main()
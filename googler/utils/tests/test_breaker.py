@@ -0,0 +1,189 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.recaptcha import captcha, captcha2
+from googler.utils import breaker
+from googler.utils.tests.fakes import FakeResponse, FakeTransport
+
+import requests
+import time
+import unittest
+
+
+def _timeout(url, data):
+    raise requests.ConnectTimeout()
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    Test case to test the states of the circuit breaker.
+    """
+    def setUp(self):
+        self.breaker = breaker.CircuitBreaker(failure_threshold=2, recovery_timeout=0.01)
+
+    def fail(self):
+        self.assertTrue(self.breaker.acquire())
+        self.breaker.release(False)
+
+    def test_open_and_close(self):
+        self.fail()
+        self.assertEqual(self.breaker.state, breaker.CLOSED)
+        self.fail()
+        self.assertEqual(self.breaker.state, breaker.OPEN)
+        self.assertFalse(self.breaker.acquire())
+
+        time.sleep(0.02)
+        self.assertEqual(self.breaker.state, breaker.HALF_OPEN)
+
+        # Only one probe is let through
+        self.assertTrue(self.breaker.acquire())
+        self.assertFalse(self.breaker.acquire())
+        self.breaker.release(True)
+
+        self.assertEqual(self.breaker.state, breaker.CLOSED)
+        self.assertTrue(self.breaker.acquire())
+
+    def test_failed_probe(self):
+        self.fail()
+        self.fail()
+        time.sleep(0.02)
+        self.fail()
+
+        self.assertEqual(self.breaker.state, breaker.OPEN)
+
+    def test_success_resets_failures(self):
+        self.fail()
+        self.assertTrue(self.breaker.acquire())
+        self.breaker.release(True)
+        self.fail()
+
+        self.assertEqual(self.breaker.state, breaker.CLOSED)
+
+    def test_unknown_outcome(self):
+        self.fail()
+        self.assertTrue(self.breaker.acquire())
+        self.breaker.release(None)
+
+        self.assertEqual(self.breaker.failures, 1)
+        self.assertEqual(self.breaker.outstanding, 0)
+
+        # A cancelled probe lets another one through
+        self.fail()
+        time.sleep(0.02)
+        self.assertTrue(self.breaker.acquire())
+        self.breaker.release(None)
+        self.assertEqual(self.breaker.state, breaker.HALF_OPEN)
+        self.assertTrue(self.breaker.acquire())
+
+    def test_max_concurrency(self):
+        self.breaker.max_concurrency = 2
+
+        self.assertTrue(self.breaker.acquire())
+        self.assertTrue(self.breaker.acquire())
+        self.assertFalse(self.breaker.acquire())
+        self.breaker.release(True)
+        self.assertTrue(self.breaker.acquire())
+
+
+class TestVerifyWithBreaker(unittest.TestCase):
+    """
+    Test case to test that verification fails fast while the circuit is open.
+    """
+    def setUp(self):
+        self.transport = FakeTransport(_timeout)
+        self.breaker = breaker.CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+
+    def test_captcha2_fail_closed(self):
+        for i in range(4):
+            with self.assertRaises(captcha2.RecaptchaError) as cm:
+                captcha2.verify('secret', 'token', transport=self.transport, breaker=self.breaker)
+
+            self.assertEqual(cm.exception.error_codes, ['request-error'])
+
+        self.assertEqual(len(self.transport.requests), 2)
+
+    def test_captcha2_fail_open(self):
+        self.breaker.fail_open = True
+
+        for i in range(2):
+            self.assertRaises(captcha2.RecaptchaError, captcha2.verify, 'secret', 'token',
+                              transport=self.transport, breaker=self.breaker)
+
+        response = captcha2.verify('secret', 'token', transport=self.transport, breaker=self.breaker)
+
+        self.assertTrue(response)
+        self.assertFalse(response.verified)
+        self.assertEqual(len(self.transport.requests), 2)
+
+    def test_captcha(self):
+        for i in range(3):
+            with self.assertRaises(captcha.RecaptchaError) as cm:
+                captcha.verify('challenge', 'response', 'key', '127.0.0.1', transport=self.transport,
+                               breaker=self.breaker)
+
+            self.assertEqual(cm.exception.error_code, 'recaptcha-not-reachable')
+
+        self.assertEqual(len(self.transport.requests), 2)
+
+    def test_server_errors(self):
+        # The API answers like during an outage
+        transport = FakeTransport(lambda url, data: FakeResponse(status_code=503))
+
+        for i in range(4):
+            with self.assertRaises(captcha2.RecaptchaError) as cm:
+                captcha2.verify('secret', 'token', transport=transport, breaker=self.breaker)
+
+            self.assertEqual(cm.exception.error_codes, ['request-error'])
+
+        self.assertEqual(self.breaker.state, breaker.OPEN)
+        self.assertEqual(len(transport.requests), 2)
+
+        self.breaker.reset()
+        del transport.requests[:]
+
+        for i in range(4):
+            with self.assertRaises(captcha.RecaptchaError) as cm:
+                captcha.verify('challenge', 'response', 'key', '127.0.0.1', transport=transport,
+                               breaker=self.breaker)
+
+            self.assertEqual(cm.exception.error_code, 'recaptcha-not-reachable')
+
+        self.assertEqual(self.breaker.state, breaker.OPEN)
+        self.assertEqual(len(transport.requests), 2)
+
+    def test_malformed_responses(self):
+        transport = FakeTransport(lambda url, data: b'<html>Service Unavailable</html>')
+
+        for i in range(2):
+            self.assertRaises(captcha2.RecaptchaError, captcha2.verify, 'secret', 'token',
+                              transport=transport, breaker=self.breaker)
+
+        self.assertEqual(self.breaker.state, breaker.OPEN)
+
+    def test_rejected_token_is_success(self):
+        transport = FakeTransport(lambda url, data: {'success': False,
+                                                     'error-codes': ['invalid-input-response']})
+
+        for i in range(3):
+            self.assertRaises(captcha2.RecaptchaError, captcha2.verify, 'secret', 'token',
+                              transport=transport, breaker=self.breaker)
+
+        self.assertEqual(self.breaker.state, breaker.CLOSED)
+        self.assertEqual(self.breaker.failures, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
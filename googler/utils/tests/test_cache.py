@@ -0,0 +1,137 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.utils import cache
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+
+class TestLRUCache(unittest.TestCase):
+    """
+    Test case to test eviction and expiry of the in-memory cache.
+    """
+    def setUp(self):
+        self.cache = cache.LRUCache(maxsize=3)
+
+    def test_eviction(self):
+        for key in ('a', 'b', 'c'):
+            self.cache.set(key, key.upper())
+
+        # Touch "a", so "b" is the least recently used entry
+        self.assertEqual(self.cache.get('a'), 'A')
+        self.cache.set('d', 'D')
+
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.get('b'), None)
+        self.assertEqual(self.cache.get('a'), 'A')
+        self.assertEqual(self.cache.get('d'), 'D')
+
+    def test_expiry(self):
+        self.cache.set('a', 'A', ttl=0.01)
+        self.cache.set('b', 'B')
+        time.sleep(0.02)
+
+        self.assertEqual(self.cache.get('a'), None)
+        self.assertEqual(self.cache.get('b'), 'B')
+
+    def test_delete_and_clear(self):
+        self.cache.set('a', 'A')
+        self.cache.set('b', 'B')
+        self.cache.delete('a')
+
+        self.assertEqual(self.cache.get('a'), None)
+
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_add(self):
+        self.assertTrue(self.cache.add('a', 'A', ttl=0.01))
+        self.assertFalse(self.cache.add('a', 'B'))
+        time.sleep(0.02)
+
+        self.assertTrue(self.cache.add('a', 'C'))
+        self.assertEqual(self.cache.get('a'), 'C')
+
+
+class TestSQLiteCache(unittest.TestCase):
+    """
+    Test case to test the persistent cache, including access from another process.
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite')
+        self.cache = cache.SQLiteCache(self.path)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def test_roundtrip(self):
+        value = {'status': 'OK', 'results': [{'formatted_address': u'M\xfcnchen'}]}
+        self.cache.set('a', value)
+
+        self.assertEqual(self.cache.get('a'), value)
+        self.assertEqual(self.cache.get('b'), None)
+
+        self.cache.delete('a')
+        self.assertEqual(self.cache.get('a'), None)
+
+    def test_expiry(self):
+        self.cache.set('a', 1, ttl=0.01)
+        self.cache.set('b', 2)
+        time.sleep(0.02)
+
+        self.assertEqual(self.cache.get('a'), None)
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(list(self.cache.keys()), ['b'])
+
+    def test_add(self):
+        self.assertTrue(self.cache.add('a', 1, ttl=0.01))
+        self.assertFalse(cache.SQLiteCache(self.path).add('a', 2))
+        time.sleep(0.02)
+
+        self.assertTrue(self.cache.add('a', 3))
+        self.assertEqual(self.cache.get('a'), 3)
+
+    def test_maxsize(self):
+        self.cache.maxsize = 2
+
+        for i in range(5):
+            self.cache.set(str(i), i)
+            time.sleep(0.001)
+
+        self.cache.purge()
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get('4'), 4)
+        self.assertEqual(self.cache.get('0'), None)
+
+    def test_shared_between_processes(self):
+        code = ('from googler.utils.cache import SQLiteCache; '
+                'SQLiteCache(%r).set("from-child", [1, 2, 3])' % self.path)
+        subprocess.check_call([sys.executable, '-c', code])
+
+        self.assertEqual(self.cache.get('from-child'), [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# coding: utf-8
+
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps import geocoding
+from googler.utils import decode
+
+import unittest
+
+
+class TestDecode(unittest.TestCase):
+    """
+    Test case to test decoding of API responses.
+    """
+    def setUp(self):
+        self.content = (u'{"status": "OK", "results": [{'
+                        u'"address_components": [{"long_name": "M\\u00fcnchen", "types": ["locality"]}],'
+                        u'"formatted_address": "München, Germany",'
+                        u'"geometry": {"location": {"lat": 48.1351253, "lng": 11.5819806}}'
+                        u'}]}').encode('utf-8')
+        self.orjson = decode.orjson
+
+    def tearDown(self):
+        decode.orjson = self.orjson
+
+    def test_parsers_agree(self):
+        data = decode.loads(self.content)
+        decode.orjson = None
+
+        self.assertEqual(decode.loads(self.content), data)
+        self.assertEqual(data['results'][0]['formatted_address'], u'München, Germany')
+
+    def test_exclude_fields(self):
+        data = geocoding._decode_response(self.content, 'json', exclude=('address_components',))
+        geocode = geocoding.GeocodeResult(data).first
+
+        self.assertFalse('address_components' in data['results'][0])
+        self.assertEqual(geocode.address_components, None)
+        self.assertAlmostEqual(geocode.latitude, 48.1351253)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.utils.hedge import Hedger
+
+import threading
+import time
+import unittest
+
+
+class TestHedger(unittest.TestCase):
+    """
+    Test case to test when requests are hedged.
+    """
+    def setUp(self):
+        self.hedger = Hedger(percentile=90, budget=0.5, burst=1, min_samples=10)
+
+        for i in range(10):
+            self.hedger.observe(0.01 * (i + 1))
+
+    def test_delay(self):
+        self.assertIsNone(Hedger(min_samples=10).delay)
+        self.assertAlmostEqual(self.hedger.delay, 0.1)
+
+    def test_fast_requests(self):
+        self.assertEqual(self.hedger.call(lambda x: x * 2, 21), 42)
+        self.assertEqual(self.hedger.hedges, 0)
+
+    def test_slow_request(self):
+        calls = []
+        released = threading.Event()
+
+        def request():
+            calls.append(None)
+
+            # The first request hangs until the hedge has answered
+            if len(calls) == 1:
+                released.wait(5)
+                return 'primary'
+            return 'hedge'
+
+        self.hedger.call(lambda: None)
+        self.assertEqual(self.hedger.call(request), 'hedge')
+        released.set()
+
+        self.assertEqual(self.hedger.hedges, 1)
+        self.assertEqual(self.hedger.wins, 1)
+
+    def test_budget(self):
+        def request():
+            time.sleep(0.15)
+            return 'done'
+
+        for i in range(4):
+            self.assertEqual(self.hedger.call(request), 'done')
+
+        # Each call earns half a hedge, and only one may be saved up
+        self.assertEqual(self.hedger.calls, 4)
+        self.assertEqual(self.hedger.hedges, 2)
+
+    def test_errors(self):
+        def request():
+            time.sleep(0.15)
+            raise ValueError()
+
+        self.hedger.call(lambda: None)
+
+        with self.assertRaises(ValueError):
+            self.hedger.call(request)
+
+        self.assertEqual(self.hedger.hedges, 1)
+        self.assertEqual(self.hedger.wins, 0)
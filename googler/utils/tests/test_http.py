@@ -0,0 +1,119 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps import geocoding
+from googler.utils import http
+
+import threading
+import unittest
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+
+        if server.failures > 0:
+            server.failures -= 1
+            status, body = 503, b'<html>Service Unavailable</html>'
+        else:
+            status, body = 200, b'{}'
+
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _CountingServer(HTTPServer):
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), _Handler)
+        self.connections = 0
+        self.requests = 0
+        self.failures = 0
+
+    def get_request(self):
+        self.connections += 1
+        return HTTPServer.get_request(self)
+
+
+class TestTransport(unittest.TestCase):
+    """
+    Test case to test connection reuse and retries of the HTTP transport.
+    """
+    def setUp(self):
+        self.server = _CountingServer()
+        self.url = 'http://127.0.0.1:%d/' % self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.transport = http.Transport(backoff_factor=0)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_reuse(self):
+        for i in range(5):
+            self.assertEqual(self.transport.get(self.url).status_code, 200)
+
+        self.assertEqual(self.server.requests, 5)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_retry_on_server_error(self):
+        self.server.failures = 2
+
+        self.assertEqual(self.transport.get(self.url).status_code, 200)
+        self.assertEqual(self.server.requests, 3)
+
+    def test_geocode_server_error(self):
+        self.server.failures = 10
+        api_url = geocoding.API_URL
+        geocoding.API_URL = '127.0.0.1:%d' % self.server.server_address[1]
+
+        try:
+            result = geocoding.get_geocode('Amphitheatre Pkwy', 'key', use_tls=False,
+                                           transport=self.transport)
+        finally:
+            geocoding.API_URL = api_url
+
+        # The 5xx answer left after the retries is a failed request
+        self.assertIsNone(result)
+
+    def test_default_transport(self):
+        transport = http.get_default_transport()
+        self.assertTrue(transport is http.get_default_transport())
+
+        http.set_default_transport(self.transport)
+        try:
+            self.assertTrue(http.get_default_transport() is self.transport)
+        finally:
+            http.set_default_transport(transport)
+
+
+if __name__ == '__main__':
+    unittest.main()
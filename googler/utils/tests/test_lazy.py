@@ -0,0 +1,77 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.utils import lazy
+
+import googler
+import json
+import subprocess
+import sys
+import unittest
+
+# Seconds importing the API modules may take at most
+IMPORT_BUDGET = 0.25
+
+# Dependencies which must not be imported before they are used
+HEAVY_MODULES = ('requests', 'urllib3', 'sqlite3', 'logging', 'orjson', 'Crypto', 'Cryptodome',
+                 'cryptography', 'concurrent.futures', 'xml.etree.ElementTree', 'aiohttp', 'numpy')
+
+IMPORT_CODE = '''
+import json, sys, time
+start = time.time()
+import googler
+import googler.maps.geocoding
+import googler.recaptcha.captcha
+import googler.recaptcha.captcha2
+import googler.recaptcha.mailhide
+seconds = time.time() - start
+googler.recaptcha.captcha2.widget_html('SITE-KEY')
+print(json.dumps({'seconds': seconds, 'modules': [m for m in %r if m in sys.modules]}))
+''' % (HEAVY_MODULES,)
+
+
+class TestLazyImports(unittest.TestCase):
+    """
+    Test case to test that importing googler stays cheap.
+    """
+    def test_import_budget(self):
+        # Run twice, so the first run has written the bytecode caches
+        for i in range(2):
+            result = json.loads(subprocess.check_output([sys.executable, '-c', IMPORT_CODE])
+                                .decode('utf-8'))
+
+        self.assertEqual(result['modules'], [])
+        self.assertLess(result['seconds'], IMPORT_BUDGET)
+
+    def test_optional_module(self):
+        missing = lazy.module('googler_missing_module', optional=True)
+
+        self.assertFalse(missing)
+        self.assertRaises(AttributeError, getattr, missing, 'loads')
+        self.assertRaises(ImportError, getattr, lazy.module('googler_missing_module'), 'loads')
+        self.assertEqual(lazy.module('json').dumps([1]), '[1]')
+
+    @unittest.skipIf(sys.version_info < (3, 7), 'module __getattr__ requires Python 3.7')
+    def test_exports(self):
+        from googler import Mailhide
+        from googler.recaptcha import mailhide
+
+        self.assertIs(Mailhide, mailhide.Mailhide)
+        self.assertRaises(AttributeError, getattr, googler, 'missing')
+
+
+if __name__ == '__main__':
+    unittest.main()
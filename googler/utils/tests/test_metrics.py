@@ -0,0 +1,149 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps import geocoding
+from googler.maps.cache import GeocodeCache
+from googler.utils import http, metrics
+from googler.utils.tests.fakes import FakeTransport
+
+import threading
+import unittest
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+RESPONSE = b'{"status": "OK", "results": []}'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(RESPONSE)))
+        self.end_headers()
+        self.wfile.write(RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHistogram(unittest.TestCase):
+    """
+    Test case to test the latency histogram.
+    """
+    def test_percentile(self):
+        histogram = metrics.Histogram((0.1, 0.2, 0.5))
+
+        for value in (0.05, 0.05, 0.15, 0.3, 0.3, 0.3, 0.3, 0.3, 0.3, 2):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.percentile(20), 0.1)
+        self.assertEqual(histogram.percentile(50), 0.5)
+        self.assertEqual(histogram.percentile(100), float('inf'))
+        self.assertEqual(histogram.snapshot()['buckets'][-1], (float('inf'), 10))
+
+    def test_empty(self):
+        self.assertIsNone(metrics.Histogram().percentile(50))
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Test case to test tracing of API calls and their aggregation.
+    """
+    def setUp(self):
+        self.metrics = metrics.Metrics()
+        self.events = []
+        self.metrics.add_listener(self.events.append)
+        metrics.set_default_metrics(self.metrics)
+
+    def tearDown(self):
+        metrics.set_default_metrics(None)
+
+    def test_trace(self):
+        with metrics.trace('test') as event:
+            self.assertIs(metrics.current_event(), event)
+            event.status = 'OK'
+
+        self.assertIsNone(metrics.current_event())
+        self.assertEqual(self.events, [event])
+        self.assertIn('total', event.timings)
+        self.assertEqual(self.metrics.counters['test.calls'], 1)
+        self.assertEqual(self.metrics.counters['test.status.OK'], 1)
+        self.assertEqual(self.metrics.histograms['test.total'].count, 1)
+
+    def test_trace_error(self):
+        with self.assertRaises(KeyError):
+            with metrics.trace('test'):
+                raise KeyError()
+
+        self.assertEqual(self.events[0].error, 'KeyError')
+        self.assertEqual(self.metrics.counters['test.errors'], 1)
+
+    def test_failing_listener(self):
+        def listener(event):
+            raise RuntimeError()
+
+        self.metrics.add_listener(listener)
+
+        with metrics.trace('test'):
+            pass
+
+        self.assertEqual(self.metrics.counters['test.calls'], 1)
+
+    def test_transport(self):
+        server = HTTPServer(('127.0.0.1', 0), _Handler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        api_url = geocoding.API_URL
+
+        try:
+            with http.Transport() as transport:
+                geocoding.API_URL = '127.0.0.1:%d' % server.server_address[1]
+                result = geocoding.get_geocode('Berlin', 'key', use_tls=False, transport=transport)
+        finally:
+            geocoding.API_URL = api_url
+            server.shutdown()
+            server.server_close()
+
+        event = self.events[-1]
+
+        self.assertEqual(result.status, 'OK')
+        self.assertEqual(event.status, 'OK')
+        self.assertEqual(event.status_code, 200)
+        self.assertEqual(event.bytes_received, len(RESPONSE))
+        self.assertGreater(event.bytes_sent, 0)
+
+        for phase in ('connect', 'response', 'transfer', 'parse', 'total'):
+            self.assertIn(phase, event.timings)
+
+    def test_cache(self):
+        transport = FakeTransport(lambda url, params: RESPONSE)
+        cache = GeocodeCache()
+
+        for i in range(2):
+            geocoding.get_geocode('Berlin', 'key', transport=transport, cache=cache)
+
+        self.assertEqual([event.cache for event in self.events], ['miss', 'hit'])
+        self.assertEqual(self.metrics.counters['geocode.cache.hit'], 1)
+        self.assertEqual(self.metrics.counters['geocode.cache.miss'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
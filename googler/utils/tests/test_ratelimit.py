@@ -0,0 +1,92 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps import geocoding
+from googler.utils.ratelimit import RateLimiter
+from googler.utils.tests.fakes import FakeTransport, answer_geocode
+
+import time
+import unittest
+
+
+def _over_quota(rejections):
+    """
+    Build a transport which rejects the first requests as over the quota.
+    """
+    def answer(url, params):
+        if len(transport.requests) <= rejections:
+            return {'status': 'OVER_QUERY_LIMIT', 'results': []}
+        return answer_geocode()
+
+    transport = FakeTransport(answer)
+    return transport
+
+
+class TestRateLimiter(unittest.TestCase):
+    """
+    Test case to test request pacing and adaptive backoff.
+    """
+    def test_rate(self):
+        limiter = RateLimiter(per_second=100, burst=1)
+        start = time.time()
+
+        for i in range(11):
+            limiter.acquire()
+
+        self.assertTrue(time.time() - start >= 0.09)
+
+    def test_daily_quota(self):
+        limiter = RateLimiter(per_day=2)
+
+        self.assertEqual(limiter.reserve(), 0)
+        self.assertEqual(limiter.reserve(), 0)
+        self.assertTrue(limiter.reserve() > 60)
+
+    def test_throttle_and_recover(self):
+        limiter = RateLimiter(per_second=10, backoff=0.001)
+        limiter.throttle(0)
+        limiter.throttle(1)
+
+        self.assertEqual(limiter.rate_factor, 0.25)
+
+        for i in range(20):
+            limiter.recover()
+
+        self.assertEqual(limiter.rate_factor, 1.0)
+
+    def test_geocode_retry(self):
+        limiter = RateLimiter(per_second=1000, backoff=0.001)
+        transport = _over_quota(2)
+
+        result = geocoding.get_geocode('Nowhere', 'key', transport=transport, limiter=limiter)
+
+        self.assertEqual(result.status, 'ZERO_RESULTS')
+        self.assertEqual(len(transport.requests), 3)
+
+    def test_geocode_retries_exhausted(self):
+        limiter = RateLimiter(max_retries=1, backoff=0.001)
+        transport = _over_quota(5)
+
+        result = geocoding.get_geocode('Nowhere', 'key', transport=transport, limiter=limiter)
+
+        self.assertEqual(result.status, 'OVER_QUERY_LIMIT')
+        self.assertEqual(len(transport.requests), 2)
+        # The final rejection must not let the rate recover
+        self.assertEqual(limiter.rate_factor, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+from googler.maps import geocoding
+from googler.recaptcha import captcha2
+from googler.utils.singleflight import SingleFlight
+from googler.utils.tests.fakes import FakeTransport, answer_verification
+
+import threading
+import time
+import unittest
+
+
+def _answer(url, payload):
+    if 'address' in payload:
+        return {'status': 'OK', 'results': [{
+            'formatted_address': payload['address'],
+            'geometry': {'location': {'lat': 1.0, 'lng': 2.0}}
+        }]}
+
+    return answer_verification(url, payload)
+
+
+def _run_concurrently(func, count):
+    results = [None] * count
+
+    def run(i):
+        results[i] = func()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results
+
+
+class TestSingleFlight(unittest.TestCase):
+    """
+    Test case to test coalescing of concurrent identical calls.
+    """
+    def test_shared_result(self):
+        flights = SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.05)
+            return object()
+
+        results = _run_concurrently(lambda: flights.do('key', slow), 10)
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+        # Once finished, the next call runs again
+        flights.do('key', slow)
+        self.assertEqual(len(calls), 2)
+
+    def test_shared_error(self):
+        flights = SingleFlight()
+
+        def fail():
+            time.sleep(0.05)
+            raise ValueError('failed')
+
+        def call():
+            try:
+                flights.do('key', fail)
+            except ValueError as e:
+                return e
+
+        errors = _run_concurrently(call, 5)
+        self.assertTrue(all(isinstance(error, ValueError) for error in errors))
+
+    def test_geocode(self):
+        transport = FakeTransport(_answer, delay=0.05)
+        results = _run_concurrently(lambda: geocoding.get_geocode('Amphitheatre Pkwy', 'key',
+                                                                  transport=transport), 10)
+
+        self.assertEqual(len(transport.requests), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+        geocoding.get_geocode('Other address', 'key', transport=transport)
+        geocoding.get_geocode('Amphitheatre Pkwy', 'key', transport=transport, coalesce=False)
+        self.assertEqual(len(transport.requests), 3)
+
+    def test_captcha2(self):
+        transport = FakeTransport(_answer, delay=0.05)
+
+        def verify():
+            try:
+                return captcha2.verify('secret', 'valid', transport=transport, coalesce=True)
+            except captcha2.DuplicateToken as e:
+                return e
+
+        results = _run_concurrently(verify, 10)
+
+        # The token is only accepted once, as the API would
+        self.assertEqual(len(transport.requests), 1)
+        self.assertEqual(len([result for result in results
+                              if isinstance(result, captcha2.RecaptchaResponse)]), 1)
+        self.assertTrue(all(result.error_codes == ['timeout-or-duplicate'] for result in results
+                            if isinstance(result, captcha2.DuplicateToken)))
+
+    def test_captcha2_not_coalesced_by_default(self):
+        transport = FakeTransport(_answer, delay=0.05)
+        _run_concurrently(lambda: captcha2.verify('secret', 'valid', transport=transport), 3)
+
+        self.assertEqual(len(transport.requests), 3)
+
+if __name__ == '__main__':
+    unittest.main()
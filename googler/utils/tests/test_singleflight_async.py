@@ -0,0 +1,63 @@
+##
+# Copyright (C) 2014 Christian Jurk <commx@commx.ws>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+##
+
+import asyncio
+import unittest
+
+try:
+    from googler.utils.aio import AsyncSingleFlight
+except ImportError:
+    AsyncSingleFlight = None
+
+
+@unittest.skipIf(AsyncSingleFlight is None, 'aiohttp is not installed')
+class TestAsyncSingleFlight(unittest.TestCase):
+    """
+    Test case to test coalescing of concurrent identical coroutine calls.
+    """
+    def setUp(self):
+        self.flights = AsyncSingleFlight()
+        self.calls = []
+
+    async def slow(self, value):
+        self.calls.append(value)
+        await asyncio.sleep(0.05)
+        return value
+
+    def test_shared_result(self):
+        async def run():
+            return await asyncio.gather(*[self.flights.do('key', self.slow, i) for i in range(5)])
+
+        self.assertEqual(asyncio.run(run()), [0] * 5)
+        self.assertEqual(self.calls, [0])
+
+    def test_cancelled_caller(self):
+        async def run():
+            first = asyncio.ensure_future(self.flights.do('key', self.slow, 1))
+            await asyncio.sleep(0)
+            second = asyncio.ensure_future(self.flights.do('key', self.slow, 2))
+            await asyncio.sleep(0)
+
+            # Cancelling the first caller leaves the call running for the second
+            first.cancel()
+            return await second, first.cancelled()
+
+        self.assertEqual(asyncio.run(run()), (1, True))
+        self.assertEqual(self.calls, [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
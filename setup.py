@@ -25,11 +25,17 @@ setup(
     license='Apache',
     keywords='google api recaptcha geocode geocoding',
     url='https://github.com/commx/googler',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     install_requires=[
-        'pycrypto',
+        'futures; python_version < "3"',
+        'cryptography',
         'requests'
     ],
+    extras_require={
+        'async': ['aiohttp'],
+        'fast': ['orjson'],
+        'numpy': ['numpy']
+    },
     long_description='README.md',
     classifiers=[
         'Development Status :: 4 - Beta',